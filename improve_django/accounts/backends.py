@@ -0,0 +1,37 @@
+"""
+Authentication backend that keeps signed-in users in the cache.
+
+AuthenticationMiddleware loads the user of the session on every request
+that looks at request.user, which is one auth_user query per request.
+CachedModelBackend authenticates like ModelBackend but keeps the users it
+loads in the cache for USER_CACHE_TIMEOUT seconds. accounts/signals.py
+drops a user from it whenever that user is saved or deleted, which covers
+a password change (and so the session hash check of
+SessionAuthenticationMiddleware) and the last_login update of a sign in.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+
+def get_timeout():
+    return getattr(settings, 'USER_CACHE_TIMEOUT', 15 * 60)
+
+
+def get_user_key(user_id):
+    return 'accounts:user:{0}'.format(user_id)
+
+
+def forget_user(user_id):
+    cache.delete(get_user_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        key = get_user_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super(CachedModelBackend, self).get_user(user_id)
+            if user is not None:
+                cache.set(key, user, get_timeout())
+        return user
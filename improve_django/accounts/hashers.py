@@ -0,0 +1,102 @@
+"""
+PBKDF2 hashing limited to a few slots shared by every worker.
+
+Hashing a password takes a deliberately long time, during which a sync
+worker cannot do anything else. BoundedPBKDF2PasswordHasher only hashes
+while holding one of PASSWORD_HASHING_SLOTS slots, locked files in
+PASSWORD_HASHING_LOCK_DIR, so at most that many hashes run at once on the
+machine however many worker processes and threads there are. The lock of
+a process that dies goes with it.
+
+Inside rejecting_when_busy(), as in the sign in and sign up views, a hash
+waits at most PASSWORD_HASHING_WAIT seconds for a slot and then raises
+PasswordHashingBusy, which the views answer with a 503. Anywhere else
+(the admin sign in, password changes, management commands) it waits as
+long as it takes, so those pages never fail for want of a slot.
+
+It keeps the pbkdf2_sha256 algorithm name, so existing hashes verify
+without being upgraded.
+"""
+import contextlib
+import fcntl
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+from mysite import metrics
+
+# Seconds between two looks for a free slot.
+POLL_INTERVAL = 0.01
+
+_local = threading.local()
+
+
+class PasswordHashingBusy(Exception):
+    pass
+
+
+def try_slots():
+    """The descriptor of a slot file now locked, None if every one is."""
+    directory = settings.PASSWORD_HASHING_LOCK_DIR
+    os.makedirs(directory, exist_ok=True)
+    for number in range(settings.PASSWORD_HASHING_SLOTS):
+        filename = os.path.join(directory, 'slot-{0}.lock'.format(number))
+        descriptor = os.open(filename, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(descriptor, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(descriptor)
+            continue
+        return descriptor
+    return None
+
+
+def acquire_slot(wait=None):
+    """Lock a slot and return its descriptor, waiting at most wait seconds
+    for one (forever if None) before raising PasswordHashingBusy.
+    """
+    deadline = None if wait is None else time.monotonic() + wait
+    while True:
+        descriptor = try_slots()
+        if descriptor is not None:
+            return descriptor
+        if deadline is not None and time.monotonic() >= deadline:
+            raise PasswordHashingBusy('Every password hashing slot is busy.')
+        time.sleep(POLL_INTERVAL)
+
+
+def release_slot(descriptor):
+    # Closing the file releases its lock.
+    os.close(descriptor)
+
+
+@contextlib.contextmanager
+def rejecting_when_busy():
+    """Raise PasswordHashingBusy from the hashes of the block that find no
+    slot within PASSWORD_HASHING_WAIT seconds, instead of waiting on.
+    """
+    previous = getattr(_local, 'rejecting', False)
+    _local.rejecting = True
+    try:
+        yield
+    finally:
+        _local.rejecting = previous
+
+
+class BoundedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    def encode(self, password, salt, iterations=None):
+        wait = None
+        if getattr(_local, 'rejecting', False):
+            wait = settings.PASSWORD_HASHING_WAIT
+        started = time.perf_counter()
+        descriptor = acquire_slot(wait)
+        try:
+            return super(BoundedPBKDF2PasswordHasher, self).encode(
+                password, salt, iterations)
+        finally:
+            release_slot(descriptor)
+            metrics.record_password_hash(
+                self.algorithm, time.perf_counter() - started)
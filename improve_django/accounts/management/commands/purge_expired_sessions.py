@@ -0,0 +1,52 @@
+import time
+
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = ('Deletes expired sessions in small batches, pausing between '
+            'them so that requests writing sessions are not held up. With '
+            '--interval it keeps running, as a background worker.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--pause', type=float, default=0.1,
+            help='Seconds to wait between two batches.')
+        parser.add_argument(
+            '--interval', type=float,
+            help='Purge again every this many seconds instead of exiting.')
+        parser.add_argument(
+            '--database', default='default',
+            help='Database alias of the session table.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        while True:
+            deleted = self.purge(
+                options['batch_size'], options['pause'], options['database'])
+            self.stdout.write('Deleted {0} expired sessions.'.format(deleted))
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
+
+    def purge(self, batch_size, pause, using):
+        # Sessions cached by the cached_db engine expire from the cache on
+        # their own, at the same moment.
+        sessions = Session.objects.using(using)
+        now = timezone.now()
+        deleted = 0
+        while True:
+            keys = list(
+                sessions.filter(expire_date__lt=now)
+                .values_list('session_key', flat=True)[:batch_size])
+            if not keys:
+                return deleted
+            sessions.filter(session_key__in=keys).delete()
+            deleted += len(keys)
+            if len(keys) < batch_size:
+                return deleted
+            time.sleep(pause)
@@ -37,21 +37,41 @@ TODO LIST FOR ACCOUNTS APP (TESTS)
     [x]: When successful, message 'You've been signed out. Come back soon!' is returned
 
 """
-from django.test import TestCase
+import datetime
+import shutil
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
+
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.hashers import check_password, make_password
 from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
 from django.core.urlresolvers import reverse
+from django.db import connection
+from django.utils import timezone
+
+from menu.testcases import FixtureTestCase
+from mysite import metrics
+from . import hashers
+from .backends import CachedModelBackend
+from .throttle import TokenBucket, get_client_ip
 
 # Create your tests here.
 
 # MODEL TESTS
-class UserModelTestCase(TestCase):
-    def setUp(self):
-        self.user1 = User.objects.create(
+class UserModelTestCase(FixtureTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user1 = User.objects.create(
             username='hello',
             password='hello'
         )
 
-        self.user2 = User.objects.create(
+        cls.user2 = User.objects.create(
             username='world',
             password='world'
         )
@@ -111,9 +131,10 @@ class LoginPageGETRequestTestCase(TestCase):
         self.assertTemplateUsed(self.resp, 'accounts/sign_in.html')
 
 
-class LoginPagePOSTRequestTestCase(TestCase):
-    def setUp(self):
-        self.user = User.objects.create_user('hello', 'hello@example.com', 'hello')
+class LoginPagePOSTRequestTestCase(FixtureTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('hello', 'hello@example.com', 'hello')
 
     def test_return_status_302_if_login_successful(self):
         expected = 302
@@ -178,8 +199,9 @@ class SignUpGETRequestTestCase(TestCase):
         self.assertTemplateUsed(self.resp, expected)
 
 
-class SignUpPOSTRequestTestCase(TestCase):
+class SignUpPOSTRequestTestCase(FixtureTestCase):
     def setUp(self):
+        super(SignUpPOSTRequestTestCase, self).setUp()
         self.resp = self.client.post(reverse('accounts:sign_up'), {
             'username': 'hello',
             'password1': 'hello1',
@@ -230,9 +252,13 @@ class SignUpPOSTRequestTestCase(TestCase):
         self.assertRedirects(self.resp, reverse('home'), fetch_redirect_response=False)
 
 
-class LogoutPageTestCase(TestCase):
+class LogoutPageTestCase(FixtureTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('hello', 'hello@example.com', 'hello')
+
     def setUp(self):
-        self.user = User.objects.create_user('hello', 'hello@example.com', 'hello')
+        super(LogoutPageTestCase, self).setUp()
         self.res_login = self.client.post(reverse('accounts:login'), {
             'username': 'hello',
             'password': 'hello'
@@ -257,4 +283,259 @@ class LogoutPageTestCase(TestCase):
         messages = list(response.context['messages'])
         result = str(messages[0])
 
-        self.assertEqual(expected, result)
\ No newline at end of file
+        self.assertEqual(expected, result)
+
+
+class CachedSessionAndUserTestCase(FixtureTestCase):
+    '''Tests for the cached sessions and signed-in users'''
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('hello', 'hello@example.com', 'hello')
+
+    def get_tables_queried(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        tables = set()
+        for query in queries.captured_queries:
+            for table in ('django_session', 'auth_user'):
+                if table in query['sql']:
+                    tables.add(table)
+        return response, tables
+
+    def test_return_signed_in_request_without_session_or_user_query(self):
+        self.client.login(username='hello', password='hello')
+        self.client.get(reverse('item_list'))
+
+        response, tables = self.get_tables_queried(reverse('item_list'))
+
+        self.assertTrue(response.context['user'].is_authenticated())
+        self.assertEqual(set(), tables)
+
+    def test_return_anonymous_request_without_session_or_user_query(self):
+        response, tables = self.get_tables_queried(reverse('item_list'))
+
+        self.assertFalse(response.context['user'].is_authenticated())
+        self.assertEqual(set(), tables)
+
+    def test_return_user_loaded_again_after_save(self):
+        backend = CachedModelBackend()
+        backend.get_user(self.user.pk)
+        self.user.first_name = 'Moe'
+        self.user.save()
+
+        self.assertEqual('Moe', backend.get_user(self.user.pk).first_name)
+
+    def test_return_signed_out_after_password_change(self):
+        self.client.login(username='hello', password='hello')
+        self.client.get(reverse('item_list'))
+        self.user.set_password('changed')
+        self.user.save()
+
+        response = self.client.get(reverse('item_list'))
+
+        self.assertFalse(response.context['user'].is_authenticated())
+
+    def test_return_none_for_deleted_user(self):
+        backend = CachedModelBackend()
+        backend.get_user(self.user.pk)
+        self.user.delete()
+
+        self.assertIsNone(backend.get_user(self.user.pk))
+
+
+class PurgeExpiredSessionsTestCase(FixtureTestCase):
+    '''Tests for the purge_expired_sessions command'''
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        for i in range(5):
+            Session.objects.create(
+                session_key='expired{0}'.format(i), session_data='',
+                expire_date=now - datetime.timedelta(days=1))
+        Session.objects.create(
+            session_key='active', session_data='',
+            expire_date=now + datetime.timedelta(days=1))
+
+    def test_return_only_active_sessions_left(self):
+        output = StringIO()
+
+        call_command('purge_expired_sessions', batch_size=2, pause=0,
+                     stdout=output)
+
+        self.assertEqual(
+            ['active'], list(Session.objects.values_list('pk', flat=True)))
+        self.assertIn('Deleted 5 expired sessions.', output.getvalue())
+
+
+def get_rejections(reason):
+    labels = (('reason', reason), ('view', 'accounts:login'))
+    return metrics._counters.get('django_auth_rejected_total', {}).get(labels, 0)
+
+
+@override_settings(LOGIN_THROTTLE_RATES={'ip': (100, 60), 'username': (2, 60)})
+class LoginThrottleTestCase(FixtureTestCase):
+    '''Tests for the token buckets in front of sign in and sign up'''
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('hello', 'hello@example.com', 'hello')
+
+    def sign_in(self, username='hello'):
+        return self.client.post(reverse('accounts:login'), {
+            'username': username,
+            'password': 'wrong'
+        })
+
+    def test_return_429_once_username_bucket_is_empty(self):
+        rejected = get_rejections('throttled_username')
+        self.sign_in()
+        self.sign_in()
+
+        response = self.sign_in()
+
+        self.assertEqual(429, response.status_code)
+        self.assertEqual('30', response['Retry-After'])
+        self.assertEqual(rejected + 1, get_rejections('throttled_username'))
+
+    def test_return_throttled_request_rejected_before_hashing(self):
+        self.sign_in()
+        self.sign_in()
+
+        with mock.patch('django.contrib.auth.forms.authenticate') as authenticate:
+            self.sign_in()
+
+        self.assertFalse(authenticate.called)
+
+    @override_settings(LOGIN_THROTTLE_RATES={'ip': (2, 60), 'username': (100, 60)})
+    def test_return_429_once_ip_bucket_is_empty(self):
+        self.sign_in('hello')
+        self.sign_in('world')
+
+        response = self.sign_in('again')
+
+        self.assertEqual(429, response.status_code)
+
+    def test_return_429_for_sign_up_too(self):
+        for _ in range(3):
+            response = self.client.post(reverse('accounts:sign_up'), {
+                'username': 'hello',
+                'password1': 'hello1',
+                'password2': 'hello2'
+            })
+
+        self.assertEqual(429, response.status_code)
+
+    @override_settings(
+        LOGIN_THROTTLE_RATES={'ip': (2, 60), 'username': (100, 60)},
+        TRUSTED_PROXIES=1)
+    def test_return_bucket_per_forwarded_client_behind_proxy(self):
+        for username in ('hello', 'world'):
+            self.client.post(reverse('accounts:login'), {
+                'username': username, 'password': 'wrong'},
+                HTTP_X_FORWARDED_FOR='10.0.0.1')
+
+        other = self.client.post(reverse('accounts:login'), {
+            'username': 'again', 'password': 'wrong'},
+            HTTP_X_FORWARDED_FOR='10.0.0.2')
+        spoofed = self.client.post(reverse('accounts:login'), {
+            'username': 'again', 'password': 'wrong'},
+            HTTP_X_FORWARDED_FOR='10.0.0.3, 10.0.0.1')
+
+        self.assertEqual(200, other.status_code)
+        self.assertEqual(429, spoofed.status_code)
+
+    def test_return_remote_addr_without_trusted_proxies(self):
+        request = RequestFactory().get(
+            '/', REMOTE_ADDR='10.0.0.9', HTTP_X_FORWARDED_FOR='10.0.0.1')
+
+        self.assertEqual('10.0.0.9', get_client_ip(request))
+
+    def test_return_bucket_refilled_over_its_period(self):
+        bucket = TokenBucket('test', 2, 10)
+
+        waits = [bucket.take('key', now=0) for _ in range(3)]
+
+        self.assertEqual([0, 0, 5], waits)
+        self.assertEqual(0, bucket.take('key', now=10))
+
+
+@override_settings(
+    PASSWORD_HASHERS=['accounts.hashers.BoundedPBKDF2PasswordHasher'],
+    PASSWORD_HASHING_SLOTS=1,
+    PASSWORD_HASHING_WAIT=0)
+class BoundedPasswordHasherTestCase(FixtureTestCase):
+    '''Tests for hashing passwords in the shared slots'''
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('hello', 'hello@example.com', 'hello')
+
+    def setUp(self):
+        super(BoundedPasswordHasherTestCase, self).setUp()
+        # Slots of their own, so parallel test processes don't share them.
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        lock_dir = override_settings(PASSWORD_HASHING_LOCK_DIR=directory)
+        lock_dir.enable()
+        self.addCleanup(lock_dir.disable)
+
+    def fill_pool(self):
+        descriptor = hashers.acquire_slot()
+        self.addCleanup(hashers.release_slot, descriptor)
+        return descriptor
+
+    def test_return_password_hashed_and_checked_in_slot(self):
+        encoded = make_password('secret')
+
+        self.assertTrue(encoded.startswith('pbkdf2_sha256$'))
+        self.assertTrue(check_password('secret', encoded))
+        self.assertFalse(check_password('other', encoded))
+
+    def test_return_hash_time_recorded(self):
+        make_password('secret')
+
+        series = metrics._histograms['django_password_hash_duration_seconds']
+        self.assertIn((('algorithm', 'pbkdf2_sha256'),), series)
+
+    def test_return_error_when_every_slot_is_busy(self):
+        self.fill_pool()
+
+        with self.assertRaises(hashers.PasswordHashingBusy):
+            with hashers.rejecting_when_busy():
+                make_password('secret')
+
+    def test_return_hash_waiting_for_slot_outside_sign_in(self):
+        descriptor = hashers.acquire_slot()
+        releaser = threading.Timer(0.05, hashers.release_slot, [descriptor])
+        releaser.start()
+        self.addCleanup(releaser.join)
+
+        encoded = make_password('secret')
+
+        self.assertTrue(check_password('secret', encoded))
+
+    def test_return_admin_sign_in_when_every_slot_is_busy(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        descriptor = hashers.acquire_slot()
+        releaser = threading.Timer(0.05, hashers.release_slot, [descriptor])
+        releaser.start()
+        self.addCleanup(releaser.join)
+
+        response = self.client.post(reverse('admin:login'), {
+            'username': 'admin',
+            'password': 'admin'
+        })
+
+        self.assertEqual(302, response.status_code)
+
+    def test_return_503_for_sign_in_when_every_slot_is_busy(self):
+        rejected = get_rejections('hashing_busy')
+        self.fill_pool()
+
+        response = self.client.post(reverse('accounts:login'), {
+            'username': 'hello',
+            'password': 'hello'
+        })
+
+        self.assertEqual(503, response.status_code)
+        self.assertEqual('1', response['Retry-After'])
+        self.assertEqual(rejected + 1, get_rejections('hashing_busy'))
+
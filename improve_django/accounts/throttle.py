@@ -0,0 +1,94 @@
+"""
+Token buckets that turn away sign in and sign up bursts before hashing.
+
+Each client IP and each username gets a bucket of LOGIN_THROTTLE_RATES
+tokens that refills evenly over the period. A POST takes a token from
+both of its buckets and is rejected with a 429 when either is empty, so
+a burst costs a cache read and write instead of a PBKDF2 hash.
+
+The client IP is the one the trusted proxies in front of the site saw,
+see get_client_ip(): behind the Heroku router REMOTE_ADDR is the router.
+
+Buckets live in the default cache, which every worker process shares
+(see CACHES in the settings), so the rates hold for the whole site rather
+than for each worker. The read and write are not atomic: two requests
+racing for the last token may both get it, which is fine for throttling.
+"""
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class TokenBucket(object):
+    def __init__(self, name, capacity, period):
+        self.name = name
+        self.capacity = capacity
+        self.period = period
+        self.rate = capacity / period
+
+    def get_key(self, value):
+        digest = hashlib.md5(value.encode('utf-8')).hexdigest()
+        return 'throttle:{0}:{1}'.format(self.name, digest)
+
+    def take(self, value, now=None):
+        """Take a token for value and return 0, or the seconds to wait
+        for the next token when there is none left."""
+        if now is None:
+            now = time.time()
+        key = self.get_key(value)
+        tokens, updated = cache.get(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+        if tokens >= 1:
+            tokens -= 1
+            wait = 0
+        else:
+            wait = (1 - tokens) / self.rate
+        # An untouched bucket is full again after a period.
+        cache.set(key, (tokens, now), int(math.ceil(self.period)))
+        return wait
+
+
+def get_buckets():
+    return {
+        name: TokenBucket(name, capacity, period)
+        for name, (capacity, period) in settings.LOGIN_THROTTLE_RATES.items()
+    }
+
+
+def get_client_ip(request):
+    """The address of the client, taken from X-Forwarded-For when
+    TRUSTED_PROXIES proxies are in front of the site.
+
+    Every proxy appends the address it got the request from, so the entry
+    added by the outermost trusted one is TRUSTED_PROXIES from the end.
+    The entries before it come from the client and may be made up.
+    """
+    proxies = getattr(settings, 'TRUSTED_PROXIES', 0)
+    if proxies:
+        forwarded = [
+            address.strip() for address in
+            request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')
+            if address.strip()
+        ]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def check(request):
+    """(reason, seconds to wait) for a throttled request, else None."""
+    buckets = get_buckets()
+    values = {
+        'ip': get_client_ip(request),
+        'username': request.POST.get('username', '').strip().lower(),
+    }
+    for name in sorted(buckets):
+        if not values.get(name):
+            continue
+        wait = buckets[name].take(values[name])
+        if wait:
+            return 'throttled_{0}'.format(name), wait
+    return None
@@ -1,5 +1,8 @@
+import math
+
+from django.conf import settings
 from django.contrib import messages
-from django.contrib.auth import authenticate, login, logout
+from django.contrib.auth import login, logout
 from django.contrib.auth.forms import (
     AuthenticationForm,
     UserCreationForm)
@@ -7,12 +10,49 @@ from django.core.urlresolvers import reverse
 from django.http import HttpResponseRedirect
 from django.shortcuts import render
 
+from mysite import metrics
+from . import throttle
+from .hashers import PasswordHashingBusy, rejecting_when_busy
+
+# Seconds a client is asked to wait when every hashing slot is busy.
+BUSY_RETRY_AFTER = 1
+
+
+def reject(request, template, form_class, reason, retry_after):
+    """The page again, with a 429 or 503 that tells when to retry.
+
+    The form is a new unbound one: rendering the errors of the submitted
+    one would validate it, and so hash the password after all.
+    """
+    metrics.record_auth_rejection(request.resolver_match.view_name, reason)
+    if reason == 'hashing_busy':
+        status = 503
+        messages.error(request, "We're busy right now, please try again.")
+    else:
+        status = 429
+        messages.error(
+            request, "Too many attempts, please wait a moment and try again.")
+    form = form_class(initial={'username': request.POST.get('username', '')})
+    response = render(request, template, {'form': form}, status=status)
+    response['Retry-After'] = str(int(math.ceil(retry_after)))
+    return response
+
 
 def sign_in(request):
     form = AuthenticationForm()
     if request.method == 'POST':
         form = AuthenticationForm(data=request.POST)
-        if form.is_valid():
+        throttled = throttle.check(request)
+        if throttled:
+            return reject(
+                request, 'accounts/sign_in.html', AuthenticationForm, *throttled)
+        try:
+            with rejecting_when_busy():
+                valid = form.is_valid()
+        except PasswordHashingBusy:
+            return reject(request, 'accounts/sign_in.html', AuthenticationForm,
+                          'hashing_busy', BUSY_RETRY_AFTER)
+        if valid:
             if form.user_cache is not None:
                 user = form.user_cache
                 if user.is_active:
@@ -37,12 +77,21 @@ def sign_up(request):
     form = UserCreationForm()
     if request.method == 'POST':
         form = UserCreationForm(data=request.POST)
+        throttled = throttle.check(request)
+        if throttled:
+            return reject(
+                request, 'accounts/sign_up.html', UserCreationForm, *throttled)
         if form.is_valid():
-            form.save()
-            user = authenticate(
-                username=form.cleaned_data['username'],
-                password=form.cleaned_data['password1']
-            )
+            try:
+                with rejecting_when_busy():
+                    user = form.save()
+            except PasswordHashingBusy:
+                return reject(
+                    request, 'accounts/sign_up.html', UserCreationForm,
+                    'hashing_busy', BUSY_RETRY_AFTER)
+            # The password was just set: checking it again with
+            # authenticate() would only hash it a second time.
+            user.backend = settings.AUTHENTICATION_BACKENDS[0]
             login(request, user)
             messages.success(
                 request,
@@ -0,0 +1,74 @@
+// Adds a search box above every <select multiple data-autocomplete-url>.
+// The select only holds the chosen options; matches are fetched from the
+// JSON endpoint while typing and added to it when picked.
+(function () {
+    'use strict';
+
+    function setUp(select) {
+        var input = document.createElement('input');
+        var list = document.createElement('ul');
+        var timer = null;
+
+        input.type = 'search';
+        input.className = 'form-control autocomplete-input';
+        input.placeholder = 'Type to search...';
+        list.className = 'list-unstyled autocomplete-results';
+        select.parentNode.insertBefore(input, select);
+        select.parentNode.insertBefore(list, select);
+
+        function choose(result) {
+            var value = String(result.pk);
+            var option = Array.prototype.filter.call(select.options, function (option) {
+                return option.value === value;
+            })[0];
+            if (!option) {
+                option = new Option(result.name, value);
+                select.appendChild(option);
+            }
+            option.selected = true;
+        }
+
+        function show(results) {
+            list.innerHTML = '';
+            results.forEach(function (result) {
+                var item = document.createElement('li');
+                var link = document.createElement('a');
+                link.href = '#';
+                link.textContent = result.name;
+                link.addEventListener('click', function (event) {
+                    event.preventDefault();
+                    choose(result);
+                });
+                item.appendChild(link);
+                list.appendChild(item);
+            });
+        }
+
+        function lookUp() {
+            var query = input.value.trim();
+            if (!query) {
+                show([]);
+                return;
+            }
+            var request = new XMLHttpRequest();
+            request.open('GET', select.getAttribute('data-autocomplete-url') +
+                '?q=' + encodeURIComponent(query));
+            request.onload = function () {
+                if (request.status === 200 && input.value.trim() === query) {
+                    show(JSON.parse(request.responseText).results);
+                }
+            };
+            request.send();
+        }
+
+        input.addEventListener('input', function () {
+            clearTimeout(timer);
+            timer = setTimeout(lookUp, 200);
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        var selects = document.querySelectorAll('select[data-autocomplete-url]');
+        Array.prototype.forEach.call(selects, setUp);
+    });
+}());
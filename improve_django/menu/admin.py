@@ -1,6 +1,7 @@
 from django.contrib import admin
-from .models import Menu, Item, Ingredient
+from .models import Menu, Item, Ingredient, ArchivedMenu
 
 admin.site.register(Menu)
 admin.site.register(Item)
-admin.site.register(Ingredient)
\ No newline at end of file
+admin.site.register(Ingredient)
+admin.site.register(ArchivedMenu)
\ No newline at end of file
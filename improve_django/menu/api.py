@@ -0,0 +1,280 @@
+"""
+Read-only JSON API, version 1, for the mobile app and the menu boards.
+
+Every endpoint takes fields=a,b,c to pick the fields it returns. Only the
+columns behind those fields are loaded and a relation is prefetched (in a
+single query per page) only when it is asked for, so the number of
+queries of a request is fixed by its fields, never by its rows. The
+batch endpoints take ids=1,2,3 and load them through menu/loaders.py, so
+a client showing several objects needs one request instead of many.
+The changes endpoint serves the change feed of menu/changes.py, which
+tells a client which objects to fetch again through the batch endpoints.
+
+Serialized responses are cached under the catalog version (menu/cache.py)
+together with their ETag. A repeated request is a single cache read and
+an If-None-Match match answers 304 without sending the body again.
+"""
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+from django.http import HttpResponse, JsonResponse
+from django.utils.http import parse_etags, quote_etag
+
+from . import changes, pagination
+from .cache import get_timeout, make_key, may_fill
+from .loaders import Loader, unique
+from .models import Menu, Item, Ingredient
+
+# Most ids a single batch request may ask for.
+MAX_BATCH_SIZE = 200
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super(ApiError, self).__init__(message)
+        self.message = message
+        self.status = status
+
+
+class Resource(object):
+    """How one model is exposed: its fields and how to load them.
+
+    columns maps a field to the model fields it needs, prefetch to a
+    function returning the Prefetch that loads it and select to the
+    select_related() relation it follows. A field is read with the get_
+    method of its name if there is one, else as an attribute.
+    """
+    model = None
+    ordering = ('pk',)
+    columns = {}
+    prefetch = {}
+    select = {}
+
+    def __init__(self, request):
+        self.fields = self.get_fields(request)
+
+    def get_fields(self, request):
+        fields = request.GET.get('fields')
+        if not fields:
+            return self.default_fields
+        fields = [field.strip() for field in fields.split(',') if field.strip()]
+        unknown = [field for field in fields if field not in self.all_fields]
+        if unknown:
+            raise ApiError('Unknown fields: {0}. Choose from: {1}.'.format(
+                ', '.join(unknown), ', '.join(self.all_fields)))
+        return fields
+
+    @property
+    def all_fields(self):
+        return list(self.columns) + list(self.prefetch) + list(self.select)
+
+    @property
+    def default_fields(self):
+        return self.all_fields
+
+    def get_queryset(self, queryset=None):
+        if queryset is None:
+            queryset = self.model.objects.all()
+        columns = {'id'} | {field for field in self.ordering if field != 'pk'}
+        for field in self.fields:
+            columns.update(self.columns.get(field, ()))
+            if field in self.select:
+                relation, column = self.select[field]
+                columns.update([relation, '{0}__{1}'.format(relation, column)])
+                queryset = queryset.select_related(relation)
+            if field in self.prefetch:
+                queryset = queryset.prefetch_related(self.prefetch[field]())
+        return queryset.only(*columns)
+
+    def serialize(self, obj):
+        data = {}
+        for field in self.fields:
+            getter = getattr(self, 'get_' + field, None)
+            data[field] = getter(obj) if getter else getattr(obj, field)
+        return data
+
+
+def related_names(objects):
+    return [{'id': obj.pk, 'name': obj.name} for obj in objects]
+
+
+class MenuResource(Resource):
+    model = Menu
+    columns = {
+        'id': ('id',),
+        'season': ('season',),
+        'created_date': ('created_date',),
+        'expiration_date': ('expiration_date',),
+        'updated_at': ('updated_at',),
+    }
+    prefetch = {
+        'items': lambda: Prefetch(
+            'items', queryset=Item.objects.only('id', 'name').order_by('name')),
+    }
+
+    def get_items(self, menu):
+        return related_names(menu.items.all())
+
+
+class ItemResource(Resource):
+    model = Item
+    ordering = ('name', 'pk')
+    columns = {
+        'id': ('id',),
+        'name': ('name',),
+        'description': ('description',),
+        'created_date': ('created_date',),
+        'standard': ('standard',),
+        'updated_at': ('updated_at',),
+    }
+    prefetch = {
+        'ingredients': lambda: Prefetch(
+            'ingredients',
+            queryset=Ingredient.objects.only('id', 'name').order_by('name')),
+    }
+    select = {
+        'chef': ('chef', 'username'),
+    }
+
+    def get_chef(self, item):
+        return item.chef.username
+
+    def get_ingredients(self, item):
+        return related_names(item.ingredients.all())
+
+
+class IngredientResource(Resource):
+    model = Ingredient
+    ordering = ('name', 'pk')
+    columns = {
+        'id': ('id',),
+        'name': ('name',),
+        'updated_at': ('updated_at',),
+    }
+
+
+def list_payload(request, resource, queryset=None):
+    try:
+        page = pagination.paginate(
+            resource.get_queryset(queryset),
+            resource.ordering,
+            cursor=request.GET.get('cursor'),
+            size=pagination.get_page_size(request)
+        )
+    except pagination.InvalidCursor:
+        raise ApiError('Invalid cursor.')
+    return {
+        'results': [resource.serialize(obj) for obj in page],
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    }
+
+
+def detail_payload(resource, pk):
+    obj = Loader(resource.get_queryset()).load(int(pk))
+    if obj is None:
+        raise ApiError('Not found.', status=404)
+    return resource.serialize(obj)
+
+
+def get_ids(request):
+    values = ','.join(request.GET.getlist('ids')).split(',')
+    values = [value.strip() for value in values if value.strip()]
+    if not all(value.isdigit() for value in values):
+        raise ApiError('ids must be a comma separated list of integers.')
+    ids = list(unique(int(value) for value in values))
+    if not ids:
+        raise ApiError('ids is required.')
+    if len(ids) > MAX_BATCH_SIZE:
+        raise ApiError('At most {0} ids can be requested at once.'.format(
+            MAX_BATCH_SIZE))
+    return ids
+
+
+def batch_payload(request, resource):
+    ids = get_ids(request)
+    objects = Loader(resource.get_queryset()).load_many(ids)
+    return {
+        'results': [resource.serialize(obj) for obj in objects if obj],
+        'missing': [pk for pk, obj in zip(ids, objects) if obj is None],
+    }
+
+
+def changes_payload(request):
+    since = request.GET.get('since')
+    if since is None:
+        # Where a client that is about to read the catalog starts from.
+        latest = changes.latest_sequence()
+        return changes.ChangeBatch(latest, latest, {}, False).as_dict()
+    if not since.isdigit():
+        raise ApiError('since must be a sequence number.')
+    return changes.get_changes(
+        int(since), pagination.get_page_size(request)).as_dict()
+
+
+def cached_response(request, build):
+    """Serve build() as JSON, cached with its ETag for the catalog version."""
+    path = hashlib.md5(request.get_full_path().encode('utf-8')).hexdigest()
+    key = make_key('api', path)
+    cached = cache.get(key)
+    if cached is None:
+        try:
+            payload = build()
+        except ApiError as error:
+            return JsonResponse({'error': error.message}, status=error.status)
+        body = json.dumps(
+            payload, cls=DjangoJSONEncoder, separators=(',', ':')
+        ).encode('utf-8')
+        cached = (hashlib.md5(body).hexdigest(), body)
+        if may_fill():
+            cache.set(key, cached, get_timeout())
+
+    etag, body = cached
+    if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        response = HttpResponse(status=304)
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = quote_etag(etag)
+    return response
+
+
+def menu_list(request):
+    return cached_response(request, lambda: list_payload(
+        request, MenuResource(request), Menu.objects.active()))
+
+
+def menu_detail(request, pk):
+    return cached_response(
+        request, lambda: detail_payload(MenuResource(request), pk))
+
+
+def menu_batch(request):
+    return cached_response(
+        request, lambda: batch_payload(request, MenuResource(request)))
+
+
+def item_list(request):
+    return cached_response(
+        request, lambda: list_payload(request, ItemResource(request)))
+
+
+def item_detail(request, pk):
+    return cached_response(
+        request, lambda: detail_payload(ItemResource(request), pk))
+
+
+def item_batch(request):
+    return cached_response(
+        request, lambda: batch_payload(request, ItemResource(request)))
+
+
+def ingredient_list(request):
+    return cached_response(
+        request, lambda: list_payload(request, IngredientResource(request)))
+
+
+def change_list(request):
+    return cached_response(request, lambda: changes_payload(request))
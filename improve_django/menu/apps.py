@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class MenuConfig(AppConfig):
+    name = 'menu'
+
+    def ready(self):
+        from . import signals  # noqa: registers the signal receivers
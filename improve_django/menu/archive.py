@@ -0,0 +1,95 @@
+"""
+Moves long expired menus out of the hot tables.
+
+archive_expired_menus() copies the menus that expired more than a given
+time ago into ArchivedMenu, with the names of their items in
+ArchivedMenuItem, then deletes them and their Menu.items rows. It works
+through them in batches, one short transaction each, so the tables are
+never locked for long and an interrupted run loses nothing.
+
+The rows are deleted with plain SQL: a queryset delete() would send the
+signals of every menu, bumping the catalog version once per menu. The
+version is bumped once per batch instead, and the deletions are appended
+to the change feed (menu/changes.py) in the same transaction.
+"""
+import datetime
+import time
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from . import changes
+from .cache import bump_version
+from .models import ArchivedMenu, ArchivedMenuItem, Change, Menu
+
+
+def get_archive_age():
+    return datetime.timedelta(
+        days=getattr(settings, 'MENU_ARCHIVE_AFTER_DAYS', 30))
+
+
+def delete_rows(model, column, values, using='default'):
+    """DELETE the rows of model whose column is one of values."""
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    sql = 'DELETE FROM {0} WHERE {1} IN ({2})'.format(
+        quote(model._meta.db_table), quote(column),
+        ', '.join(['%s'] * len(values)))
+    with connection.cursor() as cursor:
+        cursor.execute(sql, values)
+
+
+def archive_batch(menu_ids, using='default'):
+    """Archive the menus of menu_ids and return how many links moved."""
+    through = Menu.items.through
+    menus = Menu.objects.using(using).filter(pk__in=menu_ids)
+    links = (
+        through.objects.using(using).filter(menu_id__in=menu_ids)
+        .values_list('menu_id', 'item_id', 'item__name')
+    )
+    ArchivedMenu.objects.using(using).bulk_create(
+        ArchivedMenu(
+            id=menu.pk,
+            season=menu.season,
+            created_date=menu.created_date,
+            expiration_date=menu.expiration_date,
+            updated_at=menu.updated_at,
+        )
+        for menu in menus
+    )
+    entries = [
+        ArchivedMenuItem(menu_id=menu_id, item_id=item_id, item_name=name)
+        for menu_id, item_id, name in links
+    ]
+    ArchivedMenuItem.objects.using(using).bulk_create(entries)
+    delete_rows(through, 'menu_id', menu_ids, using)
+    delete_rows(Menu, 'id', menu_ids, using)
+    changes.record(Menu, menu_ids, Change.DELETE, using)
+    return len(entries)
+
+
+def archive_expired_menus(older_than=None, batch_size=500, pause=0,
+                          using='default'):
+    """Archive the menus expired for longer than older_than (a timedelta,
+    MENU_ARCHIVE_AFTER_DAYS by default) and return (menus, links) moved.
+    """
+    if older_than is None:
+        older_than = get_archive_age()
+    cutoff = timezone.now() - older_than
+    menus = links = 0
+    while True:
+        with transaction.atomic(using=using):
+            menu_ids = list(
+                Menu.objects.using(using)
+                .filter(expiration_date__lt=cutoff)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size])
+            if not menu_ids:
+                return menus, links
+            links += archive_batch(menu_ids, using)
+        menus += len(menu_ids)
+        bump_version()
+        if len(menu_ids) < batch_size:
+            return menus, links
+        time.sleep(pause)
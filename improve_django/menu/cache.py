@@ -0,0 +1,112 @@
+"""
+Versioned cache for the rendered menu pages.
+
+Every cache key written for the menu pages embeds a single catalog version.
+Saving or deleting a Menu, Item or Ingredient (or changing the Menu.items /
+Item.ingredients sets) bumps that version, see menu/signals.py, so stale
+entries are never read again and simply age out of the cache backend.
+
+Menus also drop off the home page when their expiration date passes, which
+is not a database write. The next upcoming expiration is therefore stored
+next to the version and the version is bumped once that moment has passed.
+
+Whatever a request read is only stored under the version if may_fill()
+says so: with read replicas, a request may read rows older than the
+version, see mysite/db_routers.py.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Menu
+
+VERSION_KEY = 'menu:version'
+NEXT_EXPIRY_KEY = 'menu:next-expiry'
+NEVER = float('inf')
+
+
+def get_timeout():
+    return getattr(settings, 'MENU_CACHE_TIMEOUT', 60 * 60)
+
+
+def may_fill():
+    """Whether this request may store what it read under the version."""
+    check = getattr(settings, 'MENU_CACHE_FILL_CHECK', None)
+    return check is None or import_string(check)()
+
+
+def bump_version():
+    """Invalidate every cached menu page and return the new version."""
+    cache.delete(NEXT_EXPIRY_KEY)
+    # Seeding from the clock rather than from 1 means a version that was
+    # evicted from the cache can never come back and match old entries.
+    if cache.add(VERSION_KEY, int(time.time() * 1000), None):
+        return cache.get(VERSION_KEY)
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        return bump_version()
+
+
+def peek_version():
+    """The stored version, without the expiry check of get_version()."""
+    return cache.get(VERSION_KEY)
+
+
+def get_next_expiry():
+    expiration_date = (
+        Menu.objects.filter(expiration_date__gte=timezone.now())
+        .order_by('expiration_date')
+        .values_list('expiration_date', flat=True)
+        .first()
+    )
+    if expiration_date is None:
+        return NEVER
+    return expiration_date.timestamp()
+
+
+def get_version():
+    """Return the current catalog version, bumping it when a menu expired."""
+    values = cache.get_many([VERSION_KEY, NEXT_EXPIRY_KEY])
+    version = values.get(VERSION_KEY)
+    if version is None:
+        return bump_version()
+
+    next_expiry = values.get(NEXT_EXPIRY_KEY)
+    if next_expiry is None:
+        if may_fill():
+            cache.set(NEXT_EXPIRY_KEY, get_next_expiry(), None)
+    elif next_expiry <= time.time():
+        return bump_version()
+    return version
+
+
+def make_key(*parts, version=None):
+    if version is None:
+        version = get_version()
+    return ':'.join(['menu', str(version)] + [str(part) for part in parts])
+
+
+def get_cached_object_or_404(queryset, pk, version=None):
+    """get_object_or_404() that keeps the instance for the current version."""
+    key = make_key('object', queryset.model._meta.label_lower, pk,
+                   version=version)
+    obj = cache.get(key)
+    if obj is None:
+        obj = get_object_or_404(queryset, pk=pk)
+        if may_fill():
+            cache.set(key, obj, get_timeout())
+    return obj
+
+
+def fragment_context(version):
+    """Template variables used by the {% cache %} tags in templates/menu."""
+    return {
+        'cache_version': version,
+        # A fragment stored with no time left is never read back.
+        'cache_timeout': get_timeout() if may_fill() else 0,
+    }
@@ -0,0 +1,205 @@
+"""
+Row format shared by the import_menu_data and export_menu_data commands
+and the catalog export view.
+
+Every row is one record, its type tells which. Ingredient and menu records
+come first, with the id and dates of their object, so that ingredients no
+item uses and menus without items are exported too, and two menus of the
+same season stay apart. Item records follow, one per item and menu it is
+on, and name the menu by the id of its record. Rows without a type are
+items, and items may name their menu by season instead, as hand-written
+files do. Rows are read and written one at a time as CSV or JSON Lines, so
+a catalog of any size goes through with bounded memory.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+import zlib
+
+from .models import Ingredient, Menu, Item
+
+RECORD_TYPES = ('ingredient', 'menu', 'item')
+# Imports only use the ids to tell which menu an item is on and to join the
+# records of an item on several menus, new objects get ids of their own.
+FIELDS = [
+    'type', 'id', 'menu', 'season', 'created_date', 'expiration_date', 'name',
+    'description', 'chef', 'standard', 'ingredients',
+]
+FORMATS = ('csv', 'jsonl')
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+# CSV has no lists, so the ingredients of an item are joined with this.
+INGREDIENT_SEPARATOR = '|'
+
+
+class RowError(ValueError):
+    pass
+
+
+def guess_format(path):
+    if path.endswith('.gz'):
+        path = path[:-3]
+    extension = os.path.splitext(path)[1].lstrip('.').lower()
+    if extension == 'json':
+        extension = 'jsonl'
+    return extension if extension in FORMATS else None
+
+
+def open_input(path):
+    if path == '-':
+        return sys.stdin
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+
+def read_rows(stream, format):
+    """Yield (line number, row dict) for every row of stream."""
+    if format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            ingredients = row.get('ingredients') or ''
+            row['ingredients'] = [
+                name for name in ingredients.split(INGREDIENT_SEPARATOR)
+                if name.strip()
+            ]
+            yield reader.line_num, row
+    else:
+        for line_number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as error:
+                raise RowError('Line {0}: {1}'.format(line_number, error))
+            if not isinstance(row, dict):
+                raise RowError(
+                    'Line {0}: expected an object.'.format(line_number))
+            yield line_number, row
+
+
+def format_date(value):
+    return value.isoformat() if value else None
+
+
+def iter_chunks(queryset, fields, chunk_size):
+    """Yield the primary key and fields of the objects of queryset, a
+    list of chunk_size at a time, read by primary key, never with OFFSET.
+    """
+    last_pk = 0
+    while True:
+        chunk = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', *fields)[:chunk_size])
+        if not chunk:
+            return
+        last_pk = chunk[-1][0]
+        yield chunk
+
+
+def iter_export_rows(chunk_size=1000, using='default'):
+    """Yield a record per ingredient and menu, then one per item and menu
+    it is on, each type ordered by id.
+
+    The ingredients and menus of every chunk of items are fetched with one
+    query each.
+    """
+    for chunk in iter_chunks(
+            Ingredient.objects.using(using), ['name'], chunk_size):
+        for pk, name in chunk:
+            yield {'type': 'ingredient', 'id': pk, 'name': name}
+
+    for chunk in iter_chunks(
+            Menu.objects.using(using),
+            ['season', 'created_date', 'expiration_date'], chunk_size):
+        for pk, season, created_date, expiration_date in chunk:
+            yield {
+                'type': 'menu',
+                'id': pk,
+                'season': season,
+                'created_date': format_date(created_date),
+                'expiration_date': format_date(expiration_date),
+            }
+
+    for items in iter_chunks(
+            Item.objects.using(using),
+            ['name', 'description', 'chef__username', 'standard',
+             'created_date'],
+            chunk_size):
+        pks = [item[0] for item in items]
+
+        ingredients = {}
+        for item_id, name in (
+            Item.ingredients.through.objects.using(using)
+            .filter(item_id__in=pks).order_by('ingredient__name')
+            .values_list('item_id', 'ingredient__name')
+        ):
+            ingredients.setdefault(item_id, []).append(name)
+        menus = {}
+        for item_id, menu_id in (
+            Menu.items.through.objects.using(using)
+            .filter(item_id__in=pks).order_by('menu_id')
+            .values_list('item_id', 'menu_id')
+        ):
+            menus.setdefault(item_id, []).append(menu_id)
+
+        for pk, name, description, chef, standard, created_date in items:
+            for menu_id in menus.get(pk, [None]):
+                yield {
+                    'type': 'item',
+                    'id': pk,
+                    'menu': menu_id,
+                    'created_date': format_date(created_date),
+                    'name': name,
+                    'description': description,
+                    'chef': chef,
+                    'standard': standard,
+                    'ingredients': ingredients.get(pk, []),
+                }
+
+
+def encode_rows(rows, format, rows_per_chunk=500):
+    """Yield the rows as UTF-8 bytes, a few hundred rows at a time."""
+    buffer = io.StringIO()
+    if format == 'csv':
+        writer = csv.DictWriter(buffer, FIELDS, lineterminator='\n')
+        writer.writeheader()
+
+        def write(row):
+            # Fields a record does not have, and None, are left empty.
+            row = dict(row)
+            if 'ingredients' in row:
+                row['ingredients'] = INGREDIENT_SEPARATOR.join(
+                    row['ingredients'])
+            if 'standard' in row:
+                row['standard'] = 'true' if row['standard'] else 'false'
+            writer.writerow(row)
+    else:
+        def write(row):
+            buffer.write(json.dumps(row, ensure_ascii=False))
+            buffer.write('\n')
+
+    for count, row in enumerate(rows, 1):
+        write(row)
+        if count % rows_per_chunk == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def gzip_chunks(chunks):
+    """Compress a stream of byte chunks into a gzip stream as they come."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,130 @@
+"""
+Append-only change feed of the catalog.
+
+Every save or delete of a Menu, Item or Ingredient, and every change of
+the Menu.items and Item.ingredients sets, appends a Change row (see the
+receivers of menu/signals.py; import_menu_data and the archiver record
+their bulk writes themselves). Its id is the sequence number: consumers
+remember the last one they saw and ask for what came after it, through
+iter_changes() or the /api/v1/changes/ endpoint, instead of reading the
+whole catalog again.
+
+A batch is compact: the changes of one object are folded into its latest
+action, so the consumer gets the ids to fetch again (through the batch
+endpoints of menu/api.py) and the ids to drop. A change of an Item is not
+repeated for the menus listing it.
+
+To start syncing, a consumer takes latest_sequence() (or the next value
+of a request without since), reads the catalog, then follows the feed
+from that sequence. Changes made in between are delivered again, which
+is harmless as applying them is idempotent.
+
+Compaction (compact_changes, run by the compact_changes command, one of
+the MAINTENANCE_JOBS of mysite/maintenance.py) deletes the changes
+superseded by a later one of the same object. That never changes which
+objects and actions a consumer is handed.
+"""
+from django.db import transaction
+from django.db.models import Count, Max, Q
+
+from .models import Change, Ingredient, Item, Menu
+
+MODEL_NAMES = {
+    Menu: 'menu',
+    Item: 'item',
+    Ingredient: 'ingredient',
+}
+
+
+def record(model, ids, action, using='default'):
+    """Append one change of action for every id of model."""
+    Change.objects.using(using).bulk_create(
+        Change(model=MODEL_NAMES[model], object_id=pk, action=action)
+        for pk in ids
+    )
+
+
+def latest_sequence(using='default'):
+    return Change.objects.using(using).aggregate(last=Max('id'))['last'] or 0
+
+
+class ChangeBatch(object):
+    """The changes after since, folded per object.
+
+    next is the sequence to ask from for the following batch and has_more
+    tells whether there is one already.
+    """
+    def __init__(self, since, next, changes, has_more):
+        self.since = since
+        self.next = next
+        self.changes = changes
+        self.has_more = has_more
+
+    def __bool__(self):
+        return bool(self.changes)
+
+    def as_dict(self):
+        data = {}
+        for model in MODEL_NAMES.values():
+            data[model] = {Change.SAVE: [], Change.DELETE: []}
+        for (model, object_id), action in sorted(self.changes.items()):
+            data[model][action].append(object_id)
+        return {
+            'since': self.since,
+            'next': self.next,
+            'has_more': self.has_more,
+            'changes': data,
+        }
+
+
+def get_changes(since=0, limit=500, using='default'):
+    """The ChangeBatch of at most limit changes after the sequence since."""
+    rows = list(
+        Change.objects.using(using)
+        .filter(id__gt=since)
+        .order_by('id')
+        .values_list('id', 'model', 'object_id', 'action')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    changes = {}
+    for sequence, model, object_id, action in rows:
+        changes[model, object_id] = action
+    last = rows[-1][0] if rows else since
+    return ChangeBatch(since, last, changes, has_more)
+
+
+def iter_changes(since=0, batch_size=500, using='default'):
+    """Yield the ChangeBatches after since until the feed is caught up."""
+    while True:
+        batch = get_changes(since, batch_size, using)
+        if batch:
+            yield batch
+        if not batch.has_more:
+            return
+        since = batch.next
+
+
+def compact_changes(batch_size=300, using='default'):
+    """Delete superseded changes, one transaction per batch_size objects,
+    and return how many were deleted.
+    """
+    deleted = 0
+    while True:
+        with transaction.atomic(using=using):
+            groups = list(
+                Change.objects.using(using)
+                .order_by()
+                .values('model', 'object_id')
+                .annotate(last=Max('id'), count=Count('id'))
+                .filter(count__gt=1)[:batch_size]
+            )
+            if not groups:
+                return deleted
+            condition = Q()
+            for group in groups:
+                condition |= Q(
+                    model=group['model'], object_id=group['object_id'],
+                    id__lt=group['last'])
+            count, _ = Change.objects.using(using).filter(condition).delete()
+        deleted += count
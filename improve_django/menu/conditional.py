@@ -0,0 +1,84 @@
+"""
+ETag / Last-Modified validators for the menu read views.
+
+They are computed from updated_at before the view runs (see the
+@condition decorators in menu/views.py), so a request whose
+If-None-Match or If-Modified-Since still matches gets a 304 without
+rendering. Validators are cached under the current catalog version,
+which means a repeated conditional request does not touch the database.
+
+Pages differ for signed-in users (Edit buttons), so the ETags do too.
+List pages only get an ETag: a deleted or expired menu changes the page
+without moving any updated_at forward.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from .cache import get_timeout, make_key, may_fill
+from .models import Menu, Item
+
+
+def cached_validator(name, compute, *args):
+    """Return compute() cached under name and args for this version."""
+    key = make_key('validator', name, *args)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        if value is not None and may_fill():
+            cache.set(key, value, get_timeout())
+    return value
+
+
+def make_etag(request, *parts):
+    user = 'auth' if request.user.is_authenticated() else 'anon'
+    data = ':'.join([user] + [str(part) for part in parts])
+    return hashlib.md5(data.encode('utf-8')).hexdigest()
+
+
+def get_updated_at(queryset):
+    return queryset.values_list('updated_at', flat=True).first()
+
+
+def menu_last_modified(request, pk):
+    return cached_validator(
+        'menu', lambda: get_updated_at(Menu.objects.filter(pk=pk)), pk)
+
+
+def menu_etag(request, pk):
+    updated_at = menu_last_modified(request, pk)
+    if updated_at is not None:
+        return make_etag(request, 'menu', pk, updated_at.isoformat())
+
+
+def item_last_modified(request, pk):
+    return cached_validator(
+        'item', lambda: get_updated_at(Item.objects.filter(pk=pk)), pk)
+
+
+def item_etag(request, pk):
+    updated_at = item_last_modified(request, pk)
+    if updated_at is not None:
+        return make_etag(request, 'item', pk, updated_at.isoformat())
+
+
+def get_summary(queryset):
+    summary = queryset.aggregate(count=Count('pk'), last=Max('updated_at'))
+    return '{0}:{1}'.format(
+        summary['count'],
+        summary['last'].isoformat() if summary['last'] else '')
+
+
+def home_etag(request):
+    summary = cached_validator(
+        'home', lambda: get_summary(Menu.objects.active()))
+    return make_etag(request, 'home', summary)
+
+
+def item_list_etag(request):
+    summary = cached_validator(
+        'item_list', lambda: get_summary(Item.objects.all()))
+    return make_etag(
+        request, 'item_list', summary,
+        request.GET.get('cursor', ''), request.GET.get('size', ''))
@@ -1,12 +1,13 @@
 from django import forms
 
 from .models import Menu, Item, Ingredient
+from .widgets import autocomplete
 
 class MenuForm(forms.ModelForm):
     items = forms.ModelMultipleChoiceField(
         queryset=Item.objects,
         error_messages={'required': 'Please select at least one item'},
-        widget=forms.SelectMultiple(attrs={'class': 'width-100'})
+        widget=autocomplete('item_autocomplete')
     )
 
     expiration_date = forms.DateTimeField(
@@ -22,9 +23,27 @@ class ItemForm(forms.ModelForm):
     ingredients = forms.ModelMultipleChoiceField(
         queryset=Ingredient.objects,
         error_messages={'required': 'Please select at least one ingredient'},
-        widget=forms.SelectMultiple(attrs={'class': 'width-100'})
+        widget=autocomplete('ingredient_autocomplete')
     )
 
     class Meta:
         model = Item
-        exclude = ('created_date',)
\ No newline at end of file
+        exclude = ('created_date',)
+
+
+class ItemFilterForm(forms.Form):
+    """The ingredient pickers of the item filter page, which only renders
+    the chosen ingredients.
+    """
+    include = forms.ModelMultipleChoiceField(
+        queryset=Ingredient.objects,
+        required=False,
+        label='With all of',
+        widget=autocomplete('ingredient_autocomplete')
+    )
+    exclude = forms.ModelMultipleChoiceField(
+        queryset=Ingredient.objects,
+        required=False,
+        label='Without any of',
+        widget=autocomplete('ingredient_autocomplete')
+    )
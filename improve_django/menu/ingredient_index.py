@@ -0,0 +1,123 @@
+"""
+In-memory inverted index from ingredient id to the sorted ids of the items
+that use it.
+
+It is built from the Item.ingredients through table in a single query and
+answers include/exclude filters with set operations instead of one join
+per ingredient. menu/signals.py applies the changes made by this process
+to its index once their transaction commits, right after the commit
+bumped the catalog version (menu/cache.py). Changes made by other
+processes only show up as a new version, after which the index is
+rebuilt on its next use. A rolled back change reaches neither.
+"""
+import threading
+from array import array
+from bisect import bisect_left
+
+from .cache import get_version, may_fill
+from .models import Item
+
+
+class IngredientIndex(object):
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.version = None
+        self.items = {}
+        self.all_items = array('l')
+
+    def build(self):
+        through = Item.ingredients.through
+        links = through.objects.order_by('ingredient_id', 'item_id').values_list(
+            'ingredient_id', 'item_id')
+        items = {}
+        for ingredient_id, item_id in links.iterator():
+            items.setdefault(ingredient_id, array('l')).append(item_id)
+        all_items = array('l', Item.objects.order_by('pk').values_list(
+            'pk', flat=True).iterator())
+
+        self.items, self.all_items = items, all_items
+
+    def refresh(self):
+        """Rebuild the index unless it is current with the catalog version.
+
+        An index built from reads that may lag behind the version is used
+        once and built again next time.
+        """
+        version = get_version()
+        with self.lock:
+            if version != self.version:
+                self.build()
+                self.version = version if may_fill() else None
+
+    def filter(self, include=(), exclude=()):
+        """Sorted ids of the items with every include and no exclude id."""
+        self.refresh()
+        with self.lock:
+            include = sorted(
+                (self.items.get(pk, array('l')) for pk in set(include)),
+                key=len)
+            if include:
+                matches = set(include[0])
+                for item_ids in include[1:]:
+                    matches.intersection_update(item_ids)
+            else:
+                matches = set(self.all_items)
+            for pk in set(exclude):
+                matches.difference_update(self.items.get(pk, ()))
+        return sorted(matches)
+
+    # Incremental updates applied by menu/signals.py for the changes
+    # committed by this process. Each change has also bumped the catalog
+    # version, see adopt_version().
+
+    def add(self, item_id, ingredient_ids):
+        with self.lock:
+            for ingredient_id in ingredient_ids:
+                item_ids = self.items.setdefault(ingredient_id, array('l'))
+                position = bisect_left(item_ids, item_id)
+                if position == len(item_ids) or item_ids[position] != item_id:
+                    item_ids.insert(position, item_id)
+
+    def remove(self, item_id, ingredient_ids):
+        with self.lock:
+            for ingredient_id in ingredient_ids:
+                item_ids = self.items.get(ingredient_id, ())
+                position = bisect_left(item_ids, item_id)
+                if position < len(item_ids) and item_ids[position] == item_id:
+                    del item_ids[position]
+
+    def add_item(self, item_id):
+        with self.lock:
+            position = bisect_left(self.all_items, item_id)
+            if (
+                position == len(self.all_items) or
+                self.all_items[position] != item_id
+            ):
+                self.all_items.insert(position, item_id)
+
+    def remove_item(self, item_id):
+        with self.lock:
+            self.remove(item_id, list(self.items))
+            position = bisect_left(self.all_items, item_id)
+            if (
+                position < len(self.all_items) and
+                self.all_items[position] == item_id
+            ):
+                del self.all_items[position]
+
+    def remove_ingredient(self, ingredient_id):
+        with self.lock:
+            self.items.pop(ingredient_id, None)
+
+    def adopt_version(self, version):
+        """Stay current after applying the change that bumped to version.
+
+        Only when the index was current right before that bump; if another
+        process bumped in between, the index is rebuilt on its next use.
+        """
+        with self.lock:
+            if version is not None and self.version == version - 1:
+                self.version = version
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,42 @@
+"""
+Dataloader-style batching: collect the primary keys a view needs and load
+them with one query per batch (plus one per prefetched relation) instead
+of one query per object.
+"""
+
+
+class Loader(object):
+    """Loads the objects of queryset by primary key, remembering them.
+
+    Every key is read from the database at most once per Loader, so one
+    Loader can be shared by everything that renders a single request.
+    """
+    def __init__(self, queryset, batch_size=500):
+        self.queryset = queryset
+        self.batch_size = batch_size
+        self.objects = {}
+
+    def prime(self, obj):
+        self.objects[obj.pk] = obj
+
+    def load_many(self, pks):
+        """Return the objects for pks in the same order, None if missing."""
+        pks = list(pks)
+        wanted = [pk for pk in unique(pks) if pk not in self.objects]
+        for start in range(0, len(wanted), self.batch_size):
+            batch = wanted[start:start + self.batch_size]
+            found = {obj.pk: obj for obj in self.queryset.filter(pk__in=batch)}
+            for pk in batch:
+                self.objects[pk] = found.get(pk)
+        return [self.objects[pk] for pk in pks]
+
+    def load(self, pk):
+        return self.load_many([pk])[0]
+
+
+def unique(values):
+    seen = set()
+    for value in values:
+        if value not in seen:
+            seen.add(value)
+            yield value
@@ -0,0 +1,49 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from menu import archive
+
+
+class Command(BaseCommand):
+    help = ('Moves the menus expired for longer than --days, with their '
+            'items, to the archive tables in small transactions. With '
+            '--interval it keeps running, as a background worker.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=float,
+            help='Archive menus expired for longer than this; '
+                 'MENU_ARCHIVE_AFTER_DAYS by default.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--pause', type=float, default=0.1,
+            help='Seconds to wait between two batches.')
+        parser.add_argument(
+            '--interval', type=float,
+            help='Archive again every this many seconds instead of exiting.')
+        parser.add_argument(
+            '--database', default='default',
+            help='Database alias to archive on.')
+
+    def handle(self, *args, **options):
+        # SQLite allows 999 parameters in the IN () of a batch.
+        if not 1 <= options['batch_size'] <= 900:
+            raise CommandError('--batch-size must be between 1 and 900.')
+        older_than = None
+        if options['days'] is not None:
+            if options['days'] < 0:
+                raise CommandError('--days must not be negative.')
+            older_than = datetime.timedelta(days=options['days'])
+        while True:
+            started = time.time()
+            menus, links = archive.archive_expired_menus(
+                older_than, options['batch_size'], options['pause'],
+                options['database'])
+            self.stdout.write(
+                'Archived {0} menus and {1} menu items in {2:.2f}s.'.format(
+                    menus, links, time.time() - started))
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,284 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.core.urlresolvers import NoReverseMatch, reverse
+from django.db import connection
+from django.test import Client
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from accounts import urls as accounts_urls
+from menu import seeding
+from menu import urls as menu_urls
+
+# Query strings for the views that do nothing useful without one.
+QUERIES = {
+    'item_search': lambda catalog: {'q': 'item'},
+    'item_search_json': lambda catalog: {'q': 'item'},
+    'item_filter': lambda catalog: {'include': catalog['ingredients'][:1]},
+    'item_filter_json': lambda catalog: {'include': catalog['ingredients'][:1]},
+    'item_autocomplete': lambda catalog: {'q': 'Item 1'},
+    'ingredient_autocomplete': lambda catalog: {'q': 'Ingredient 1'},
+    'api_menu_batch': lambda catalog: {
+        'ids': ','.join(str(pk) for pk in catalog['menus'][:20])},
+    'api_item_batch': lambda catalog: {
+        'ids': ','.join(str(pk) for pk in catalog['items'][:50])},
+}
+# Signing out would end the session of the other signed in views.
+SKIP = {'accounts:logout'}
+# cold empties the cache before every measured request, warm measures
+# requests answered from the caches filled by the ones before.
+MODES = ('cold', 'warm')
+# Anonymous requests go through the microcache, signed in ones do not.
+VISITORS = ('anonymous', 'signed-in')
+# A cache of its own, so that emptying it leaves the shared cache of the
+# site alone and the throwaway catalog never reaches it.
+BENCH_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bench',
+    }
+}
+
+
+def get_bench_settings(directory):
+    """Settings keeping the bench requests away from the state the site
+    shares: its cache, the stamps of the maintenance jobs, which the
+    requests would otherwise run, and the metrics summed by /metrics.
+    """
+    return {
+        'CACHES': BENCH_CACHES,
+        'MAINTENANCE_INTERVAL': None,
+        'METRICS_DIR': os.path.join(directory, 'metrics'),
+    }
+
+
+def get_case(mode, visitor):
+    return '{0}-{1}'.format(mode, visitor)
+
+
+def get_url_names():
+    names = [pattern.name for pattern in menu_urls.urlpatterns]
+    names += ['accounts:' + pattern.name
+              for pattern in accounts_urls.urlpatterns]
+    return [name for name in names if name and name not in SKIP]
+
+
+def get_kwargs(name, catalog):
+    if 'menu' in name:
+        pk = catalog['menus'][0]
+    else:
+        pk = catalog['items'][0]
+    return {'pk': pk, 'format': 'csv'}
+
+
+def reverse_with(name, catalog):
+    try:
+        return reverse(name)
+    except NoReverseMatch:
+        pass
+    kwargs = get_kwargs(name, catalog)
+    # Only pass the kwargs the pattern has.
+    for keys in (['pk'], ['format']):
+        try:
+            return reverse(name, kwargs={key: kwargs[key] for key in keys})
+        except NoReverseMatch:
+            continue
+    return None
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of sorted values."""
+    index = max(0, int(round(fraction * len(values))) - 1)
+    return values[min(index, len(values) - 1)]
+
+
+class Command(BaseCommand):
+    help = ('Seeds a throwaway database and measures the latency, queries '
+            'and throughput of every named menu and accounts URL, with an '
+            'empty cache (cold) and a filled one (warm), for anonymous and '
+            'signed in visitors.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--menus', type=int, default=10)
+        parser.add_argument('--items', type=int, default=1000)
+        parser.add_argument('--ingredients', type=int, default=100)
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Measured requests per URL, after one warm-up request.')
+        parser.add_argument(
+            '--mode', choices=MODES + ('both',), default='both',
+            help='Measure with an empty cache, a filled one or both.')
+        parser.add_argument(
+            '--visitor', choices=VISITORS + ('both',), default='both',
+            help='Measure anonymous or signed in requests, or both.')
+        parser.add_argument(
+            '--output', help='Write the results to this JSON file.')
+        parser.add_argument(
+            '--baseline', help='JSON file of an earlier run to compare to.')
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Flag a URL whose p95 grew by more than this fraction over '
+                 'the baseline, or that runs more queries.')
+
+    def handle(self, *args, **options):
+        if min(options['menus'], options['items'],
+               options['ingredients'], options['requests']) < 1:
+            raise CommandError('Sizes and --requests must be at least 1.')
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as data:
+                baseline = json.load(data)
+
+        results = self.run_on_throwaway_database(options)
+        report = {
+            'dataset': {
+                'menus': options['menus'],
+                'items': options['items'],
+                'ingredients': options['ingredients'],
+            },
+            'requests': options['requests'],
+            'finished_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'results': results,
+        }
+        for case, case_results in sorted(results.items()):
+            for name, result in sorted(case_results.items()):
+                self.stdout.write(
+                    '{0:<14} {1:<28} p50 {p50_ms:8.2f} ms  '
+                    'p95 {p95_ms:8.2f} ms  p99 {p99_ms:8.2f} ms  '
+                    '{queries:5.1f} queries  {rps:8.1f} req/s'.format(
+                        case, name, **result))
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2, sort_keys=True)
+
+        if baseline is not None:
+            before = self.get_baseline_results(baseline)
+            regressions = []
+            for case, case_results in sorted(results.items()):
+                regressions += [
+                    '{0} {1}'.format(case, regression)
+                    for regression in self.compare(
+                        case_results, before.get(case, {}),
+                        options['threshold'])
+                ]
+            for regression in regressions:
+                self.stderr.write(regression)
+            if regressions:
+                raise CommandError(
+                    '{0} regressions over the baseline.'.format(
+                        len(regressions)))
+
+    def run_on_throwaway_database(self, options):
+        # A file rather than SQLite's in-memory test database, so the
+        # numbers include the disk like a deployed server.
+        directory = tempfile.mkdtemp()
+        test_settings = connection.settings_dict.setdefault('TEST', {})
+        old_test_name = test_settings.get('NAME')
+        if connection.vendor == 'sqlite':
+            test_settings['NAME'] = os.path.join(directory, 'bench.sqlite3')
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        bench_settings = override_settings(**get_bench_settings(directory))
+        bench_settings.enable()
+        try:
+            catalog = seeding.seed_catalog(
+                menus=options['menus'], items=options['items'],
+                ingredients=options['ingredients'])
+            modes = MODES if options['mode'] == 'both' else [options['mode']]
+            visitors = (
+                VISITORS if options['visitor'] == 'both'
+                else [options['visitor']])
+            return {
+                get_case(mode, visitor): self.measure(
+                    catalog, options['requests'], cold=mode == 'cold',
+                    signed_in=visitor == 'signed-in')
+                for mode in modes
+                for visitor in visitors
+            }
+        finally:
+            bench_settings.disable()
+            runner.teardown_databases(old_config)
+            test_settings['NAME'] = old_test_name
+            shutil.rmtree(directory)
+
+    def get_baseline_results(self, baseline):
+        """The results of baseline by case, whatever its version."""
+        results = baseline['results']
+        if set(results) <= set(MODES):
+            # Signed in requests only, by mode.
+            return {
+                get_case(mode, 'signed-in'): mode_results
+                for mode, mode_results in results.items()
+            }
+        cases = {get_case(mode, visitor)
+                 for mode in MODES for visitor in VISITORS}
+        if not set(results) <= cases:
+            # Signed in requests to warm caches only.
+            return {get_case('warm', 'signed-in'): results}
+        return results
+
+    def measure(self, catalog, requests, cold=False, signed_in=True):
+        """{url name: result} of requests to every URL, each with an empty
+        cache if cold, by the seeded chef if signed_in.
+        """
+        client = Client(HTTP_HOST='localhost')
+        if signed_in:
+            client.login(
+                username=seeding.CHEF_USERNAME, password=seeding.CHEF_PASSWORD)
+        results = {}
+        for name in get_url_names():
+            url = reverse_with(name, catalog)
+            if url is None:
+                self.stderr.write('Skipped {0}: unknown arguments.'.format(name))
+                continue
+            params = QUERIES.get(name, lambda catalog: {})(catalog)
+
+            client.get(url, params)
+            timings, queries, clearing = [], 0, 0.0
+            started = time.perf_counter()
+            for _ in range(requests):
+                if cold:
+                    clear_started = time.perf_counter()
+                    cache.clear()
+                    clearing += time.perf_counter() - clear_started
+                with CaptureQueriesContext(connection) as captured:
+                    request_started = time.perf_counter()
+                    response = client.get(url, params)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                    timings.append(time.perf_counter() - request_started)
+                queries += len(captured)
+            elapsed = time.perf_counter() - started - clearing
+
+            timings.sort()
+            results[name] = {
+                'status': response.status_code,
+                'p50_ms': percentile(timings, 0.50) * 1000,
+                'p95_ms': percentile(timings, 0.95) * 1000,
+                'p99_ms': percentile(timings, 0.99) * 1000,
+                'queries': queries / requests,
+                'rps': requests / elapsed,
+            }
+        return results
+
+    def compare(self, results, baseline, threshold):
+        regressions = []
+        for name, result in sorted(results.items()):
+            before = baseline.get(name)
+            if before is None:
+                continue
+            if result['p95_ms'] > before['p95_ms'] * (1 + threshold):
+                regressions.append(
+                    '{0}: p95 {1:.2f} ms, was {2:.2f} ms'.format(
+                        name, result['p95_ms'], before['p95_ms']))
+            if result['queries'] > before['queries']:
+                regressions.append(
+                    '{0}: {1:.1f} queries per request, was {2:.1f}'.format(
+                        name, result['queries'], before['queries']))
+        return regressions
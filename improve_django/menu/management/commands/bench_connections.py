@@ -0,0 +1,95 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from menu.models import Menu
+
+BACKENDS = [
+    ('plain', 'django.db.backends.sqlite3'),
+    ('pooled', 'mysite.db.pooled_sqlite3'),
+]
+
+
+class Command(BaseCommand):
+    help = ('Compares the per-request connection overhead of the plain and '
+            'the pooled SQLite backends, with threads standing in for '
+            'concurrent workers. Runs on a copy of the database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, default=4,
+            help='Concurrent threads, like the threads of a gthread worker.')
+        parser.add_argument(
+            '--requests', type=int, default=500,
+            help='Requests made by every thread.')
+        parser.add_argument(
+            '--database', default='default',
+            help='Alias of the SQLite database to copy.')
+
+    def handle(self, *args, **options):
+        if min(options['threads'], options['requests']) < 1:
+            raise CommandError('--threads and --requests must be at least 1.')
+        source = connections[options['database']]
+        if source.vendor != 'sqlite':
+            raise CommandError('Only SQLite databases can be benchmarked.')
+
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'bench.sqlite3')
+            copy = sqlite3.connect(path)
+            with source.cursor():
+                source.connection.backup(copy)
+            copy.close()
+
+            for label, engine in BACKENDS:
+                alias = 'bench_{0}'.format(label)
+                connections.databases[alias] = dict(
+                    settings.DATABASES[options['database']],
+                    ENGINE=engine, NAME=path)
+                try:
+                    timings = self.run(
+                        alias, options['threads'], options['requests'])
+                finally:
+                    connections[alias].close()
+                    del connections[alias]
+                    del connections.databases[alias]
+                self.report(label, timings)
+        finally:
+            shutil.rmtree(directory)
+
+    def run(self, alias, threads, requests):
+        timings = []
+        lock = threading.Lock()
+
+        def worker():
+            own = []
+            for _ in range(requests):
+                started = time.perf_counter()
+                # What a request does with CONN_MAX_AGE = 0: connect on the
+                # first query, close when the response is sent.
+                Menu.objects.using(alias).exists()
+                connections[alias].close()
+                own.append(time.perf_counter() - started)
+            with lock:
+                timings.extend(own)
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return sorted(timings)
+
+    def report(self, label, timings):
+        mean = sum(timings) / len(timings)
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        self.stdout.write(
+            '{0:>6}: {1} requests, mean {2:.3f} ms, p95 {3:.3f} ms'.format(
+                label, len(timings), mean * 1000, p95 * 1000))
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from menu.changes import compact_changes
+
+
+class Command(BaseCommand):
+    help = ('Deletes the changes of the change feed superseded by a later '
+            'change of the same object. With --interval it keeps running, '
+            'as a background worker.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=300,
+            help='Objects whose changes are compacted per transaction.')
+        parser.add_argument(
+            '--interval', type=float,
+            help='Compact again every this many seconds instead of exiting.')
+        parser.add_argument(
+            '--database', default='default',
+            help='Database alias of the change feed.')
+
+    def handle(self, *args, **options):
+        # Each object takes three parameters and SQLite allows 999.
+        if not 1 <= options['batch_size'] <= 300:
+            raise CommandError('--batch-size must be between 1 and 300.')
+        while True:
+            started = time.time()
+            deleted = compact_changes(
+                options['batch_size'], options['database'])
+            self.stdout.write(
+                'Deleted {0} superseded changes in {1:.2f}s.'.format(
+                    deleted, time.time() - started))
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,63 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from menu.catalog_io import (
+    FORMATS, encode_rows, guess_format, gzip_chunks, iter_export_rows)
+
+
+class Command(BaseCommand):
+    help = ('Exports every ingredient, menu and item as CSV or JSON Lines, '
+            'in the format read by import_menu_data.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='File to write, or - to write standard output.')
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Output format, guessed from the file extension by default.')
+        parser.add_argument(
+            '--gzip', action='store_true',
+            help='Compress the output with gzip.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Objects read from the database per query.')
+        parser.add_argument(
+            '--database', default='default',
+            help='Database alias to export from.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format'] or guess_format(path)
+        if format is None:
+            raise CommandError(
+                'Cannot tell the format of {0}, pass --format.'.format(path))
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+
+        started = time.time()
+        rows = 0
+
+        def count(rows_iterator):
+            nonlocal rows
+            for row in rows_iterator:
+                rows += 1
+                yield row
+
+        chunks = encode_rows(count(iter_export_rows(
+            options['chunk_size'], using=options['database'])), format)
+        if options['gzip'] or path.endswith('.gz'):
+            chunks = gzip_chunks(chunks)
+
+        output = sys.stdout.buffer if path == '-' else open(path, 'wb')
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+
+        elapsed = time.time() - started
+        self.stderr.write('Exported {0} rows in {1:.2f}s, {2:.0f} rows/s.'.format(
+            rows, elapsed, rows / max(elapsed, 1e-6)))
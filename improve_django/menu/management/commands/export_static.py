@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from menu.static_export import StaticExport
+
+
+class Command(BaseCommand):
+    help = ('Renders the public menu pages and copies the static files into '
+            'a directory a file server can serve. After the first export, '
+            'only the pages affected by the changes since the last one are '
+            'rendered again.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Render every page, not only the changed ones.')
+        parser.add_argument(
+            '--host', default='localhost',
+            help='Host name of the requests rendering the pages.')
+        parser.add_argument(
+            '--interval', type=float,
+            help='Export again every this many seconds instead of exiting.')
+
+    def handle(self, *args, **options):
+        export = StaticExport(options['directory'], options['host'])
+        full = options['full']
+        while True:
+            started = time.time()
+            written, removed, copied = export.run(full)
+            self.stdout.write(
+                'Wrote {0} pages, removed {1} and copied {2} static files '
+                'in {3:.2f}s.'.format(
+                    written, removed, copied, time.time() - started))
+            if options['interval'] is None:
+                return
+            full = False
+            time.sleep(options['interval'])
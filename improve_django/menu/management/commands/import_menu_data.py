@@ -0,0 +1,331 @@
+import datetime
+import sys
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from menu import changes, search
+from menu.cache import bump_version
+from menu.catalog_io import (
+    FORMATS, RECORD_TYPES, RowError, guess_format, open_input, read_rows)
+from menu.models import Change, Menu, Item, Ingredient
+
+TRUE_VALUES = ('1', 'true', 'yes', 'y', 't')
+
+
+class Command(BaseCommand):
+    help = ('Imports ingredients, menus and items from CSV or JSON Lines, '
+            'one record per row, in the format export_menu_data writes. '
+            'Consecutive item rows with the same id, as written for an item '
+            'on several menus, are one item.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='File to import, or - to read standard input.')
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Input format, guessed from the file extension by default.')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Rows written per transaction.')
+        parser.add_argument(
+            '--database', default='default',
+            help='Database alias to import into.')
+
+    def handle(self, *args, **options):
+        format = options['format'] or guess_format(options['path'])
+        if format is None:
+            raise CommandError(
+                'Cannot tell the format of {0}, pass --format.'.format(
+                    options['path']))
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+
+        self.verbosity = options['verbosity']
+        self.using = options['database']
+        self.connection = connections[self.using]
+        self.chefs = dict(
+            User.objects.using(self.using).values_list('username', 'pk'))
+        # Names are not unique, rows go to the newest object with the name.
+        self.ingredients = dict(
+            Ingredient.objects.using(self.using).order_by('pk')
+            .values_list('name', 'pk'))
+        # Items name their menu by the id of its record in the file, or by
+        # season: ('id', id) and ('season', season) are the keys of both.
+        self.menus = {
+            ('season', season): pk
+            for season, pk in Menu.objects.using(self.using).order_by('pk')
+            .values_list('season', 'pk')
+        }
+        # The ids of the menu records read so far.
+        self.menu_records = set()
+        self.touched_menus = set()
+        # The id of the last row and its item: the following rows with
+        # that id only add the item to their menu.
+        self.last_row_id = None
+        self.last_item = None
+
+        started = time.time()
+        imported = skipped = 0
+        stream = open_input(options['path'])
+        try:
+            batch = []
+            for line_number, row in read_rows(stream, format):
+                try:
+                    batch.append(self.clean_row(row))
+                except RowError as error:
+                    skipped += 1
+                    self.stderr.write('Line {0}: {1}'.format(
+                        line_number, error))
+                    continue
+                if len(batch) >= options['batch_size']:
+                    imported += self.write_batch(batch)
+                    batch = []
+                    self.report(imported, started)
+            if batch:
+                imported += self.write_batch(batch)
+        except RowError as error:
+            raise CommandError(str(error))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            self.finish()
+
+        elapsed = time.time() - started
+        self.stdout.write(
+            'Imported {0} items ({1} skipped) in {2:.2f}s, '
+            '{3:.0f} rows/s.'.format(
+                imported, skipped, elapsed, imported / max(elapsed, 1e-6)))
+
+    def report(self, imported, started):
+        if self.verbosity > 1:
+            elapsed = time.time() - started
+            self.stdout.write('{0} items, {1:.0f} rows/s'.format(
+                imported, imported / max(elapsed, 1e-6)))
+
+    def get_id(self, row, field):
+        value = self.get_text(row, field).strip()
+        if not value:
+            raise RowError('{0} is missing.'.format(field))
+        return value
+
+    def get_text(self, row, field):
+        """The value of field as a string, '' if missing.
+
+        JSON may hold numbers where text is expected, they are taken as
+        written; anything else is not text.
+        """
+        value = row.get(field)
+        if value is None:
+            return ''
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            raise RowError('{0} must be text, not {1}.'.format(
+                field, type(value).__name__))
+        return str(value)
+
+    def clean_row(self, row):
+        record_type = self.get_text(row, 'type').strip() or 'item'
+        if record_type not in RECORD_TYPES:
+            raise RowError('unknown record type {0!r}.'.format(record_type))
+        return dict(
+            getattr(self, 'clean_{0}'.format(record_type))(row),
+            type=record_type)
+
+    def clean_ingredient(self, row):
+        name = self.get_text(row, 'name').strip()
+        if not name:
+            raise RowError('an ingredient needs a name.')
+        return {'name': name}
+
+    def clean_menu(self, row):
+        pk = self.get_id(row, 'id')
+        if pk in self.menu_records:
+            raise RowError('menu {0!r} appears twice.'.format(pk))
+        season = self.get_text(row, 'season').strip()
+        if not season:
+            raise RowError('a menu needs a season.')
+        cleaned = {
+            'id': pk,
+            'season': season,
+            'created_date': self.parse_date(row, 'created_date'),
+            'expiration_date': self.parse_date(row, 'expiration_date'),
+        }
+        self.menu_records.add(pk)
+        return cleaned
+
+    def clean_item(self, row):
+        name = self.get_text(row, 'name').strip()
+        if not name:
+            raise RowError('an item needs a name.')
+        chef = self.get_text(row, 'chef').strip()
+        if chef not in self.chefs:
+            raise RowError('unknown chef {0!r}.'.format(chef))
+        menu = self.get_text(row, 'menu').strip()
+        if menu and menu not in self.menu_records:
+            raise RowError('unknown menu {0!r}.'.format(menu))
+
+        ingredients = row.get('ingredients') or []
+        if isinstance(ingredients, str):
+            ingredients = [ingredients]
+        if not isinstance(ingredients, list):
+            raise RowError('ingredients must be a list, not {0}.'.format(
+                type(ingredients).__name__))
+        ingredients = [
+            self.get_text({'ingredients': ingredient}, 'ingredients').strip()
+            for ingredient in ingredients
+        ]
+        standard = row.get('standard')
+        if not isinstance(standard, bool):
+            standard = str(standard or '').strip().lower() in TRUE_VALUES
+
+        return {
+            'id': self.get_text(row, 'id').strip(),
+            'menu': menu,
+            'season': self.get_text(row, 'season').strip(),
+            'expiration_date': self.parse_date(row, 'expiration_date'),
+            'created_date': self.parse_date(row, 'created_date'),
+            'name': name,
+            'description': self.get_text(row, 'description'),
+            'chef_id': self.chefs[chef],
+            'standard': standard,
+            'ingredients': sorted(set(
+                ingredient for ingredient in ingredients if ingredient)),
+        }
+
+    def parse_date(self, row, field):
+        """The value of field as an aware datetime, None if missing."""
+        value = self.get_text(row, field).strip()
+        if not value:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is None:
+            date = parse_date(value)
+            if date is None:
+                raise RowError('invalid {0} {1!r}.'.format(
+                    field.replace('_', ' '), value))
+            parsed = datetime.datetime.combine(date, datetime.time())
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+    def insert(self, model, objects):
+        """bulk_create() objects and give them the ids the database chose.
+
+        Runs in the transaction of the batch, which holds the write lock
+        from its first insert on, so the new rows are the last ones of the
+        table, in order. Backends that return the ids set them already.
+        """
+        model.objects.using(self.using).bulk_create(objects)
+        if objects and objects[0].pk is None:
+            last = model.objects.using(self.using).aggregate(
+                last=Max('pk'))['last']
+            for pk, obj in enumerate(objects, last - len(objects) + 1):
+                obj.pk = pk
+
+    def write_batch(self, rows):
+        """Write one batch of cleaned rows in a single transaction and
+        return the number of new items.
+        """
+        menus, items, ingredients = [], [], []
+        # Unsaved items have no id and cannot be hashed, hence id(item).
+        item_ingredients, menu_items = [], {}
+        new_menus, new_ingredients = {}, {}
+
+        for row in rows:
+            if row['type'] == 'ingredient':
+                name = row['name']
+                if name not in self.ingredients and name not in new_ingredients:
+                    ingredient = new_ingredients[name] = Ingredient(name=name)
+                    ingredients.append(ingredient)
+                continue
+            if row['type'] == 'menu':
+                # Never merged with a menu of the same season.
+                menu = new_menus['id', row['id']] = Menu(
+                    season=row['season'],
+                    created_date=row['created_date'] or timezone.now(),
+                    expiration_date=row['expiration_date'])
+                menus.append(menu)
+                continue
+
+            if row['id'] and row['id'] == self.last_row_id:
+                item = self.last_item
+            else:
+                item = Item(
+                    name=row['name'],
+                    description=row['description'],
+                    chef_id=row['chef_id'],
+                    standard=row['standard'],
+                    created_date=row['created_date'] or timezone.now(),
+                )
+                items.append(item)
+                self.last_row_id, self.last_item = row['id'], item
+
+                for name in row['ingredients']:
+                    if (name not in self.ingredients and
+                            name not in new_ingredients):
+                        ingredient = new_ingredients[name] = Ingredient(
+                            name=name)
+                        ingredients.append(ingredient)
+                    item_ingredients.append((item, name))
+
+            if row['menu']:
+                menu_key = ('id', row['menu'])
+            elif row['season']:
+                menu_key = ('season', row['season'])
+            else:
+                continue
+            if menu_key not in self.menus and menu_key not in new_menus:
+                menu = new_menus[menu_key] = Menu(
+                    season=row['season'],
+                    expiration_date=row['expiration_date'])
+                menus.append(menu)
+            if menu_key in self.menus:
+                self.touched_menus.add(self.menus[menu_key])
+            menu_items[menu_key, id(item)] = item
+
+        with transaction.atomic(using=self.using):
+            self.insert(Ingredient, ingredients)
+            self.insert(Menu, menus)
+            self.insert(Item, items)
+            Item.ingredients.through.objects.using(self.using).bulk_create(
+                Item.ingredients.through(
+                    item_id=item.pk,
+                    ingredient_id=(
+                        self.ingredients.get(name) or new_ingredients[name].pk))
+                for item, name in item_ingredients
+            )
+            Menu.items.through.objects.using(self.using).bulk_create(
+                Menu.items.through(
+                    menu_id=self.menus.get(menu_key) or new_menus[menu_key].pk,
+                    item_id=item.pk)
+                for (menu_key, _), item in menu_items.items()
+            )
+            search.index_items(items, using=self.connection)
+            changes.record(
+                Ingredient, [obj.pk for obj in ingredients], Change.SAVE,
+                self.using)
+            changes.record(
+                Menu, [obj.pk for obj in menus], Change.SAVE, self.using)
+            changes.record(
+                Item, [obj.pk for obj in items], Change.SAVE, self.using)
+
+        # Only remembered once the batch is committed.
+        self.ingredients.update(
+            (name, ingredient.pk) for name, ingredient in new_ingredients.items())
+        self.menus.update(
+            (menu_key, menu.pk) for menu_key, menu in new_menus.items())
+        return len(items)
+
+    def finish(self):
+        """Do what the model signals would have done for a bulk insert."""
+        if self.touched_menus:
+            Menu.objects.using(self.using).filter(
+                pk__in=self.touched_menus).update(updated_at=timezone.now())
+            changes.record(
+                Menu, sorted(self.touched_menus), Change.SAVE, self.using)
+        bump_version()
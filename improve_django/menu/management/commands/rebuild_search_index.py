@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from menu import search
+from menu.cache import bump_version
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search index of the menu items.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default='default',
+            help='Database alias to rebuild the index on.')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if not search.is_supported(connection):
+            raise CommandError(
+                'The search index is only kept on SQLite, '
+                'other databases search with LIKE.')
+
+        started = time.time()
+        with transaction.atomic(using=options['database']):
+            search.create_index(connection)
+            count = search.rebuild_index(connection)
+        # Cached search pages were built from the old index.
+        bump_version()
+
+        self.stdout.write('Indexed {0} items in {1:.2f}s.'.format(
+            count, time.time() - started))
@@ -0,0 +1,83 @@
+import argparse
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from menu import seeding
+
+
+def count_range(value):
+    """Parse N or LOW-HIGH into a (low, high) pair."""
+    try:
+        low, _, high = value.partition('-')
+        low = int(low)
+        high = int(high) if high else low
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            '{0!r} is not a number or a LOW-HIGH range.'.format(value))
+    if low < 0 or low > high:
+        raise argparse.ArgumentTypeError(
+            '{0!r} is not a valid range.'.format(value))
+    return low, high
+
+
+class Command(BaseCommand):
+    help = ('Adds a synthetic catalog of chefs, ingredients, items and '
+            'menus, written in bulk in a single transaction.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chefs', type=int, default=10)
+        parser.add_argument('--ingredients', type=int, default=1000)
+        parser.add_argument('--items', type=int, default=100000)
+        parser.add_argument('--menus', type=int, default=1000)
+        parser.add_argument(
+            '--ingredients-per-item', type=count_range, default=(2, 8),
+            help='Number or LOW-HIGH range of ingredients of every item.')
+        parser.add_argument(
+            '--items-per-menu', type=count_range, default=(5, 40),
+            help='Number or LOW-HIGH range of items on every menu.')
+        parser.add_argument(
+            '--expired-ratio', type=float, default=0.5,
+            help='Share of the menus that have already expired.')
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Random seed; the same seed gives the same links.')
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Rows per INSERT batch.')
+        parser.add_argument(
+            '--no-search-index', action='store_false', dest='index_search',
+            help='Leave the full-text search index as it is.')
+        parser.add_argument(
+            '--database', default='default',
+            help='Database alias to seed.')
+
+    def handle(self, *args, **options):
+        if min(options['chefs'], options['ingredients'], options['items'],
+               options['menus'], options['batch_size']) < 1:
+            raise CommandError('Counts and --batch-size must be at least 1.')
+        if not 0 <= options['expired_ratio'] <= 1:
+            raise CommandError('--expired-ratio must be between 0 and 1.')
+
+        started = time.time()
+        catalog = seeding.seed_catalog(
+            chefs=options['chefs'],
+            ingredients=options['ingredients'],
+            items=options['items'],
+            menus=options['menus'],
+            ingredients_per_item=options['ingredients_per_item'],
+            items_per_menu=options['items_per_menu'],
+            expired_ratio=options['expired_ratio'],
+            seed=options['seed'],
+            using=options['database'],
+            batch_size=options['batch_size'],
+            index_search=options['index_search'],
+        )
+        elapsed = time.time() - started
+        rows = catalog['rows']
+        self.stdout.write(
+            'Seeded {0} menus, {1} items, {2} ingredients and {3} chefs, '
+            '{4} rows in {5:.2f}s ({6:.0f} rows/s).'.format(
+                len(catalog['menus']), len(catalog['items']),
+                len(catalog['ingredients']), len(catalog['chefs']),
+                rows, elapsed, rows / max(elapsed, 1e-6)))
@@ -0,0 +1,57 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from menu import warming
+
+LOCAL_MEMORY = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+class Command(BaseCommand):
+    help = ('Requests home, the item list and every active menu and item '
+            'page on a pool of threads, to fill the caches after a deploy. '
+            'Safe to run while the site serves traffic.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, default=4,
+            help='Pages rendered at the same time.')
+        parser.add_argument(
+            '--host', default='localhost',
+            help='Host name of the requests; the microcache is per URL.')
+        parser.add_argument(
+            '--secure', action='store_true',
+            help='Request the https:// URLs.')
+        parser.add_argument(
+            '--progress-every', type=int, default=100,
+            help='Report progress every this many pages.')
+        parser.add_argument(
+            '--database', default='default',
+            help='Database alias to list the menus and items from.')
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1 or options['progress_every'] < 1:
+            raise CommandError(
+                '--threads and --progress-every must be at least 1.')
+        if settings.CACHES['default']['BACKEND'] == LOCAL_MEMORY:
+            self.stderr.write(
+                'The local-memory cache is per process: only the database '
+                'pages are warmed for the web processes.')
+
+        paths = list(warming.get_paths(options['database']))
+        total = len(paths)
+        started = time.time()
+
+        def progress(done, failed):
+            if done % options['progress_every'] == 0 or done == total:
+                self.stdout.write('Warmed {0}/{1} pages, {2} failed.'.format(
+                    done, total, failed))
+
+        warmer = warming.Warmer(
+            options['threads'], options['host'], options['secure'])
+        failed = warmer.warm(paths, progress)
+        for path in failed:
+            self.stderr.write('Failed: {0}'.format(path))
+        self.stdout.write('Warmed {0} pages in {1:.2f}s.'.format(
+            total - len(failed), time.time() - started))
@@ -0,0 +1,194 @@
+"""
+Full-response microcache for anonymous GETs of the menu.urls views.
+
+When a popular page drops out of the cache, every request arriving before
+it is rendered again would render it too. MicrocacheMiddleware keeps the
+whole response of anonymous requests instead, gzipped, under the URL:
+
+- fresh for MICROCACHE_TIMEOUT seconds, while the catalog version (see
+  menu/cache.py) is the one it was rendered under. Saving or deleting a
+  Menu, Item or Ingredient bumps the version through the receivers of
+  menu/signals.py, which makes every entry stale.
+- stale afterwards, for MICROCACHE_STALE_TIMEOUT more seconds. One request
+  takes the lock of the URL (cache.add) and renders the page again, the
+  others are served the stale entry in the meantime.
+- on a miss, the requests that do not get the lock wait up to
+  MICROCACHE_LOCK_WAIT seconds for the one that does, rather than all
+  rendering the page. They stop waiting as soon as the lock is released
+  without a new entry, as for a 404, which is not stored.
+
+A request is anonymous when it has no session cookie: it must come before
+SessionMiddleware so a hit does not load a session. Requests carrying
+flash messages and conditional requests, which the views answer cheaply
+with a 304, always go to the view. Only 200 responses that set no cookie
+are stored, so pages with a CSRF token or a message never are.
+
+In-process callers that need the page as it is now, like the static
+export, set the BYPASS key of the WSGI environ. HTTP clients cannot:
+their headers only ever become HTTP_ keys.
+"""
+import gzip
+import hashlib
+import re
+import time
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.core.urlresolvers import Resolver404, resolve
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from . import urls as menu_urls
+from .cache import get_version, may_fill
+
+CACHED_URL_NAMES = {
+    pattern.name for pattern in menu_urls.urlpatterns if pattern.name}
+UNCACHEABLE_DIRECTIVES = re.compile(r'\b(private|no-cache|no-store)\b')
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+# Headers that describe the stored body rather than the page.
+SKIPPED_HEADERS = {'content-length', 'content-encoding', 'set-cookie'}
+POLL_INTERVAL = 0.05
+BYPASS = 'menu.microcache.bypass'
+
+HIT, STALE, MISS = 'hit', 'stale', 'miss'
+
+
+def get_timeout():
+    return getattr(settings, 'MICROCACHE_TIMEOUT', 5)
+
+
+def get_stale_timeout():
+    return getattr(settings, 'MICROCACHE_STALE_TIMEOUT', 60)
+
+
+def get_key(request):
+    url = request.build_absolute_uri().encode('utf-8')
+    return 'microcache:' + hashlib.md5(url).hexdigest()
+
+
+def is_cacheable_request(request):
+    if request.method != 'GET':
+        return False
+    if settings.SESSION_COOKIE_NAME in request.COOKIES:
+        return False
+    if CookieStorage.cookie_name in request.COOKIES:
+        return False
+    if request.META.get(BYPASS):
+        return False
+    return not (
+        'HTTP_IF_NONE_MATCH' in request.META or
+        'HTTP_IF_MODIFIED_SINCE' in request.META)
+
+
+def is_cacheable_response(response):
+    return (
+        response.status_code == 200 and
+        not response.streaming and
+        not response.cookies and
+        not UNCACHEABLE_DIRECTIVES.search(response.get('Cache-Control', '')))
+
+
+def get_state(entry, version, now):
+    """HIT, STALE or MISS for a stored entry, which may be None."""
+    if entry is None:
+        return MISS
+    age = now - entry['stored']
+    if entry['version'] == version and age <= get_timeout():
+        return HIT
+    if age <= get_timeout() + get_stale_timeout():
+        return STALE
+    return MISS
+
+
+def store(key, version, response):
+    entry = {
+        'version': version,
+        'stored': time.time(),
+        'status': response.status_code,
+        'headers': [
+            (header, value) for header, value in response.items()
+            if header.lower() not in SKIPPED_HEADERS],
+        'body': gzip.compress(response.content),
+    }
+    cache.set(key, entry, get_timeout() + get_stale_timeout())
+
+
+def build_response(request, entry, state):
+    response = HttpResponse(status=entry['status'])
+    for header, value in entry['headers']:
+        response[header] = value
+    if ACCEPTS_GZIP.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+        response.content = entry['body']
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response.content = gzip.decompress(entry['body'])
+    patch_vary_headers(response, ('Accept-Encoding',))
+    response['Content-Length'] = str(len(response.content))
+    response['X-Microcache'] = state
+    return response
+
+
+def wait_for_entry(key, lock_key, version):
+    """The entry another request is rendering, or None once it released
+    lock_key without storing one, or after the wait.
+    """
+    deadline = time.time() + getattr(settings, 'MICROCACHE_LOCK_WAIT', 2)
+    while time.time() < deadline:
+        time.sleep(POLL_INTERVAL)
+        values = cache.get_many([key, lock_key])
+        entry = values.get(key)
+        if get_state(entry, version, time.time()) == HIT:
+            return entry
+        if lock_key not in values:
+            return None
+    return None
+
+
+class MicrocacheMiddleware(object):
+    """Must come before SessionMiddleware."""
+    def process_request(self, request):
+        if not is_cacheable_request(request):
+            return None
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None
+        if match.url_name not in CACHED_URL_NAMES:
+            return None
+
+        key = get_key(request)
+        version = get_version()
+        entry = cache.get(key)
+        state = get_state(entry, version, time.time())
+        if state == HIT:
+            request.resolver_match = match
+            return build_response(request, entry, HIT)
+
+        lock_key = key + ':lock'
+        locked = cache.add(
+            lock_key, 1, getattr(settings, 'MICROCACHE_LOCK_TIMEOUT', 10))
+        if not locked:
+            if state == STALE:
+                request.resolver_match = match
+                return build_response(request, entry, STALE)
+            entry = wait_for_entry(key, lock_key, version)
+            if entry is not None:
+                request.resolver_match = match
+                return build_response(request, entry, HIT)
+        request._microcache = (key, version, lock_key if locked else None)
+        return None
+
+    def process_response(self, request, response):
+        microcache = getattr(request, '_microcache', None)
+        if microcache is None:
+            return response
+        key, version, lock_key = microcache
+        try:
+            if is_cacheable_response(response) and may_fill():
+                store(key, version, response)
+        finally:
+            if lock_key is not None:
+                cache.delete(lock_key)
+        response['X-Microcache'] = MISS
+        return response
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.9 on 2026-10-18 19:38
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0002_auto_20160406_1554'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='menu',
+            name='expiration_date',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
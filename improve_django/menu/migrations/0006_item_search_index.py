@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    # The FTS5 table only exists on SQLite, see menu/search.py.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE menu_item_fts USING fts5(name, description)')
+    schema_editor.execute(
+        'INSERT INTO menu_item_fts (rowid, name, description) '
+        'SELECT id, name, description FROM menu_item')
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE menu_item_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0005_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0006_item_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedMenu',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('season', models.CharField(max_length=20)),
+                ('created_date', models.DateTimeField()),
+                ('expiration_date', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedMenuItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_id', models.IntegerField()),
+                ('item_name', models.CharField(max_length=200)),
+                ('menu', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='menu.ArchivedMenu')),
+            ],
+            options={
+                'ordering': ['item_name', 'item_id'],
+            },
+        ),
+    ]
@@ -1,14 +1,28 @@
 from django.db import models
+from django.db.models import Q
 from django.utils import timezone
 
 
+class MenuQuerySet(models.QuerySet):
+    def active(self, now=None):
+        """Menus that have not expired yet (NULL means never expires)."""
+        if now is None:
+            now = timezone.now()
+        return self.filter(
+            Q(expiration_date__isnull=True) | Q(expiration_date__gte=now)
+        )
+
+
 class Menu(models.Model):
     season = models.CharField(max_length=20)
     items = models.ManyToManyField('Item', related_name='items')
     created_date = models.DateTimeField(
             default=timezone.now)
     expiration_date = models.DateTimeField(
-            blank=True, null=True)
+            blank=True, null=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = MenuQuerySet.as_manager()
 
     def __str__(self):
         return self.season
@@ -21,12 +35,69 @@ class Item(models.Model):
             default=timezone.now)
     standard = models.BooleanField(default=False)
     ingredients = models.ManyToManyField('Ingredient')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        # Backs the keyset pagination of the item list.
+        index_together = [('name', 'id')]
 
     def __str__(self):
         return self.name
 
 class Ingredient(models.Model):
     name = models.CharField(max_length=200)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
+
+
+# Cold storage for expired menus, filled by the archive_menus command (see
+# menu/archive.py). The archive keeps the names of the items, not links to
+# them, so reading it never touches the hot tables and deleting an item
+# later does not change an archived menu.
+
+class ArchivedMenu(models.Model):
+    # The id the menu had, so its old URL can redirect here.
+    id = models.IntegerField(primary_key=True)
+    season = models.CharField(max_length=20)
+    created_date = models.DateTimeField()
+    expiration_date = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return self.season
+
+class ArchivedMenuItem(models.Model):
+    menu = models.ForeignKey(ArchivedMenu, related_name='entries')
+    item_id = models.IntegerField()
+    item_name = models.CharField(max_length=200)
+
+    class Meta:
+        ordering = ['item_name', 'item_id']
+
+    def __str__(self):
+        return self.item_name
+
+
+# Append-only log of the writes to Menu, Item and Ingredient, see
+# menu/changes.py. The id is the sequence number consumers resume from.
+
+class Change(models.Model):
+    SAVE = 'save'
+    DELETE = 'delete'
+
+    model = models.CharField(max_length=20)
+    object_id = models.IntegerField()
+    action = models.CharField(
+        max_length=10, choices=[(SAVE, 'Save'), (DELETE, 'Delete')])
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['id']
+        # Backs the compaction, which keeps the last change per object.
+        index_together = [('model', 'object_id')]
+
+    def __str__(self):
+        return '{0} {1} {2}'.format(self.action, self.model, self.object_id)
@@ -0,0 +1,147 @@
+"""
+Keyset (cursor) pagination.
+
+Instead of an OFFSET, every page after the first is selected with a WHERE
+clause on the ordering columns of the last row of the previous page. With
+an index on those columns the database seeks straight to the page, so the
+last page costs the same as the first one.
+
+Cursors are opaque to clients: URL safe base64 of the direction and the
+ordering values of the boundary row.
+"""
+import base64
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+NEXT = 'n'
+PREVIOUS = 'p'
+# The types encode_cursor() writes the ordering values as.
+VALUE_TYPES = (str, int, float)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(direction, values):
+    data = json.dumps([direction] + list(values), separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """Return the (direction, values) pair of a cursor with size values."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(
+            base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except (ValueError, TypeError, UnicodeError):
+        raise InvalidCursor(cursor)
+
+    if (
+        not isinstance(data, list) or
+        len(data) != size + 1 or
+        data[0] not in (NEXT, PREVIOUS) or
+        not all(
+            isinstance(value, VALUE_TYPES) and not isinstance(value, bool)
+            for value in data[1:])
+    ):
+        raise InvalidCursor(cursor)
+    return data[0], data[1:]
+
+
+def keyset_filter(fields, values, lookup):
+    """Rows strictly after (lookup='gt') or before (lookup='lt') values.
+
+    The leading gte/lte term on the first column is implied by the rest but
+    it is what lets the database use an index range instead of a scan.
+    """
+    condition = Q()
+    for i, field in enumerate(fields):
+        equal = dict(zip(fields[:i], values[:i]))
+        equal['{0}__{1}'.format(field, lookup)] = values[i]
+        condition |= Q(**equal)
+    leading = {'{0}__{1}e'.format(fields[0], lookup): values[0]}
+    return Q(**leading) & condition
+
+
+def get_page_size(request, default=None):
+    """Page size from the size query parameter, capped at MAX_PAGE_SIZE."""
+    if default is None:
+        default = settings.PAGE_SIZE
+    try:
+        size = int(request.GET.get('size', default))
+    except ValueError:
+        size = default
+    return max(1, min(size, settings.MAX_PAGE_SIZE))
+
+
+class KeysetPage(object):
+    def __init__(self, object_list, fields, has_next, has_previous):
+        self.object_list = object_list
+        self.fields = fields
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def _cursor(self, direction, obj):
+        return encode_cursor(
+            direction, [getattr(obj, field) for field in self.fields])
+
+    @property
+    def next_cursor(self):
+        if self.has_next and self.object_list:
+            return self._cursor(NEXT, self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous and self.object_list:
+            return self._cursor(PREVIOUS, self.object_list[0])
+
+
+def paginate(queryset, fields, cursor=None, size=None):
+    """Return the KeysetPage of queryset ordered by fields after cursor.
+
+    fields must be unique together (end with 'pk') and their values JSON
+    serializable. Raises InvalidCursor for a cursor that was not produced
+    by a KeysetPage over the same fields.
+    """
+    if size is None:
+        size = settings.PAGE_SIZE
+
+    if cursor:
+        direction, values = decode_cursor(cursor, len(fields))
+        lookup = 'gt' if direction == NEXT else 'lt'
+        try:
+            # Values of the wrong type for their field, such as text for
+            # the id, fail here.
+            condition = keyset_filter(fields, values, lookup)
+            queryset = queryset.filter(condition)
+        except (ValueError, TypeError, ValidationError):
+            raise InvalidCursor(cursor)
+    else:
+        direction, values = NEXT, None
+
+    if direction == NEXT:
+        queryset = queryset.order_by(*fields)
+        rows = list(queryset[:size + 1])
+        return KeysetPage(
+            rows[:size], fields,
+            has_next=len(rows) > size,
+            has_previous=values is not None
+        )
+
+    queryset = queryset.order_by(*['-' + field for field in fields])
+    rows = list(queryset[:size + 1])
+    return KeysetPage(
+        rows[:size][::-1], fields,
+        has_next=True,
+        has_previous=len(rows) > size
+    )
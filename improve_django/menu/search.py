@@ -0,0 +1,140 @@
+"""
+Full-text search over Item.name and Item.description.
+
+On SQLite the items are mirrored into an FTS5 virtual table (created by
+migration 0006) whose rowid is the item id. menu/signals.py keeps it in
+sync on every Item save and delete, and the rebuild_search_index command
+refills it in bulk. Other backends fall back to LIKE matching.
+"""
+import re
+from collections import namedtuple
+
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Item
+
+TABLE = 'menu_item_fts'
+
+# Control characters cannot come from user text, so they are used to mark
+# the matches and turned into <mark> tags after escaping.
+START, END = '\x02', '\x03'
+
+SearchResult = namedtuple('SearchResult', ['pk', 'name', 'snippet'])
+
+
+def is_supported(using=connection):
+    return using.vendor == 'sqlite'
+
+
+def create_index(using=connection):
+    with using.cursor() as cursor:
+        cursor.execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS {0} '
+            'USING fts5(name, description)'.format(TABLE))
+
+
+def rebuild_index(using=connection):
+    """Refill the whole index from menu_item and return its row count."""
+    with using.cursor() as cursor:
+        cursor.execute('DELETE FROM {0}'.format(TABLE))
+        cursor.execute(
+            'INSERT INTO {0} (rowid, name, description) '
+            'SELECT id, name, description FROM {1}'.format(
+                TABLE, Item._meta.db_table))
+        cursor.execute(
+            "INSERT INTO {0} ({0}) VALUES ('optimize')".format(TABLE))
+        cursor.execute('SELECT COUNT(*) FROM {0}'.format(TABLE))
+        return cursor.fetchone()[0]
+
+
+def index_items(items, using=connection):
+    if not is_supported(using):
+        return
+    items = list(items)
+    remove_items([item.pk for item in items], using=using)
+    with using.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO {0} (rowid, name, description) VALUES (%s, %s, %s)'
+            .format(TABLE),
+            [(item.pk, item.name, item.description) for item in items])
+
+
+def remove_items(pks, using=connection):
+    if not is_supported(using):
+        return
+    with using.cursor() as cursor:
+        cursor.executemany(
+            'DELETE FROM {0} WHERE rowid = %s'.format(TABLE),
+            [(pk,) for pk in pks])
+
+
+def get_terms(query):
+    return re.findall(r'\w+', query, re.UNICODE)[:10]
+
+
+def highlight(text):
+    """Escape text and turn the match markers into <mark> tags."""
+    text = escape(text)
+    return mark_safe(text.replace(START, '<mark>').replace(END, '</mark>'))
+
+
+def search(query, page=1, size=20, using=connection):
+    """Return (results, has_next) for the ranked matches of query."""
+    terms = get_terms(query)
+    if not terms:
+        return [], False
+    offset = (page - 1) * size
+
+    if is_supported(using):
+        rows = _search_fts(terms, offset, size + 1, using)
+    else:
+        rows = _search_like(terms, offset, size + 1)
+
+    results = [
+        SearchResult(pk, highlight(name), highlight(snippet))
+        for pk, name, snippet in rows[:size]
+    ]
+    return results, len(rows) > size
+
+
+def _search_fts(terms, offset, limit, using):
+    # Every term is quoted, so no FTS5 operator can be injected, and made a
+    # prefix query so that results show up while the guest is typing.
+    match = ' '.join('"{0}"*'.format(term) for term in terms)
+    with using.cursor() as cursor:
+        cursor.execute(
+            'SELECT rowid, '
+            'highlight({0}, 0, %s, %s), '
+            "snippet({0}, 1, %s, %s, '...', 16) "
+            'FROM {0} WHERE {0} MATCH %s '
+            # Matches in the name weigh ten times more than in the
+            # description; bm25() is lower for better matches.
+            'ORDER BY bm25({0}, 10.0, 1.0), rowid '
+            'LIMIT %s OFFSET %s'.format(TABLE),
+            [START, END, START, END, match, limit, offset])
+        return cursor.fetchall()
+
+
+def _search_like(terms, offset, limit):
+    condition = Q()
+    for term in terms:
+        condition &= Q(name__icontains=term) | Q(description__icontains=term)
+    items = (
+        Item.objects.filter(condition)
+        .order_by('name', 'pk')
+        .values_list('pk', 'name', 'description')[offset:offset + limit]
+    )
+    pattern = re.compile(
+        '({0})'.format('|'.join(re.escape(term) for term in terms)),
+        re.IGNORECASE)
+
+    def mark(text):
+        return pattern.sub(START + r'\1' + END, text)
+
+    return [
+        (pk, mark(name), mark(description[:200]))
+        for pk, name, description in items
+    ]
@@ -0,0 +1,206 @@
+"""
+Synthetic catalogs for benchmarks and large test databases.
+
+seed_catalog() writes chefs, ingredients, items and menus, and the
+Item.ingredients and Menu.items through tables, in one transaction. Rows
+are generated lazily as plain tuples and inserted with executemany() in
+batches, skipping model instances altogether: on SQLite that writes
+about a million rows in a few seconds. The database chooses the ids, as
+for any other insert, so the ids of deleted or archived rows never come
+back, and the links are deterministic for a given seed.
+
+Like every bulk insert this bypasses the model signals, so the rows are
+recorded in the change feed here, and the search index and the catalog
+version are refreshed at the end.
+"""
+import datetime
+import itertools
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import changes, search
+from .cache import bump_version
+from .models import Change, Menu, Item, Ingredient
+
+CHEF_USERNAME = 'bench-chef'
+CHEF_PASSWORD = 'bench-chef'
+
+
+def get_chef(using='default'):
+    chef = User.objects.using(using).filter(username=CHEF_USERNAME).first()
+    if chef is None:
+        chef = User.objects.db_manager(using).create_user(
+            CHEF_USERNAME, 'chef@example.com', CHEF_PASSWORD)
+    return chef
+
+
+def get_chef_ids(count, using='default'):
+    """The ids of count chefs, the first being get_chef(), created unless
+    an earlier catalog did already.
+    """
+    usernames = ['{0}-{1}'.format(CHEF_USERNAME, number)
+                 for number in range(2, count + 1)]
+    existing = set(
+        User.objects.using(using).filter(username__in=usernames)
+        .values_list('username', flat=True))
+    missing = [username for username in usernames if username not in existing]
+    if missing:
+        # Hashing is slow on purpose, so every chef shares one hash.
+        password = make_password(CHEF_PASSWORD)
+        now = adapt_datetime(timezone.now(), using)
+        insert_rows(User, [
+            'username', 'password', 'email', 'first_name', 'last_name',
+            'is_superuser', 'is_staff', 'is_active', 'date_joined',
+        ], (
+            (username, password, '{0}@example.com'.format(username), '', '',
+             False, False, True, now)
+            for username in missing
+        ), using)
+    ids = dict(
+        User.objects.using(using).filter(username__in=usernames)
+        .values_list('username', 'pk'))
+    return [get_chef(using).pk] + [ids[username] for username in usernames]
+
+
+def insert_rows(model, columns, rows, using='default', batch_size=5000):
+    """INSERT the tuples of rows into the table of model, in batches.
+
+    Values go to the database as they are, so they must already be in
+    its format: see adapt_datetime().
+    """
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    sql = 'INSERT INTO {0} ({1}) VALUES ({2})'.format(
+        quote(model._meta.db_table),
+        ', '.join(quote(column) for column in columns),
+        ', '.join(['%s'] * len(columns)))
+    count = 0
+    rows = iter(rows)
+    with connection.cursor() as cursor:
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                return count
+            cursor.executemany(sql, batch)
+            count += len(batch)
+
+
+def get_inserted_ids(model, count, using='default'):
+    """The ids the database gave the count rows just inserted into model.
+
+    To be called in the transaction of the insert, which holds the write
+    lock from its first insert on, so the new rows are the last ones of
+    the table, in order.
+    """
+    if not count:
+        return []
+    last = model.objects.using(using).aggregate(last=Max('pk'))['last']
+    return list(range(last - count + 1, last + 1))
+
+
+def adapt_datetime(value, using='default'):
+    return connections[using].ops.adapt_datetimefield_value(value)
+
+
+def get_range(value):
+    """(low, high) from an int or a (low, high) pair."""
+    if isinstance(value, int):
+        return value, value
+    low, high = value
+    if low > high or low < 0:
+        raise ValueError('Invalid range {0}-{1}.'.format(low, high))
+    return low, high
+
+
+def seed_catalog(menus=10, items=1000, ingredients=100, chefs=1,
+                 ingredients_per_item=3, items_per_menu=20,
+                 expired_ratio=0.0, seed=0, using='default',
+                 batch_size=5000, index_search=True):
+    """Add a catalog of the given size and return the ids it created,
+    with the number of rows written under 'rows'.
+
+    ingredients_per_item and items_per_menu take a number or a
+    (low, high) range to draw from uniformly. expired_ratio is the share
+    of menus whose expiration date has already passed.
+    """
+    rng = random.Random(seed)
+    moment = timezone.now()
+    now = adapt_datetime(moment, using)
+    ingredients_per_item = get_range(ingredients_per_item)
+    items_per_menu = get_range(items_per_menu)
+    if not 0 <= expired_ratio <= 1:
+        raise ValueError('expired_ratio must be between 0 and 1.')
+
+    written = [0]
+
+    def insert(model, columns, rows):
+        written[0] += insert_rows(model, columns, rows, using, batch_size)
+
+    def insert_objects(model, columns, rows):
+        """Insert rows, record them in the change feed, return their ids."""
+        count = insert_rows(model, columns, rows, using, batch_size)
+        written[0] += count
+        ids = get_inserted_ids(model, count, using)
+        insert(Change, ['model', 'object_id', 'action', 'created_at'], (
+            (changes.MODEL_NAMES[model], pk, Change.SAVE, now) for pk in ids))
+        return ids
+
+    with transaction.atomic(using=using):
+        chef_ids = get_chef_ids(chefs, using)
+
+        ingredient_ids = insert_objects(
+            Ingredient, ['name', 'updated_at'], (
+                ('Ingredient {0}'.format(number), now)
+                for number in range(1, ingredients + 1)))
+        item_ids = insert_objects(Item, [
+            'name', 'description', 'chef_id', 'created_date', 'standard',
+            'updated_at',
+        ], (
+            ('Item {0}'.format(number),
+             'Seeded item number {0}'.format(number),
+             chef_ids[number % len(chef_ids)], now, number % 2 == 0, now)
+            for number in range(1, items + 1)
+        ))
+        expired = int(round(menus * expired_ratio))
+        menu_ids = insert_objects(Menu, [
+            'season', 'created_date', 'expiration_date', 'updated_at',
+        ], (
+            ('Season {0}'.format(i + 1), now,
+             adapt_datetime(moment + datetime.timedelta(
+                 days=-1 - i if i < expired else 30 + i), using),
+             now)
+            for i in range(menus)
+        ))
+
+        def links(owner_ids, target_ids, count_range):
+            if not target_ids:
+                return
+            low, high = count_range
+            for owner_id in owner_ids:
+                count = min(rng.randint(low, high), len(target_ids))
+                for target_id in rng.sample(target_ids, count):
+                    yield owner_id, target_id
+
+        insert(Item.ingredients.through, ['item_id', 'ingredient_id'],
+               links(item_ids, ingredient_ids, ingredients_per_item))
+        insert(Menu.items.through, ['menu_id', 'item_id'],
+               links(menu_ids, item_ids, items_per_menu))
+
+        connection = connections[using]
+        if index_search and search.is_supported(connection):
+            search.create_index(connection)
+            search.rebuild_index(connection)
+
+    bump_version()
+    return {
+        'chefs': chef_ids,
+        'menus': menu_ids,
+        'items': item_ids,
+        'ingredients': ingredient_ids,
+        'rows': written[0],
+    }
@@ -0,0 +1,190 @@
+from django.db import connections, transaction
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import changes, search
+from .cache import bump_version, peek_version
+from .ingredient_index import ingredient_index
+from .models import Change, Menu, Item, Ingredient
+
+
+# updated_at touches. A page shows its object plus the names of related
+# objects, so those changes are carried over to updated_at of the object
+# the page is about.
+
+def touch(queryset):
+    queryset.update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Item)
+@receiver(pre_delete, sender=Item)
+def touch_menus_of_item(sender, instance, **kwargs):
+    touch(Menu.objects.filter(items=instance))
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def touch_items_of_ingredient(sender, instance, **kwargs):
+    touch(Item.objects.filter(ingredients=instance))
+
+
+@receiver(m2m_changed, sender=Menu.items.through)
+@receiver(m2m_changed, sender=Item.ingredients.through)
+def touch_on_m2m_change(sender, instance, action, reverse, model, pk_set,
+                        **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            touch(type(instance).objects.filter(pk=instance.pk))
+        return
+
+    # instance is on the reverse side (an Item for Menu.items, an
+    # Ingredient for Item.ingredients) and model is the touched one.
+    field = 'items' if sender is Menu.items.through else 'ingredients'
+    if action in ('post_add', 'post_remove'):
+        touch(model.objects.filter(pk__in=pk_set))
+    elif action == 'pre_clear':
+        touch(model.objects.filter(**{field: instance}))
+
+
+# Full-text search index, see menu/search.py
+
+@receiver(post_save, sender=Item)
+def index_item(sender, instance, using, **kwargs):
+    search.index_items([instance], using=connections[using])
+
+
+@receiver(post_delete, sender=Item)
+def remove_item_from_index(sender, instance, using, **kwargs):
+    search.remove_items([instance.pk], using=connections[using])
+
+
+# Change feed, see menu/changes.py
+
+@receiver(post_save, sender=Menu)
+@receiver(post_save, sender=Item)
+@receiver(post_save, sender=Ingredient)
+def record_save(sender, instance, using, **kwargs):
+    changes.record(sender, [instance.pk], Change.SAVE, using)
+
+
+@receiver(post_delete, sender=Menu)
+@receiver(post_delete, sender=Item)
+@receiver(post_delete, sender=Ingredient)
+def record_delete(sender, instance, using, **kwargs):
+    changes.record(sender, [instance.pk], Change.DELETE, using)
+
+
+@receiver(m2m_changed, sender=Menu.items.through)
+@receiver(m2m_changed, sender=Item.ingredients.through)
+def record_m2m_change(sender, instance, action, reverse, model, pk_set,
+                      using, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            changes.record(type(instance), [instance.pk], Change.SAVE, using)
+        return
+
+    # The changed objects are on the other side, as for the touches.
+    if action == 'pre_clear':
+        field = 'items' if sender is Menu.items.through else 'ingredients'
+        instance._changed_pks = list(
+            model.objects.filter(**{field: instance})
+            .values_list('pk', flat=True))
+        return
+    if action == 'post_clear':
+        pk_set = instance.__dict__.pop('_changed_pks', ())
+    elif action not in ('post_add', 'post_remove'):
+        return
+    changes.record(model, sorted(pk_set), Change.SAVE, using)
+
+
+# Cache invalidation, see menu/cache.py. The version moves once the
+# transaction of the change commits: moved before, a page rendered in
+# between from the old rows would be cached under the new version and
+# outlive the change; a rolled back change moves nothing.
+
+@receiver(post_save, sender=Menu)
+@receiver(post_save, sender=Item)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Menu)
+@receiver(post_delete, sender=Item)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_menu_cache(sender, using, **kwargs):
+    transaction.on_commit(bump_version, using=using)
+
+
+@receiver(m2m_changed, sender=Menu.items.through)
+@receiver(m2m_changed, sender=Item.ingredients.through)
+def invalidate_menu_cache_on_m2m_change(sender, action, using, **kwargs):
+    if action.startswith('post_'):
+        transaction.on_commit(bump_version, using=using)
+
+
+# Ingredient index, see menu/ingredient_index.py. Connected after the cache
+# receivers above, so that after the commit the index adopts the version
+# they just bumped. Changes are applied once their transaction commits, so
+# a rolled back one never reaches the index.
+
+def on_commit(using, *changes):
+    """Apply changes, (method, args) pairs, to the index after the commit
+    and adopt the version bumped by them.
+    """
+    def apply():
+        for method, args in changes:
+            method(*args)
+        ingredient_index.adopt_version(peek_version())
+
+    transaction.on_commit(apply, using=using)
+
+
+@receiver(post_save, sender=Menu)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Menu)
+@receiver(m2m_changed, sender=Menu.items.through)
+def keep_ingredient_index_current(sender, using, **kwargs):
+    if kwargs.get('action', 'post_').startswith('post_'):
+        on_commit(using)
+
+
+@receiver(post_save, sender=Item)
+def add_item_to_ingredient_index(sender, instance, created, using, **kwargs):
+    if created:
+        on_commit(using, (ingredient_index.add_item, [instance.pk]))
+    else:
+        on_commit(using)
+
+
+@receiver(post_delete, sender=Item)
+def remove_item_from_ingredient_index(sender, instance, using, **kwargs):
+    on_commit(using, (ingredient_index.remove_item, [instance.pk]))
+
+
+@receiver(post_delete, sender=Ingredient)
+def remove_ingredient_from_ingredient_index(sender, instance, using, **kwargs):
+    on_commit(using, (ingredient_index.remove_ingredient, [instance.pk]))
+
+
+@receiver(m2m_changed, sender=Item.ingredients.through)
+def update_ingredient_index(sender, instance, action, reverse, pk_set, using,
+                            **kwargs):
+    if action == 'pre_clear':
+        # The links are gone by post_clear, so remember them now.
+        related = instance.item_set if reverse else instance.ingredients
+        instance._cleared_pks = list(related.values_list('pk', flat=True))
+        return
+    if not action.startswith('post_'):
+        return
+
+    if action == 'post_clear':
+        pk_set = instance.__dict__.pop('_cleared_pks', ())
+        action = 'post_remove'
+    apply = (
+        ingredient_index.add if action == 'post_add'
+        else ingredient_index.remove
+    )
+    if reverse:
+        on_commit(using, *[
+            (apply, [item_id, [instance.pk]]) for item_id in pk_set])
+    else:
+        on_commit(using, (apply, [instance.pk, list(pk_set)]))
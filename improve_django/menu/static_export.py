@@ -0,0 +1,245 @@
+"""
+Static export of the public menu pages.
+
+StaticExport renders home, the first item list page and every menu and
+item page into a directory, each as the index.html of its URL (/menu/1/ is
+menu/1/index.html), and copies the static files under STATIC_URL. Any
+file server that answers a directory with its index.html can serve the
+tree. Later item list pages, which are picked by a ?cursor=, are left to
+the site: the exported first page has no Previous/Next links, which a
+file server would answer with the first page again.
+
+The first export writes every page. It also writes a manifest holding the
+sequence of the change feed (menu/changes.py) it started from and the
+objects every menu and item page shows. A later export renders only the
+pages affected by the changes made since then:
+
+- the page of a changed menu or item, removed if it no longer answers 200,
+- the pages showing a changed object: menus listing an item and items
+  listing an ingredient,
+- home and the item list, which show a bit of everything and change when
+  a menu expires, on every run.
+
+Pages are requested with the BYPASS key of menu/microcache.py set, so
+the microcache never hands over a page rendered before the changes, and
+the STATIC_EXPORT key of menu/views.py.
+"""
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.urlresolvers import reverse
+from django.test import Client
+
+from . import changes, microcache, views
+from .models import Ingredient, Item, Menu
+
+MANIFEST = '.export-manifest.json'
+# Ids per IN () clause, below the 999 parameters of SQLite.
+CHUNK_SIZE = 500
+IGNORED_STATIC_PATTERNS = ['CVS', '.*', '*~']
+MODELS = {name: model for model, name in changes.MODEL_NAMES.items()}
+
+
+def get_key(model, pk):
+    return '{0}:{1}'.format(changes.MODEL_NAMES[model], pk)
+
+
+def split_key(key):
+    name, pk = key.split(':')
+    return MODELS[name], int(pk)
+
+
+def menu_path(pk):
+    return reverse('menu_detail', kwargs={'pk': pk})
+
+
+def item_path(pk):
+    return reverse('item_detail', kwargs={'pk': pk})
+
+
+def get_path(key):
+    """The page of the object of key, None if it has none of its own."""
+    model, pk = split_key(key)
+    if model is Menu:
+        return menu_path(pk)
+    if model is Item:
+        return item_path(pk)
+    return None
+
+
+def get_file(directory, path):
+    return os.path.join(directory, path.strip('/'), 'index.html')
+
+
+def chunks(values):
+    values = sorted(values)
+    for start in range(0, len(values), CHUNK_SIZE):
+        yield values[start:start + CHUNK_SIZE]
+
+
+def get_dependencies(menu_ids, item_ids):
+    """{path: keys of the objects it shows} of the menu and item pages."""
+    dependencies = {}
+    for pk in menu_ids:
+        dependencies[menu_path(pk)] = [get_key(Menu, pk)]
+    for pk in item_ids:
+        dependencies[item_path(pk)] = [get_key(Item, pk)]
+    for ids in chunks(menu_ids):
+        links = Menu.items.through.objects.filter(
+            menu_id__in=ids).values_list('menu_id', 'item_id')
+        for menu_id, item_id in links:
+            dependencies[menu_path(menu_id)].append(get_key(Item, item_id))
+    for ids in chunks(item_ids):
+        links = Item.ingredients.through.objects.filter(
+            item_id__in=ids).values_list('item_id', 'ingredient_id')
+        for item_id, ingredient_id in links:
+            dependencies[item_path(item_id)].append(
+                get_key(Ingredient, ingredient_id))
+    return dependencies
+
+
+def read_manifest(directory):
+    try:
+        filename = os.path.join(directory, MANIFEST)
+        with open(filename, encoding='utf-8') as data:
+            return json.load(data)
+    except (OSError, ValueError):
+        return None
+
+
+def write_file(filename, content):
+    """Replace filename at once, so it is never served half written."""
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(filename))
+    with os.fdopen(descriptor, 'wb') as output:
+        output.write(content)
+    os.chmod(temporary, 0o644)
+    os.replace(temporary, filename)
+
+
+def remove_file(directory, filename):
+    """Remove filename and the directories it leaves empty."""
+    try:
+        os.remove(filename)
+    except FileNotFoundError:
+        return
+    parent = os.path.dirname(filename)
+    while parent != directory:
+        try:
+            os.rmdir(parent)
+        except OSError:
+            return
+        parent = os.path.dirname(parent)
+
+
+def copy_static_files(directory):
+    """Copy the static files that changed and return how many were."""
+    root = os.path.join(directory, settings.STATIC_URL.strip('/'))
+    copied = 0
+    seen = set()
+    for finder in finders.get_finders():
+        for path, storage in finder.list(IGNORED_STATIC_PATTERNS):
+            # The first finder with a path wins, as in collectstatic.
+            if path in seen:
+                continue
+            seen.add(path)
+            source = storage.path(path)
+            target = os.path.join(root, path)
+            try:
+                target_stat = os.stat(target)
+            except FileNotFoundError:
+                pass
+            else:
+                source_stat = os.stat(source)
+                if (target_stat.st_size == source_stat.st_size and
+                        target_stat.st_mtime >= source_stat.st_mtime):
+                    continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(source, target)
+            copied += 1
+    return copied
+
+
+class StaticExport(object):
+    """Renders the public pages into directory, see the module docstring."""
+    def __init__(self, directory, host='localhost'):
+        self.directory = os.path.abspath(directory)
+        self.client = Client(HTTP_HOST=host)
+
+    def get_pages(self, manifest, full=False):
+        """{path: key of the object of the page} of the pages to render,
+        and the dependencies of the pages that are not.
+        """
+        pages = {reverse('home'): None, reverse('item_list'): None}
+        if manifest is None or full:
+            keys = [get_key(Menu, pk) for pk in
+                    Menu.objects.values_list('pk', flat=True)]
+            keys += [get_key(Item, pk) for pk in
+                     Item.objects.values_list('pk', flat=True)]
+            # Rendered again too, so the pages of deleted objects go.
+            if manifest is not None:
+                keys += [shown[0] for shown in manifest['pages'].values()]
+            dependencies = {}
+        else:
+            keys = set()
+            for batch in changes.iter_changes(manifest['sequence']):
+                keys.update(
+                    '{0}:{1}'.format(model, object_id)
+                    for model, object_id in batch.changes)
+            dependencies = manifest['pages']
+            for path, shown in dependencies.items():
+                if keys.intersection(shown):
+                    # The object of the page comes first.
+                    pages[path] = shown[0]
+        for key in keys:
+            path = get_path(key)
+            if path is not None:
+                pages[path] = key
+        return pages, dependencies
+
+    def render(self, path):
+        """The content of path, or None when it is not a 200 page."""
+        response = self.client.get(
+            path, **{microcache.BYPASS: True, views.STATIC_EXPORT: True})
+        if response.status_code != 200:
+            return None
+        return response.content
+
+    def run(self, full=False):
+        """Export and return (pages written, pages removed, static files
+        copied).
+        """
+        manifest = read_manifest(self.directory)
+        # Taken first: a change made while rendering is rendered again by
+        # the next run.
+        sequence = changes.latest_sequence()
+        pages, dependencies = self.get_pages(manifest, full)
+
+        written = removed = 0
+        ids = {Menu: [], Item: []}
+        for path, key in sorted(pages.items()):
+            filename = get_file(self.directory, path)
+            content = self.render(path)
+            dependencies.pop(path, None)
+            if content is None:
+                if os.path.exists(filename):
+                    remove_file(self.directory, filename)
+                    removed += 1
+                continue
+            write_file(filename, content)
+            written += 1
+            if key is not None:
+                model, pk = split_key(key)
+                ids[model].append(pk)
+        dependencies.update(get_dependencies(ids[Menu], ids[Item]))
+
+        copied = copy_static_files(self.directory)
+        write_file(
+            os.path.join(self.directory, MANIFEST),
+            json.dumps({'sequence': sequence, 'pages': dependencies},
+                       sort_keys=True).encode('utf-8'))
+        return written, removed, copied
@@ -0,0 +1,58 @@
+import copy
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+
+class FixtureTestCase(TestCase):
+    '''A TestCase whose dataset is built once per class, in setUpTestData()
+
+    The rows are rolled back after every test like any TestCase, but the
+    objects setUpTestData() stored on the class would not be: every test
+    gets its own deep copy of them, so changing self.item1 in one test
+    does not leak into the next. The cache is cleared before every test
+    too, as cached pages and the catalog version outlive the rollback.
+    '''
+
+    @classmethod
+    def setUpClass(cls):
+        before = set(vars(cls))
+        super(FixtureTestCase, cls).setUpClass()
+        # cls_atomics holds the class-wide transactions and the private
+        # names the settings overridden for the class: not test data.
+        cls.fixture_names = sorted(
+            name for name in set(vars(cls)) - before - {'cls_atomics'}
+            if not name.startswith('_'))
+
+    def setUp(self):
+        cache.clear()
+        for name in self.fixture_names:
+            setattr(self, name, copy.deepcopy(getattr(type(self), name)))
+
+    def run_commit_hooks(self):
+        """Run the on_commit() callbacks, as a commit would: TestCase
+        never commits, and the cache version only moves on commits.
+        """
+        hooks, connection.run_on_commit = connection.run_on_commit, []
+        for _, hook in hooks:
+            hook()
+
+
+class QueryBudgetMixin(object):
+    '''Assertions that keep the number of queries run by a view bounded'''
+
+    def assertQueryBudget(self, budget, url, **extra):
+        """GET url and fail if the view runs more than budget queries."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, **extra)
+
+        if len(queries) > budget:
+            self.fail('{0} ran {1} queries, over its budget of {2}:\n{3}'.format(
+                url,
+                len(queries),
+                budget,
+                '\n'.join(query['sql'] for query in queries.captured_queries)
+            ))
+        return response
@@ -1,30 +1,57 @@
+import csv
 import datetime
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest import mock, skipUnless
 
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
 from django.core.urlresolvers import reverse
-from django.test import TestCase
+from django.db import (
+    DEFAULT_DB_ALIAS, DatabaseError, connection, connections, transaction)
+from django.db.models import Count
+from django.db.models.signals import post_init
+from django.test.utils import CaptureQueriesContext
+from django.test import RequestFactory, TestCase, override_settings
 from django.utils import timezone
 
-from .models import (Ingredient, Item, Menu)
-from .forms import MenuForm
+from . import (archive, catalog_io, changes, microcache, pagination, search,
+               seeding, static_export, warming)
+from .cache import bump_version, get_version
+from .ingredient_index import ingredient_index
+from .models import (ArchivedMenu, ArchivedMenuItem, Change, Ingredient,
+                     Item, Menu)
+from .forms import ItemForm, MenuForm
+from .loaders import Loader
+from .management.commands import bench
+from .pagination import keyset_filter
+from .testcases import FixtureTestCase, QueryBudgetMixin
+from mysite import db_routers
 
 
 # MODEL TEST
-class IngredientModelTestCase(TestCase):
-    def setUp(self):
-        self.ingredient1 = Ingredient.objects.create(
+class IngredientModelTestCase(FixtureTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ingredient1 = Ingredient.objects.create(
             name='Salami'
         )
 
-        self.ingredient2 = Ingredient.objects.create(
+        cls.ingredient2 = Ingredient.objects.create(
             name='Tomato'
         )
 
-        self.ingredient3 = Ingredient.objects.create(
+        cls.ingredient3 = Ingredient.objects.create(
             name='Egg'
         )
 
-        self.ingredient4 = Ingredient.objects.create(
+        cls.ingredient4 = Ingredient.objects.create(
             name='Cheddar Cheese'
         )
 
@@ -76,38 +103,38 @@ class IngredientModelTestCase(TestCase):
         self.assertEqual(expected, result)
 
 
-class ItemModelTestCase(TestCase):
-    def setUp(self):
-        self.user = User.objects.create_user('moe', 'moe@example.com', '12345')
+class ItemModelTestCase(FixtureTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('moe', 'moe@example.com', '12345')
 
-        self.ingredient1 = Ingredient.objects.create(
+        cls.ingredient1 = Ingredient.objects.create(
             name='Salami'
         )
 
-        self.ingredient2 = Ingredient.objects.create(
+        cls.ingredient2 = Ingredient.objects.create(
             name='Tomato'
         )
 
-        self.ingredient3 = Ingredient.objects.create(
+        cls.ingredient3 = Ingredient.objects.create(
             name='Egg'
         )
 
-        self.ingredient4 = Ingredient.objects.create(
+        cls.ingredient4 = Ingredient.objects.create(
             name='Cheddar Cheese'
         )
 
-        self.item1 = Item.objects.create(
+        cls.item1 = Item.objects.create(
             name='Omelette',
             description='Is a delicious stuff',
-            chef=self.user,
+            chef=cls.user,
             standard=True
         )
 
-        self.item1.ingredients.add(self.ingredient1)
-        self.item1.ingredients.add(self.ingredient2)
-        self.item1.ingredients.add(self.ingredient3)
-        self.item1.ingredients.add(self.ingredient4)
-
+        cls.item1.ingredients.add(cls.ingredient1)
+        cls.item1.ingredients.add(cls.ingredient2)
+        cls.item1.ingredients.add(cls.ingredient3)
+        cls.item1.ingredients.add(cls.ingredient4)
 
     def test_return_table_length_of_1(self):
         expected = 1
@@ -159,49 +186,49 @@ class ItemModelTestCase(TestCase):
 
 
 
-class MenuModelTestCase(TestCase):
-    def setUp(self):
-        self.user = User.objects.create_user('moe', 'moe@example.com', '12345')
+class MenuModelTestCase(FixtureTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('moe', 'moe@example.com', '12345')
 
-        self.item1 = Item.objects.create(
+        cls.item1 = Item.objects.create(
             name='Omelette',
             description='Is a delicious stuff',
-            chef=self.user,
+            chef=cls.user,
             standard=True
         )
 
-        self.item2 = Item.objects.create(
+        cls.item2 = Item.objects.create(
             name='Spaghetti',
             description='this may be a delicious stuff',
-            chef=self.user,
+            chef=cls.user,
             standard=True
         )
 
-        self.item3 = Item.objects.create(
+        cls.item3 = Item.objects.create(
             name='Steak',
             description='this could be a delicious food',
-            chef=self.user,
+            chef=cls.user,
             standard=True
         )
 
-        self.menu1 = Menu.objects.create(
+        cls.menu1 = Menu.objects.create(
             season='Menu 1',
             expiration_date=datetime.datetime(
                 2019, 8, 23,
                 tzinfo=timezone.utc)
         )
-        self.menu1.items.add(self.item1)
-        self.menu1.items.add(self.item2)
+        cls.menu1.items.add(cls.item1)
+        cls.menu1.items.add(cls.item2)
 
-        self.menu2 = Menu.objects.create(
+        cls.menu2 = Menu.objects.create(
             season='Menu 1',
             expiration_date=datetime.datetime(
                 2019, 8, 23,
                 tzinfo=timezone.utc)
         )
-        self.menu2.items.add(self.item1)
-        self.menu2.items.add(self.item3)
-
+        cls.menu2.items.add(cls.item1)
+        cls.menu2.items.add(cls.item3)
 
     def test_return_table_length_of_2(self):
         expected = 2
@@ -244,20 +271,21 @@ class MenuModelTestCase(TestCase):
 
 
 # FORM TEST
-class MenuFormTestCase(TestCase):
-    def setUp(self):
-        self.user = User.objects.create_user('moe', 'moe@example.com', '12345')
-        self.item1 = Item.objects.create(
+class MenuFormTestCase(FixtureTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('moe', 'moe@example.com', '12345')
+        cls.item1 = Item.objects.create(
             name='Omelette',
             description='Is a delicious stuff',
-            chef=self.user,
+            chef=cls.user,
             standard=True
         )
 
-        self.item2 = Item.objects.create(
+        cls.item2 = Item.objects.create(
             name='Spaghetti',
             description='this may be a delicious stuff',
-            chef=self.user,
+            chef=cls.user,
             standard=True
         )
 
@@ -341,27 +369,101 @@ class MenuFormTestCase(TestCase):
         self.assertEqual(expected, result)
 
 # VIEW TEST
-class MenuListPageTestCase(TestCase):
-    '''Tests for the Home page view'''
+class AutocompleteTestCase(FixtureTestCase):
+    '''Tests for the autocomplete endpoints and the lazy select widget'''
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('moe', 'moe@example.com', '12345')
+        for name in ['Omelette', 'Orange Juice', 'Oatmeal', 'Spaghetti']:
+            Item.objects.create(
+                name=name, description='Is a delicious stuff', chef=cls.user)
+        cls.egg = Ingredient.objects.create(name='Egg')
+        cls.oat = Ingredient.objects.create(name='Oat')
+
     def setUp(self):
-        self.menu1 = Menu.objects.create(
+        super(AutocompleteTestCase, self).setUp()
+        self.client.login(username='moe', password='12345')
+
+    def get_names(self, url_name, **params):
+        response = self.client.get(reverse(url_name), params)
+        data = response.json()
+        return [result['name'] for result in data['results']], data
+
+    def test_return_302_if_not_logged_in(self):
+        self.client.logout()
+
+        response = self.client.get(reverse('item_autocomplete'), {'q': 'o'})
+
+        self.assertEqual(302, response.status_code)
+
+    def test_return_items_starting_with_query_in_name_order(self):
+        names, _ = self.get_names('item_autocomplete', q='o')
+
+        self.assertEqual(['Oatmeal', 'Omelette', 'Orange Juice'], names)
+
+    def test_return_next_page_from_cursor(self):
+        names, data = self.get_names('item_autocomplete', q='o', size=2)
+        more, rest = self.get_names(
+            'item_autocomplete', q='o', size=2, cursor=data['next_cursor'])
+
+        self.assertEqual(['Oatmeal', 'Omelette'], names)
+        self.assertEqual(['Orange Juice'], more)
+        self.assertIsNone(rest['next_cursor'])
+
+    def test_return_ingredients_starting_with_query(self):
+        names, _ = self.get_names('ingredient_autocomplete', q='E')
+
+        self.assertEqual(['Egg'], names)
+
+    def test_return_ingredients_if_not_logged_in(self):
+        self.client.logout()
+
+        names, _ = self.get_names('ingredient_autocomplete', q='O')
+
+        self.assertEqual(['Oat'], names)
+
+    def test_return_only_selected_options_rendered(self):
+        html = ItemForm(initial={'ingredients': [self.oat.pk]}).as_p()
+
+        self.assertIn('>Oat</option>', html)
+        self.assertNotIn('>Egg</option>', html)
+        self.assertIn(reverse('ingredient_autocomplete'), html)
+
+    def test_return_submitted_ids_validated_in_one_query(self):
+        form = MenuForm({
+            'season': 'Summer',
+            'items': [str(item.pk) for item in Item.objects.all()],
+            'expiration_date': '06/12/2030'
+        })
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(form.is_valid())
+
+        self.assertEqual(1, len(queries))
+
+
+class MenuListPageTestCase(FixtureTestCase):
+    '''Tests for the Home page view'''
+    @classmethod
+    def setUpTestData(cls):
+        cls.menu1 = Menu.objects.create(
             season='Season 1'
         )
 
-        self.menu2 = Menu.objects.create(
+        cls.menu2 = Menu.objects.create(
             season='Season 2',
-            expiration_date=datetime.datetime(
-                2019, 8, 23,
-                tzinfo=timezone.utc)
+            expiration_date=timezone.now() + datetime.timedelta(days=30)
         )
 
-        self.menu3 = Menu.objects.create(
+        cls.menu3 = Menu.objects.create(
             season='Season 3',
             expiration_date=datetime.datetime(
                 2019, 4, 23,
                 tzinfo=timezone.utc)
         )
 
+    def setUp(self):
+        super(MenuListPageTestCase, self).setUp()
         self.resp = self.client.get('/')
 
     def test_return_status_okay(self):
@@ -380,23 +482,97 @@ class MenuListPageTestCase(TestCase):
     def test_return_homeHtml_as_template_used(self):
         self.assertTemplateUsed(self.resp, 'menu/home.html')
 
+    def test_return_menus_with_latest_expiration_first(self):
+        expected = ['Season 2', 'Season 1']
+
+        result = [menu.season for menu in self.resp.context['menus']]
+
+        self.assertEqual(expected, result)
+
+
+class MenuListPageExpiredMenusTestCase(FixtureTestCase):
+    '''The home page cost must not grow with the number of expired menus'''
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('moe', 'moe@example.com', '12345')
+        cls.item1 = Item.objects.create(
+            name='Omelette',
+            description='Is a delicious stuff',
+            chef=cls.user,
+            standard=True
+        )
+
+        for season in ('Season 1', 'Season 2'):
+            menu = Menu.objects.create(
+                season=season,
+                expiration_date=timezone.now() + datetime.timedelta(days=30)
+            )
+            menu.items.add(cls.item1)
+        Menu.objects.create(season='Season 3')
 
-class MenuDetailPageTestCase(TestCase):
     def setUp(self):
-        self.menu1 = Menu.objects.create(
+        super(MenuListPageExpiredMenusTestCase, self).setUp()
+        self.fetched = []
+        post_init.connect(self.count_fetched_menu, sender=Menu)
+        self.addCleanup(post_init.disconnect, self.count_fetched_menu, sender=Menu)
+
+    def count_fetched_menu(self, sender, instance, **kwargs):
+        self.fetched.append(instance)
+
+    def add_expired_menus(self, count):
+        now = timezone.now()
+        stamp = seeding.adapt_datetime(now)
+        seeding.insert_rows(
+            Menu, ['season', 'created_date', 'expiration_date', 'updated_at'],
+            (
+                ('Expired {0}'.format(i), stamp,
+                 seeding.adapt_datetime(now - datetime.timedelta(minutes=i + 1)),
+                 stamp)
+                for i in range(count)
+            )
+        )
+
+    def get_home_page(self):
+        del self.fetched[:]
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('home'))
+        return response, len(queries)
+
+    def test_return_same_query_count_and_rows_as_expired_menus_grow(self):
+        query_counts = set()
+
+        for expired in (0, 10000, 20000):
+            self.add_expired_menus(expired)
+
+            response, query_count = self.get_home_page()
+            query_counts.add(query_count)
+
+            self.assertEqual(3, len(response.context['menus']))
+            self.assertEqual(3, len(self.fetched))
+
+        self.assertEqual(1, len(query_counts))
+
+
+class MenuDetailPageTestCase(FixtureTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.menu1 = Menu.objects.create(
             season='Menu 1',
             expiration_date=datetime.datetime(
                 2019, 8, 23,
                 tzinfo=timezone.utc)
         )
 
-        self.menu2 = Menu.objects.create(
+        cls.menu2 = Menu.objects.create(
             season='Menu 2',
             expiration_date=datetime.datetime(
                 2019, 9, 21,
                 tzinfo=timezone.utc)
         )
 
+    def setUp(self):
+        super(MenuDetailPageTestCase, self).setUp()
         self.resp = self.client.get('/menu/{0}/'.format(self.menu1.pk))
 
     def test_return_status_okay(self):
@@ -427,24 +603,27 @@ class MenuDetailPageTestCase(TestCase):
         self.assertNotContains(self.resp, self.menu2.season)
 
 
-class ItemDetailPageTestCase(TestCase):
-    def setUp(self):
-        self.user = User.objects.create_user('moe', 'moe@example.com', '12345')
+class ItemDetailPageTestCase(FixtureTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('moe', 'moe@example.com', '12345')
 
-        self.item1 = Item.objects.create(
+        cls.item1 = Item.objects.create(
             name='Omelette',
             description='Is a delicious stuff',
-            chef=self.user,
+            chef=cls.user,
             standard=True
         )
 
-        self.item2 = Item.objects.create(
+        cls.item2 = Item.objects.create(
             name='Spaghetti',
             description='this may be a delicious stuff',
-            chef=self.user,
+            chef=cls.user,
             standard=True
         )
 
+    def setUp(self):
+        super(ItemDetailPageTestCase, self).setUp()
         self.resp = self.client.get('/menu/item/{0}/'.format(self.item1.pk))
 
     def test_return_status_okay(self):
@@ -475,8 +654,709 @@ class ItemDetailPageTestCase(TestCase):
         self.assertNotContains(self.resp, self.item2.name)
 
 
-class CreateNewMenuPageGETRequestTestCase(TestCase):
+class MenuPageCacheTestCase(FixtureTestCase):
+    '''Tests for the rendered-fragment cache of the menu read views'''
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('moe', 'moe@example.com', '12345')
+
+        cls.ingredient1 = Ingredient.objects.create(
+            name='Salami'
+        )
+
+        cls.item1 = Item.objects.create(
+            name='Omelette',
+            description='Is a delicious stuff',
+            chef=cls.user,
+            standard=True
+        )
+        cls.item1.ingredients.add(cls.ingredient1)
+
+        cls.item2 = Item.objects.create(
+            name='Spaghetti',
+            description='this may be a delicious stuff',
+            chef=cls.user,
+            standard=True
+        )
+
+        cls.menu1 = Menu.objects.create(
+            season='Menu 1',
+            expiration_date=timezone.now() + datetime.timedelta(days=30)
+        )
+        cls.menu1.items.add(cls.item1)
+
+        cls.page_urls = [
+            reverse('home'),
+            reverse('menu_detail', kwargs={'pk': cls.menu1.pk}),
+            reverse('item_detail', kwargs={'pk': cls.item1.pk}),
+        ]
+
+    def test_return_no_queries_when_pages_are_cached(self):
+        for url in self.page_urls:
+            self.client.get(url)
+
+            with self.assertNumQueries(0):
+                response = self.client.get(url)
+
+            self.assertEqual(200, response.status_code)
+
+    def test_return_pages_of_pinned_session_not_cached(self):
+        self.client.login(username='moe', password='12345')
+        session = self.client.session
+        session[db_routers.PINNED_UNTIL_KEY] = time.time() + 60
+        session.save()
+
+        with self.settings(REPLICA_DATABASES=['replica']):
+            self.client.get(self.page_urls[0])
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(self.page_urls[0])
+
+        self.assertTrue(any(
+            'menu_menu' in query['sql'] for query in queries.captured_queries))
+
+    def test_return_cache_invalidated_once_change_commits(self):
+        self.client.get(self.page_urls[0])
+        version = get_version()
+
+        with transaction.atomic():
+            self.menu1.season = 'Menu 2'
+            self.menu1.save()
+
+            # Pages rendered before the commit still hold the old rows.
+            self.assertEqual(version, get_version())
+        self.run_commit_hooks()
+
+        self.assertNotEqual(version, get_version())
+        self.assertContains(self.client.get(self.page_urls[0]), 'Menu 2')
+
+    def test_return_cache_kept_after_rolled_back_change(self):
+        version = get_version()
+
+        try:
+            with transaction.atomic():
+                self.menu1.delete()
+                raise DatabaseError
+        except DatabaseError:
+            pass
+        self.run_commit_hooks()
+
+        self.assertEqual(version, get_version())
+
+    def test_return_new_content_after_menu_is_saved(self):
+        self.client.get(self.page_urls[0])
+        self.client.get(self.page_urls[1])
+
+        self.menu1.season = 'Menu 2'
+        self.menu1.save()
+        self.run_commit_hooks()
+
+        self.assertContains(self.client.get(self.page_urls[0]), 'Menu 2')
+        self.assertContains(self.client.get(self.page_urls[1]), 'Menu 2')
+
+    def test_return_new_content_after_menu_items_change(self):
+        self.client.get(self.page_urls[1])
+
+        self.menu1.items.add(self.item2)
+        self.run_commit_hooks()
+
+        self.assertContains(self.client.get(self.page_urls[1]), 'Spaghetti')
+
+    def test_return_new_content_after_item_ingredients_change(self):
+        self.client.get(self.page_urls[2])
+
+        self.item1.ingredients.clear()
+        self.run_commit_hooks()
+
+        self.assertNotContains(self.client.get(self.page_urls[2]), 'Salami')
+
+    def test_return_new_content_after_ingredient_is_deleted(self):
+        self.client.get(self.page_urls[2])
+
+        self.ingredient1.delete()
+        self.run_commit_hooks()
+
+        self.assertNotContains(self.client.get(self.page_urls[2]), 'Salami')
+
+    def test_return_edit_button_only_for_signed_in_users(self):
+        for url in self.page_urls:
+            self.assertNotContains(self.client.get(url), 'btn-success')
+
+        self.client.login(username='moe', password='12345')
+
+        for url in self.page_urls:
+            self.assertContains(self.client.get(url), 'btn-success')
+
+    def test_return_home_page_without_menu_once_it_expired(self):
+        self.assertContains(self.client.get(self.page_urls[0]), 'Menu 1')
+
+        # Expiring is not a write, so no signal is sent.
+        Menu.objects.filter(pk=self.menu1.pk).update(
+            expiration_date=timezone.now() - datetime.timedelta(minutes=1))
+        self.assertContains(self.client.get(self.page_urls[0]), 'Menu 1')
+
+        later = time.time() + datetime.timedelta(days=31).total_seconds()
+        with mock.patch('menu.cache.time.time', return_value=later):
+            response = self.client.get(self.page_urls[0])
+
+        self.assertNotContains(response, 'Menu 1')
+
+
+def create_catalog(rows):
+    '''Insert rows ingredients, items and active menus.
+
+    Item n has ingredient n and menu n has item n, except for the first
+    menu which has all the items. Only the first 10 menus are
+    still active, the others expired.
+    '''
+    chef = User.objects.create_user('moe', 'moe@example.com', '12345')
+    now = timezone.now()
+    stamp = seeding.adapt_datetime(now)
+    ids = range(1, rows + 1)
+
+    seeding.insert_rows(Ingredient, ['id', 'name', 'updated_at'], (
+        (pk, 'Ingredient {0}'.format(pk), stamp) for pk in ids
+    ))
+    seeding.insert_rows(Item, [
+        'id', 'name', 'description', 'chef_id', 'created_date', 'standard',
+        'updated_at',
+    ], (
+        (pk, 'Item {0}'.format(pk), 'Item number {0}'.format(pk), chef.pk,
+         stamp, False, stamp)
+        for pk in ids
+    ))
+    seeding.insert_rows(Menu, [
+        'id', 'season', 'created_date', 'expiration_date', 'updated_at',
+    ], (
+        (pk, 'Menu {0}'.format(pk), stamp,
+         seeding.adapt_datetime(now + datetime.timedelta(days=10 - pk)), stamp)
+        for pk in ids
+    ))
+    seeding.insert_rows(Item.ingredients.through, ['item_id', 'ingredient_id'], (
+        (pk, pk) for pk in ids
+    ))
+    seeding.insert_rows(Menu.items.through, ['menu_id', 'item_id'], (
+        (pk, item_id)
+        for pk in ids
+        for item_id in (ids if pk == 1 else [pk])
+    ))
+
+
+class ViewQueryBudgetMixin(QueryBudgetMixin):
+    '''Every menu read view runs a fixed number of queries on a cold cache'''
+    # Cold cache: one validator query (ETag / Last-Modified), the catalog
+    # version bookkeeping and then the view's own queries.
+    budgets = {
+        'home': 4,
+        'menu_detail': 4,
+        'item_detail': 4,
+        'item_list': 3,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog(cls.rows)
+
+    def test_return_every_read_view_within_its_query_budget(self):
+        urls = {
+            'home': reverse('home'),
+            'menu_detail': reverse('menu_detail', kwargs={'pk': 1}),
+            'item_detail': reverse('item_detail', kwargs={'pk': 1}),
+            'item_list': reverse('item_list'),
+        }
+
+        for name, url in urls.items():
+            response = self.assertQueryBudget(self.budgets[name], url)
+
+            self.assertEqual(200, response.status_code)
+
+
+class ViewQueryBudgetWith10RowsTestCase(ViewQueryBudgetMixin, FixtureTestCase):
+    rows = 10
+
+
+class ViewQueryBudgetWith1000RowsTestCase(ViewQueryBudgetMixin, FixtureTestCase):
+    rows = 1000
+
+
+class ViewQueryBudgetWith10000RowsTestCase(ViewQueryBudgetMixin, FixtureTestCase):
+    rows = 10000
+
+
+class FixtureTestCaseTestCase(FixtureTestCase):
+    '''Tests for the data shared by the tests of a FixtureTestCase'''
+    @classmethod
+    def setUpTestData(cls):
+        cls.menu1 = Menu.objects.create(season='Menu 1')
+
+    def test_return_own_copy_of_class_data(self):
+        self.menu1.season = 'Menu 2'
+
+        self.assertIsNot(type(self).menu1, self.menu1)
+        self.assertEqual('Menu 1', type(self).menu1.season)
+
+    def test_return_class_rows_in_every_test(self):
+        Menu.objects.all().delete()
+
+        self.assertFalse(Menu.objects.exists())
+
+    def test_return_rows_restored_after_deleting_test(self):
+        self.assertEqual(['Menu 1'], list(
+            Menu.objects.values_list('season', flat=True)))
+
+
+class UpdatedAtTestCase(FixtureTestCase):
+    '''updated_at follows changes to the objects shown on a page'''
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('moe', 'moe@example.com', '12345')
+        cls.ingredient1 = Ingredient.objects.create(name='Salami')
+        cls.item1 = Item.objects.create(
+            name='Omelette',
+            description='Is a delicious stuff',
+            chef=cls.user
+        )
+        cls.menu1 = Menu.objects.create(season='Menu 1')
+        cls.long_ago = timezone.now() - datetime.timedelta(days=1)
+
+        for model in (Menu, Item, Ingredient):
+            model.objects.update(updated_at=cls.long_ago)
+
+    def assertTouched(self, obj):
+        obj.refresh_from_db()
+        self.assertGreater(obj.updated_at, self.long_ago)
+
+    def test_return_menu_touched_when_items_are_added(self):
+        self.menu1.items.add(self.item1)
+
+        self.assertTouched(self.menu1)
+
+    def test_return_menu_touched_when_item_is_added_from_item_side(self):
+        self.item1.items.add(self.menu1)
+
+        self.assertTouched(self.menu1)
+
+    def test_return_menu_touched_when_item_is_renamed(self):
+        self.menu1.items.add(self.item1)
+        Menu.objects.update(updated_at=self.long_ago)
+
+        self.item1.name = 'Scrambled Egg'
+        self.item1.save()
+
+        self.assertTouched(self.menu1)
+
+    def test_return_item_touched_when_ingredients_are_cleared(self):
+        self.item1.ingredients.add(self.ingredient1)
+        Item.objects.update(updated_at=self.long_ago)
+
+        self.ingredient1.item_set.clear()
+
+        self.assertTouched(self.item1)
+
+    def test_return_item_touched_when_ingredient_is_deleted(self):
+        self.item1.ingredients.add(self.ingredient1)
+        Item.objects.update(updated_at=self.long_ago)
+
+        self.ingredient1.delete()
+
+        self.assertTouched(self.item1)
+
+
+class MicrocacheTestCase(FixtureTestCase):
+    '''Tests for the full-response cache of anonymous menu pages'''
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('moe', 'moe@example.com', '12345')
+        cls.menu1 = Menu.objects.create(
+            season='Menu 1',
+            expiration_date=timezone.now() + datetime.timedelta(days=30)
+        )
+
+    def get_home_page(self, **extra):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('home'), **extra)
+        return response, len(queries)
+
+    def get_key(self):
+        return microcache.get_key(RequestFactory().get(reverse('home')))
+
+    def hold_lock(self):
+        cache.add(self.get_key() + ':lock', 1)
+
+    def test_return_second_anonymous_request_without_queries(self):
+        first, _ = self.get_home_page()
+        second, query_count = self.get_home_page()
+
+        self.assertEqual('miss', first['X-Microcache'])
+        self.assertEqual('hit', second['X-Microcache'])
+        self.assertEqual(0, query_count)
+        self.assertContains(second, 'Menu 1')
+
+    def test_return_gzipped_body_when_accepted(self):
+        first, _ = self.get_home_page()
+        second, _ = self.get_home_page(HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        self.assertEqual('gzip', second['Content-Encoding'])
+        self.assertEqual(first.content, gzip.decompress(second.content))
+        self.assertIn('Accept-Encoding', second['Vary'])
+
+    def test_return_signed_in_user_bypassing_cache(self):
+        self.get_home_page()
+        self.client.login(username='moe', password='12345')
+
+        response, _ = self.get_home_page()
+
+        self.assertFalse(response.has_header('X-Microcache'))
+
+    def test_return_request_with_messages_bypassing_cache(self):
+        self.get_home_page()
+        self.client.cookies['messages'] = 'pending'
+
+        response, _ = self.get_home_page()
+
+        self.assertFalse(response.has_header('X-Microcache'))
+
+    def test_return_no_cache_request_served_from_cache(self):
+        self.get_home_page()
+
+        response, _ = self.get_home_page(HTTP_CACHE_CONTROL='no-cache')
+
+        self.assertEqual('hit', response['X-Microcache'])
+
+    def test_return_bypassing_request_answered_by_view(self):
+        self.get_home_page()
+
+        response, _ = self.get_home_page(**{microcache.BYPASS: True})
+
+        self.assertFalse(response.has_header('X-Microcache'))
+
+    def test_return_conditional_request_answered_by_view(self):
+        etag = self.get_home_page()[0]['ETag']
+
+        response, _ = self.get_home_page(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(304, response.status_code)
+
+    def test_return_page_rendered_again_after_model_change(self):
+        self.get_home_page()
+        self.menu1.season = 'Menu 2'
+        self.menu1.save()
+        self.run_commit_hooks()
+
+        response, _ = self.get_home_page()
+
+        self.assertEqual('miss', response['X-Microcache'])
+        self.assertContains(response, 'Menu 2')
+
+    def test_return_stale_page_while_another_request_renders_it(self):
+        self.get_home_page()
+        self.hold_lock()
+        self.menu1.season = 'Menu 2'
+        self.menu1.save()
+        self.run_commit_hooks()
+
+        response, _ = self.get_home_page()
+
+        self.assertEqual('stale', response['X-Microcache'])
+        self.assertContains(response, 'Menu 1')
+
+    @override_settings(MICROCACHE_LOCK_WAIT=0)
+    def test_return_page_rendered_when_lock_holder_is_too_slow(self):
+        self.hold_lock()
+
+        response, _ = self.get_home_page()
+
+        self.assertEqual('miss', response['X-Microcache'])
+        self.assertContains(response, 'Menu 1')
+
+    def test_return_entry_stored_by_lock_holder_to_waiting_request(self):
+        self.get_home_page()
+        key = self.get_key()
+
+        entry = microcache.wait_for_entry(
+            key, key + ':lock', cache.get(key)['version'])
+
+        self.assertEqual(200, entry['status'])
+
+    @override_settings(MICROCACHE_LOCK_WAIT=5)
+    def test_return_no_wait_once_lock_is_released_without_entry(self):
+        key = self.get_key()
+        self.hold_lock()
+        releaser = threading.Timer(0.1, cache.delete, [key + ':lock'])
+        releaser.start()
+        self.addCleanup(releaser.join)
+        started = time.time()
+
+        entry = microcache.wait_for_entry(key, key + ':lock', get_version())
+
+        self.assertIsNone(entry)
+        self.assertLess(time.time() - started, 1)
+
+
+class ConditionalGetTestCase(FixtureTestCase):
+    '''ETag / Last-Modified support of the menu read views'''
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('moe', 'moe@example.com', '12345')
+        cls.item1 = Item.objects.create(
+            name='Omelette',
+            description='Is a delicious stuff',
+            chef=cls.user
+        )
+        cls.menu1 = Menu.objects.create(
+            season='Menu 1',
+            expiration_date=timezone.now() + datetime.timedelta(days=30)
+        )
+        cls.menu1.items.add(cls.item1)
+
+        cls.page_urls = [
+            reverse('home'),
+            reverse('item_list'),
+            reverse('menu_detail', kwargs={'pk': cls.menu1.pk}),
+            reverse('item_detail', kwargs={'pk': cls.item1.pk}),
+        ]
+
+    def test_return_304_without_rendering_if_etag_matches(self):
+        for url in self.page_urls:
+            etag = self.client.get(url)['ETag']
+
+            with self.assertNumQueries(0):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+            self.assertEqual(304, response.status_code)
+            self.assertTemplateNotUsed(response, 'layout.html')
+
+    def test_return_304_if_detail_page_not_modified_since(self):
+        for url in self.page_urls[2:]:
+            last_modified = self.client.get(url)['Last-Modified']
+
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+            self.assertEqual(304, response.status_code)
+
+    def test_return_200_after_item_is_renamed(self):
+        etags = [self.client.get(url)['ETag'] for url in self.page_urls]
+
+        self.item1.name = 'Scrambled Egg'
+        self.item1.save()
+        self.run_commit_hooks()
+
+        for url, etag in zip(self.page_urls, etags):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+            self.assertEqual(200, response.status_code)
+            self.assertContains(response, 'Scrambled Egg')
+
+    def test_return_200_after_menu_is_deleted(self):
+        etag = self.client.get(self.page_urls[0])['ETag']
+
+        self.menu1.delete()
+        self.run_commit_hooks()
+        response = self.client.get(self.page_urls[0], HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(200, response.status_code)
+
+    def test_return_different_etag_for_signed_in_user(self):
+        anonymous = [self.client.get(url)['ETag'] for url in self.page_urls]
+
+        self.client.login(username='moe', password='12345')
+        signed_in = [self.client.get(url)['ETag'] for url in self.page_urls]
+
+        for first, second in zip(anonymous, signed_in):
+            self.assertNotEqual(first, second)
+
+
+class ApiTestCase(QueryBudgetMixin, FixtureTestCase):
+    '''Tests for the read-only JSON API'''
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('moe', 'moe@example.com', '12345')
+        egg = Ingredient.objects.create(name='Egg')
+        cheese = Ingredient.objects.create(name='Cheese')
+        cls.menu = Menu.objects.create(
+            season='Summer',
+            expiration_date=timezone.now() + datetime.timedelta(days=30))
+        Menu.objects.create(
+            season='Spring',
+            expiration_date=timezone.now() - datetime.timedelta(days=1))
+        cls.items = []
+        for name in ['Omelette', 'Cheese Toast', 'Pancakes']:
+            item = Item.objects.create(
+                name=name, description='Is a delicious stuff', chef=cls.user)
+            item.ingredients.add(egg, cheese)
+            cls.items.append(item)
+        cls.menu.items.add(*cls.items)
+
     def setUp(self):
+        super(ApiTestCase, self).setUp()
+        # A stored catalog version, as the writes of a request leave it.
+        bump_version()
+
+    def get_json(self, url_name, kwargs=None, **params):
+        response = self.client.get(reverse(url_name, kwargs=kwargs), params)
+        return response, response.json()
+
+    def test_return_active_menus_with_items(self):
+        _, data = self.get_json('api_menu_list')
+
+        self.assertEqual(['Summer'], [
+            menu['season'] for menu in data['results']])
+        self.assertEqual(
+            ['Cheese Toast', 'Omelette', 'Pancakes'],
+            [item['name'] for item in data['results'][0]['items']])
+
+    def test_return_only_requested_fields(self):
+        _, data = self.get_json(
+            'api_item_detail', {'pk': self.items[0].pk}, fields='name,chef')
+
+        self.assertEqual({'name': 'Omelette', 'chef': 'moe'}, data)
+
+    def test_return_unrequested_columns_not_loaded(self):
+        self.get_json('api_item_list', fields='name')
+
+        with CaptureQueriesContext(connection) as queries:
+            self.get_json('api_item_list', fields='id')
+
+        self.assertEqual(1, len(queries))
+        self.assertNotIn('description', queries[0]['sql'])
+        self.assertNotIn('auth_user', queries[0]['sql'])
+
+    def test_return_400_for_unknown_field(self):
+        response, data = self.get_json('api_item_list', fields='name,secret')
+
+        self.assertEqual(400, response.status_code)
+        self.assertIn('secret', data['error'])
+
+    def test_return_404_for_missing_menu(self):
+        response, _ = self.get_json('api_menu_detail', {'pk': 1000})
+
+        self.assertEqual(404, response.status_code)
+
+    def test_return_fixed_query_count_for_item_list(self):
+        # The next menu expiration of the catalog version, the items with
+        # their chef, then the ingredients of the whole page.
+        self.assertQueryBudget(3, reverse('api_item_list'))
+
+    def test_return_items_paged_by_cursor(self):
+        _, first = self.get_json('api_item_list', fields='name', size=2)
+        _, second = self.get_json(
+            'api_item_list', fields='name', size=2,
+            cursor=first['next_cursor'])
+
+        self.assertEqual(
+            [{'name': 'Cheese Toast'}, {'name': 'Omelette'}], first['results'])
+        self.assertEqual([{'name': 'Pancakes'}], second['results'])
+        self.assertIsNone(second['next_cursor'])
+
+    def test_return_ingredients_in_name_order(self):
+        _, data = self.get_json('api_ingredient_list', fields='name')
+
+        self.assertEqual(
+            [{'name': 'Cheese'}, {'name': 'Egg'}], data['results'])
+
+    def test_return_cached_payload_without_queries(self):
+        url = reverse('api_menu_list')
+        self.client.get(url)
+
+        response = self.assertQueryBudget(0, url)
+
+        self.assertEqual(200, response.status_code)
+
+    def test_return_304_when_etag_matches(self):
+        url = reverse('api_menu_detail', kwargs={'pk': self.menu.pk})
+        etag = self.client.get(url)['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(304, response.status_code)
+
+    def test_return_new_payload_after_change(self):
+        url = reverse('api_menu_detail', kwargs={'pk': self.menu.pk})
+        etag = self.client.get(url)['ETag']
+        self.menu.season = 'Late Summer'
+        self.menu.save()
+        self.run_commit_hooks()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('Late Summer', response.json()['season'])
+
+
+class ApiBatchTestCase(QueryBudgetMixin, FixtureTestCase):
+    '''Tests for the batch endpoints of the JSON API and Loader'''
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('moe', 'moe@example.com', '12345')
+        egg = Ingredient.objects.create(name='Egg')
+        cls.items = []
+        for name in ['Omelette', 'Cheese Toast', 'Pancakes']:
+            item = Item.objects.create(
+                name=name, description='Is a delicious stuff', chef=cls.user)
+            item.ingredients.add(egg)
+            cls.items.append(item)
+        cls.menu = Menu.objects.create(season='Summer')
+        cls.menu.items.add(*cls.items)
+
+    def test_return_items_in_request_order_with_missing_ids(self):
+        ids = [self.items[2].pk, 1000, self.items[0].pk]
+
+        data = self.client.get(reverse('api_item_batch'), {
+            'ids': ','.join(str(pk) for pk in ids),
+            'fields': 'id,name',
+        }).json()
+
+        self.assertEqual(
+            [{'id': self.items[2].pk, 'name': 'Pancakes'},
+             {'id': self.items[0].pk, 'name': 'Omelette'}],
+            data['results'])
+        self.assertEqual([1000], data['missing'])
+
+    def test_return_one_query_per_model_and_relation(self):
+        url = '{0}?ids={1}'.format(
+            reverse('api_item_batch'),
+            ','.join(str(item.pk) for item in self.items))
+
+        # The next menu expiration of the catalog version, the items with
+        # their chef, then their ingredients.
+        self.assertQueryBudget(3, url)
+
+    def test_return_menus_by_id(self):
+        data = self.client.get(reverse('api_menu_batch'), {
+            'ids': [self.menu.pk],
+            'fields': 'season,items',
+        }).json()
+
+        self.assertEqual('Summer', data['results'][0]['season'])
+        self.assertEqual(3, len(data['results'][0]['items']))
+
+    def test_return_400_for_too_many_ids(self):
+        ids = ','.join(str(pk) for pk in range(1, 202))
+
+        response = self.client.get(reverse('api_item_batch'), {'ids': ids})
+
+        self.assertEqual(400, response.status_code)
+
+    def test_return_400_for_invalid_ids(self):
+        response = self.client.get(reverse('api_item_batch'), {'ids': '1,x'})
+
+        self.assertEqual(400, response.status_code)
+
+    def test_return_loader_reading_every_id_once(self):
+        loader = Loader(Item.objects.all(), batch_size=2)
+        pks = [item.pk for item in self.items]
+
+        with CaptureQueriesContext(connection) as queries:
+            first = loader.load_many(pks + [1000])
+            again = loader.load(pks[0])
+
+        self.assertEqual(self.items + [None], first)
+        self.assertEqual(self.items[0], again)
+        self.assertEqual(2, len(queries))
+
+
+class CreateNewMenuPageGETRequestTestCase(FixtureTestCase):
+    @classmethod
+    def setUpTestData(cls):
         User.objects.create_user('moe', 'moe@example.com', '12345')
 
     def test_return_status_okay_if_logged_in(self):
@@ -507,20 +1387,21 @@ class CreateNewMenuPageGETRequestTestCase(TestCase):
         self.assertTemplateUsed(response, 'menu/menu_create.html')
 
 
-class CreateNewMenuPagePOSTRequestTestCase(TestCase):
-    def setUp(self):
-        self.user = User.objects.create_user('moe', 'moe@example.com', '12345')
-        self.item1 = Item.objects.create(
+class CreateNewMenuPagePOSTRequestTestCase(FixtureTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('moe', 'moe@example.com', '12345')
+        cls.item1 = Item.objects.create(
             name='Omelette',
             description='Is a delicious stuff',
-            chef=self.user,
+            chef=cls.user,
             standard=True
         )
 
-        self.item2 = Item.objects.create(
+        cls.item2 = Item.objects.create(
             name='Spaghetti',
             description='this may be a delicious stuff',
-            chef=self.user,
+            chef=cls.user,
             standard=True
         )
 
@@ -620,27 +1501,28 @@ class CreateNewMenuPagePOSTRequestTestCase(TestCase):
         self.assertContains(response, expected)
 
 
-class EditMenuPageGETRequestTestCase(TestCase):
-    def setUp(self):
-        self.user = User.objects.create_user('moe', 'moe@example.com', '12345')
-        self.menu1 = Menu.objects.create(
+class EditMenuPageGETRequestTestCase(FixtureTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('moe', 'moe@example.com', '12345')
+        cls.menu1 = Menu.objects.create(
             season='Menu 1',
             expiration_date=datetime.datetime(
                 2019, 8, 23,
                 tzinfo=timezone.utc)
         )
 
-        self.item1 = Item.objects.create(
+        cls.item1 = Item.objects.create(
             name='Omelette',
             description='Is a delicious stuff',
-            chef=self.user,
+            chef=cls.user,
             standard=True
         )
 
-        self.item2 = Item.objects.create(
+        cls.item2 = Item.objects.create(
             name='Spaghetti',
             description='this may be a delicious stuff',
-            chef=self.user,
+            chef=cls.user,
             standard=True
         )
 
@@ -678,27 +1560,28 @@ class EditMenuPageGETRequestTestCase(TestCase):
         self.assertTemplateUsed(response, expected)
 
 
-class EditMenuPagePOSTRequestTestCase(TestCase):
-    def setUp(self):
-        self.user = User.objects.create_user('moe', 'moe@example.com', '12345')
-        self.menu1 = Menu.objects.create(
+class EditMenuPagePOSTRequestTestCase(FixtureTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('moe', 'moe@example.com', '12345')
+        cls.menu1 = Menu.objects.create(
             season='Menu 1',
             expiration_date=datetime.datetime(
                 2019, 8, 23,
                 tzinfo=timezone.utc)
         )
 
-        self.item1 = Item.objects.create(
+        cls.item1 = Item.objects.create(
             name='Omelette',
             description='Is a delicious stuff',
-            chef=self.user,
+            chef=cls.user,
             standard=True
         )
 
-        self.item2 = Item.objects.create(
+        cls.item2 = Item.objects.create(
             name='Spaghetti',
             description='this may be a delicious stuff',
-            chef=self.user,
+            chef=cls.user,
             standard=True
         )
 
@@ -786,23 +1669,26 @@ class EditMenuPagePOSTRequestTestCase(TestCase):
         self.assertContains(response, expected)
 
 
-class ItemListPageTestCase(TestCase):
-    def setUp(self):
-        self.user = User.objects.create_user('moe', 'moe@example.com', '12345')
-        self.item1 = Item.objects.create(
+class ItemListPageTestCase(FixtureTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('moe', 'moe@example.com', '12345')
+        cls.item1 = Item.objects.create(
             name='Omelette',
             description='Is a delicious stuff',
-            chef=self.user,
+            chef=cls.user,
             standard=True
         )
 
-        self.item2 = Item.objects.create(
+        cls.item2 = Item.objects.create(
             name='Spaghetti',
             description='this may be a delicious stuff',
-            chef=self.user,
+            chef=cls.user,
             standard=True
         )
 
+    def setUp(self):
+        super(ItemListPageTestCase, self).setUp()
         self.resp = self.client.get('/menu/item/')
 
     def test_return_status_okay(self):
@@ -822,37 +1708,1358 @@ class ItemListPageTestCase(TestCase):
         self.assertTemplateUsed(self.resp, 'menu/item_list.html')
 
 
-class EditItemPageGETRequestTestCase(TestCase):
+class ItemListPagePaginationTestCase(FixtureTestCase):
+    '''Tests for the keyset pagination of the item list'''
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('moe', 'moe@example.com', '12345')
+        # Repeated names make sure pages are split on the id as well.
+        cls.names = ['Eggs', 'Apple Pie', 'Cake', 'Cake', 'Cake', 'Bagel', 'Donut']
+        for name in cls.names:
+            Item.objects.create(
+                name=name,
+                description='Is a delicious stuff',
+                chef=cls.user
+            )
+        cls.expected = list(
+            Item.objects.order_by('name', 'pk').values_list('pk', flat=True))
+
+    def get_page(self, cursor=None, size=3):
+        params = {'size': size}
+        if cursor:
+            params['cursor'] = cursor
+        response = self.client.get(reverse('item_list'), params)
+        return response.context['items']
+
+    def test_return_all_items_in_order_when_following_next_cursors(self):
+        pages = [self.get_page()]
+        while pages[-1].has_next:
+            pages.append(self.get_page(pages[-1].next_cursor))
+
+        result = [item.pk for page in pages for item in page]
+
+        self.assertEqual([3, 3, 1], [len(page) for page in pages])
+        self.assertEqual(self.expected, result)
+
+    def test_return_previous_page_when_following_previous_cursor(self):
+        first = self.get_page()
+        second = self.get_page(first.next_cursor)
+
+        result = self.get_page(second.previous_cursor)
+
+        self.assertEqual([item.pk for item in first], [item.pk for item in result])
+        self.assertFalse(result.has_previous)
+        self.assertTrue(result.has_next)
+
+    def test_return_one_query_for_a_later_page(self):
+        second = self.get_page(self.get_page().next_cursor)
+
+        with self.assertNumQueries(1):
+            self.client.get(reverse('item_list'), {
+                'cursor': second.next_cursor,
+                'size': 3
+            })
+
+    def test_return_page_size_capped_at_max_page_size(self):
+        with self.settings(MAX_PAGE_SIZE=2):
+            result = self.get_page(size=100)
+
+        self.assertEqual(2, len(result))
+
+    def test_return_status_404_if_cursor_is_invalid(self):
+        response = self.client.get(reverse('item_list'), {'cursor': 'nonsense'})
+
+        self.assertEqual(404, response.status_code)
+
+    def test_return_error_status_for_forged_cursors(self):
+        forged = [['n', 'x', 'abc'], ['n', 'x', [1]], ['p', 'x', True]]
+        # The API answers a bad request, the pages a missing one.
+        statuses = {
+            'item_list': 404, 'menu_archive': 404,
+            'api_item_list': 400, 'api_menu_list': 400,
+        }
+
+        for data in forged:
+            cursor = pagination.encode_cursor(data[0], data[1:])
+            for name, status in statuses.items():
+                response = self.client.get(reverse(name), {'cursor': cursor})
+                self.assertEqual(status, response.status_code, (name, data))
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite query plan')
+    def test_return_index_search_for_a_later_page(self):
+        queryset = Item.objects.order_by('name', 'pk').filter(
+            keyset_filter(('name', 'pk'), ['Cake', 4], 'gt'))[:3]
+        sql, params = queryset.query.sql_with_params()
+
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+
+        self.assertIn('SEARCH', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class ItemSearchTestCase(FixtureTestCase):
+    '''Tests for the full-text search over menu items'''
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('moe', 'moe@example.com', '12345')
+        cls.item1 = Item.objects.create(
+            name='Omelette',
+            description='Three eggs folded with <b>cheddar</b>',
+            chef=cls.user
+        )
+        cls.item2 = Item.objects.create(
+            name='Cheddar Toast',
+            description='Sourdough under the grill',
+            chef=cls.user
+        )
+        cls.item3 = Item.objects.create(
+            name='Spaghetti',
+            description='this may be a delicious stuff',
+            chef=cls.user
+        )
+
+    def search(self, query, **params):
+        params['q'] = query
+        return self.client.get(reverse('item_search_json'), params).json()
+
+    def test_return_name_matches_ranked_before_description_matches(self):
+        result = [row['pk'] for row in self.search('cheddar')['results']]
+
+        self.assertEqual([self.item2.pk, self.item1.pk], result)
+
+    def test_return_prefix_matches(self):
+        result = [row['pk'] for row in self.search('spag')['results']]
+
+        self.assertEqual([self.item3.pk], result)
+
+    def test_return_escaped_snippet_with_highlighted_match(self):
+        result = self.search('cheddar')['results'][1]['snippet']
+
+        self.assertIn('&lt;b&gt;<mark>cheddar</mark>&lt;/b&gt;', result)
+
+    def test_return_updated_item_when_item_is_saved(self):
+        self.item3.name = 'Lasagne'
+        self.item3.save()
+
+        self.assertEqual([], self.search('spaghetti')['results'])
+        self.assertEqual(1, len(self.search('lasagne')['results']))
+
+    def test_return_no_deleted_item(self):
+        self.item3.delete()
+
+        self.assertEqual([], self.search('spaghetti')['results'])
+
+    def test_return_next_page_when_more_results(self):
+        first = self.search('cheddar', size=1)
+        second = self.search('cheddar', size=1, page=first['next_page'])
+
+        self.assertEqual(2, first['next_page'])
+        self.assertIsNone(second['next_page'])
+        self.assertEqual(self.item1.pk, second['results'][0]['pk'])
+
+    def test_return_like_matches_on_other_databases(self):
+        with mock.patch('menu.search.is_supported', return_value=False):
+            results, has_next = search.search('CHEDDAR')
+
+        self.assertEqual(
+            [self.item2.pk, self.item1.pk], [result.pk for result in results])
+        self.assertIn('<mark>Cheddar</mark>', results[0].name)
+
+    def test_return_bulk_created_items_after_rebuilding_index(self):
+        Item.objects.bulk_create([
+            Item(name='Waffles', description='Crisp', chef=self.user)
+        ])
+        self.assertEqual([], self.search('waffles')['results'])
+
+        call_command('rebuild_search_index', stdout=StringIO())
+
+        self.assertEqual(1, len(self.search('waffles')['results']))
+
+    def test_return_search_page_with_results(self):
+        response = self.client.get(reverse('item_search'), {'q': 'toast'})
+
+        self.assertTemplateUsed(response, 'menu/item_search.html')
+        self.assertContains(response, '<mark>Toast</mark>')
+
+
+class ItemFilterTestCase(FixtureTestCase):
+    '''Tests for the ingredient filter and its inverted index'''
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('moe', 'moe@example.com', '12345')
+        cls.peanut = Ingredient.objects.create(name='Peanut')
+        cls.egg = Ingredient.objects.create(name='Egg')
+        cls.cheese = Ingredient.objects.create(name='Cheese')
+
+        cls.omelette = cls.create_item('Omelette', cls.egg, cls.cheese)
+        cls.satay = cls.create_item('Satay', cls.peanut, cls.egg)
+        cls.toast = cls.create_item('Cheese Toast', cls.cheese)
+        cls.salad = cls.create_item('Salad')
+
+    @classmethod
+    def create_item(cls, name, *ingredients):
+        item = Item.objects.create(
+            name=name,
+            description='Is a delicious stuff',
+            chef=cls.user
+        )
+        item.ingredients.add(*ingredients)
+        return item
+
+    def filter(self, include=(), exclude=()):
+        return ingredient_index.filter(
+            [ingredient.pk for ingredient in include],
+            [ingredient.pk for ingredient in exclude])
+
+    def pks(self, *items):
+        return sorted(item.pk for item in items)
+
+    def test_return_items_with_every_included_ingredient(self):
+        result = self.filter(include=[self.egg, self.cheese])
+
+        self.assertEqual(self.pks(self.omelette), result)
+
+    def test_return_items_without_excluded_ingredients(self):
+        result = self.filter(exclude=[self.peanut])
+
+        self.assertEqual(
+            self.pks(self.omelette, self.toast, self.salad), result)
+
+    def test_return_included_minus_excluded_items(self):
+        result = self.filter(include=[self.egg], exclude=[self.peanut])
+
+        self.assertEqual(self.pks(self.omelette), result)
+
+    def test_return_no_items_for_unknown_ingredient(self):
+        self.assertEqual([], ingredient_index.filter([1000]))
+
+    def test_return_changes_without_rebuilding_index(self):
+        self.filter()
+
+        with mock.patch.object(ingredient_index, 'build') as build:
+            self.salad.ingredients.add(self.peanut)
+            self.egg.item_set.clear()
+            self.toast.delete()
+            created = self.create_item('Peanut Butter', self.peanut)
+            self.run_commit_hooks()
+
+            self.assertEqual(
+                self.pks(self.satay, self.salad, created),
+                self.filter(include=[self.peanut]))
+            self.assertEqual([], self.filter(include=[self.egg]))
+            self.assertEqual(
+                self.pks(self.omelette), self.filter(include=[self.cheese]))
+            self.assertFalse(build.called)
+
+    def test_return_rolled_back_changes_left_out(self):
+        self.filter()
+
+        try:
+            with transaction.atomic():
+                self.salad.ingredients.add(self.peanut)
+                self.create_item('Peanut Butter', self.peanut)
+                raise DatabaseError('rolled back')
+        except DatabaseError:
+            pass
+        self.run_commit_hooks()
+
+        self.assertEqual(
+            self.pks(self.satay), self.filter(include=[self.peanut]))
+
+    def test_return_index_rebuilt_after_change_by_other_process(self):
+        self.filter()
+        Item.ingredients.through.objects.create(
+            item_id=self.salad.pk, ingredient_id=self.peanut.pk)
+        # What a change made by another worker looks like from here.
+        bump_version()
+
+        result = self.filter(include=[self.peanut])
+
+        self.assertEqual(self.pks(self.satay, self.salad), result)
+
+    def test_return_filtered_items_from_json_endpoint(self):
+        response = self.client.get(reverse('item_filter_json'), {
+            'include': '{0},{1}'.format(self.egg.pk, self.cheese.pk),
+            'exclude': self.peanut.pk,
+        })
+
+        result = response.json()
+
+        self.assertEqual(1, result['count'])
+        self.assertEqual('Omelette', result['results'][0]['name'])
+        self.assertIsNone(result['next_page'])
+
+    def test_return_filter_page_with_items(self):
+        response = self.client.get(reverse('item_filter'), {
+            'exclude': [self.peanut.pk, self.cheese.pk],
+        })
+
+        self.assertTemplateUsed(response, 'menu/item_filter.html')
+        self.assertEqual([self.salad], response.context['items'])
+
+    def test_return_only_chosen_ingredients_rendered(self):
+        response = self.client.get(reverse('item_filter'), {
+            'include': [self.egg.pk],
+        })
+
+        self.assertContains(response, '>Egg</option>', count=1)
+        self.assertNotContains(response, '>Peanut</option>')
+        self.assertContains(response, reverse('ingredient_autocomplete'))
+
+
+class ImportMenuDataTestCase(FixtureTestCase):
+    '''Tests for the import_menu_data command'''
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('moe', 'moe@example.com', '12345')
+        cls.egg = Ingredient.objects.create(name='Egg')
+        cls.winter = Menu.objects.create(season='Winter')
+
+    def import_data(self, content, suffix, **options):
+        with tempfile.NamedTemporaryFile(
+                'w', suffix=suffix, encoding='utf-8', delete=False) as data:
+            data.write(content)
+        self.addCleanup(os.remove, data.name)
+        out, err = StringIO(), StringIO()
+        call_command(
+            'import_menu_data', data.name, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_return_items_menus_and_ingredients_imported_from_csv(self):
+        self.import_data(
+            'season,expiration_date,name,description,chef,standard,'
+            'ingredients\n'
+            'Summer,2030-06-01,Omelette,Eggs,moe,true,Egg|Cheese\n'
+            'Summer,,Salad,Greens,moe,,Lettuce\n'
+            ',,Toast,Bread,moe,false,\n',
+            '.csv', batch_size=2)
+
+        summer = Menu.objects.get(season='Summer')
+        omelette = Item.objects.get(name='Omelette')
+
+        self.assertEqual(2030, summer.expiration_date.year)
+        self.assertEqual(
+            ['Omelette', 'Salad'],
+            sorted(item.name for item in summer.items.all()))
+        self.assertEqual(
+            ['Cheese', 'Egg'],
+            sorted(ingredient.name for ingredient in omelette.ingredients.all()))
+        self.assertTrue(omelette.standard)
+        self.assertEqual(1, Ingredient.objects.filter(name='Egg').count())
+        self.assertEqual(3, Item.objects.count())
+
+    def test_return_items_added_to_existing_menu_from_jsonl(self):
+        self.import_data(
+            '{"season": "Winter", "name": "Soup", "description": "Hot", '
+            '"chef": "moe", "standard": true, "ingredients": ["Egg"]}\n',
+            '.jsonl')
+
+        soup = Item.objects.get(name='Soup')
+
+        self.assertEqual([soup], list(self.winter.items.all()))
+        self.assertEqual([self.egg], list(soup.ingredients.all()))
+        self.assertEqual(1, Menu.objects.count())
+
+    def test_return_rows_with_unknown_chef_skipped(self):
+        out, err = self.import_data(
+            '{"name": "Soup", "chef": "nobody"}\n'
+            '{"name": "Stew", "chef": "moe"}\n',
+            '.jsonl')
+
+        self.assertEqual(['Stew'], [item.name for item in Item.objects.all()])
+        self.assertIn("Line 1: unknown chef 'nobody'", err)
+        self.assertIn('Imported 1 items (1 skipped)', out)
+
+    def test_return_new_items_visible_to_search_and_ingredient_filter(self):
+        ingredient_index.filter()
+
+        self.import_data(
+            '{"name": "Soup", "chef": "moe", "ingredients": ["Egg"]}\n',
+            '.jsonl')
+
+        soup = Item.objects.get(name='Soup')
+        results, _ = search.search('soup')
+
+        self.assertEqual([soup.pk], [result.pk for result in results])
+        self.assertEqual([soup.pk], ingredient_index.filter([self.egg.pk]))
+
+    def test_return_numbers_imported_as_text(self):
+        self.import_data(
+            '{"name": 1984, "description": 2.5, "chef": "moe", '
+            '"ingredients": [7]}\n',
+            '.jsonl')
+
+        item = Item.objects.get()
+
+        self.assertEqual(('1984', '2.5'), (item.name, item.description))
+        self.assertEqual(['7'], [i.name for i in item.ingredients.all()])
+
+    def test_return_rows_with_non_text_values_skipped(self):
+        out, err = self.import_data(
+            '{"name": ["Soup"], "chef": "moe"}\n'
+            '{"name": "Stew", "chef": {"name": "moe"}}\n'
+            '{"name": "Pie", "chef": "moe", "ingredients": {"Egg": 1}}\n',
+            '.jsonl')
+
+        self.assertFalse(Item.objects.exists())
+        self.assertIn('Line 1: name must be text, not list.', err)
+        self.assertIn('Line 2: chef must be text, not dict.', err)
+        self.assertIn('Line 3: ingredients must be a list, not dict.', err)
+        self.assertIn('Imported 0 items (3 skipped)', out)
+
+    def test_return_ids_of_deleted_items_not_reused(self):
+        deleted = Item.objects.create(
+            name='Gone', description='Old', chef=self.user).pk
+        Item.objects.filter(pk=deleted).delete()
+
+        self.import_data('{"name": "Soup", "chef": "moe"}\n', '.jsonl')
+
+        self.assertGreater(Item.objects.get(name='Soup').pk, deleted)
+
+    def test_return_rows_with_same_id_imported_as_one_item(self):
+        self.import_data(
+            '{"id": 7, "season": "Winter", "name": "Soup", "chef": "moe", '
+            '"ingredients": ["Egg"]}\n'
+            '{"id": 7, "season": "Spring", "name": "Soup", "chef": "moe", '
+            '"ingredients": ["Egg"]}\n'
+            '{"id": 8, "season": "Spring", "name": "Soup", "chef": "moe"}\n',
+            '.jsonl', batch_size=1)
+
+        first, second = Item.objects.order_by('pk')
+
+        self.assertEqual([first], list(self.winter.items.all()))
+        self.assertEqual(
+            [first, second],
+            list(Menu.objects.get(season='Spring').items.order_by('pk')))
+        self.assertEqual([self.egg], list(first.ingredients.all()))
+
+    def test_return_menu_records_kept_apart_from_same_season(self):
+        self.import_data(
+            '{"type": "ingredient", "id": 3, "name": "Salt"}\n'
+            '{"type": "menu", "id": 5, "season": "Winter", '
+            '"created_date": "2020-01-02T03:04:05+00:00"}\n'
+            '{"type": "menu", "id": 6, "season": "Winter"}\n'
+            '{"type": "item", "id": 7, "menu": 5, "name": "Soup", '
+            '"chef": "moe"}\n',
+            '.jsonl', batch_size=2)
+
+        _, first, second = Menu.objects.order_by('pk')
+
+        self.assertEqual(
+            ['Soup'], [item.name for item in first.items.all()])
+        self.assertEqual(2020, first.created_date.year)
+        self.assertFalse(second.items.exists())
+        self.assertFalse(self.winter.items.exists())
+        self.assertTrue(Ingredient.objects.filter(name='Salt').exists())
+
+    def test_return_rows_with_unknown_menu_or_type_skipped(self):
+        out, err = self.import_data(
+            '{"type": "item", "menu": 9, "name": "Soup", "chef": "moe"}\n'
+            '{"type": "chef", "name": "moe"}\n',
+            '.jsonl')
+
+        self.assertFalse(Item.objects.exists())
+        self.assertIn("Line 1: unknown menu '9'.", err)
+        self.assertIn("Line 2: unknown record type 'chef'.", err)
+
+    def test_return_error_for_unknown_format(self):
+        with self.assertRaises(CommandError):
+            self.import_data('', '.txt')
+
+
+class CatalogExportTestCase(FixtureTestCase):
+    '''Tests for the catalog export view and export_menu_data command'''
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('moe', 'moe@example.com', '12345')
+        egg = Ingredient.objects.create(name='Egg')
+        cheese = Ingredient.objects.create(name='Cheese')
+        cls.omelette = Item.objects.create(
+            name='Omelette', description='Eggs', chef=cls.user, standard=True)
+        cls.omelette.ingredients.add(egg, cheese)
+        cls.toast = Item.objects.create(
+            name='Toast', description='Bread', chef=cls.user)
+        # Flour is on no item, the second Summer menu has no items.
+        Ingredient.objects.create(name='Flour')
+        cls.summer = Menu.objects.create(
+            season='Summer',
+            created_date=timezone.now() - datetime.timedelta(days=400))
+        cls.winter = Menu.objects.create(season='Winter')
+        cls.empty = Menu.objects.create(
+            season='Summer',
+            expiration_date=timezone.now() + datetime.timedelta(days=30))
+        cls.summer.items.add(cls.omelette)
+        cls.winter.items.add(cls.omelette)
+
+    def get_export(self, format, **params):
+        self.client.login(username='moe', password='12345')
+        response = self.client.get(
+            reverse('catalog_export', kwargs={'format': format}), params)
+        return response, b''.join(response.streaming_content)
+
+    def test_return_302_if_not_logged_in(self):
+        response = self.client.get(
+            reverse('catalog_export', kwargs={'format': 'csv'}))
+
+        self.assertEqual(302, response.status_code)
+
+    def test_return_one_csv_row_per_item_and_menu(self):
+        response, content = self.get_export('csv')
+
+        rows = list(csv.DictReader(StringIO(content.decode('utf-8'))))
+        items = [row for row in rows if row['type'] == 'item']
+
+        self.assertEqual('text/csv; charset=utf-8', response['Content-Type'])
+        self.assertEqual(
+            [('Omelette', str(self.summer.pk)),
+             ('Omelette', str(self.winter.pk)),
+             ('Toast', '')],
+            [(row['name'], row['menu']) for row in items])
+        self.assertEqual('Cheese|Egg', items[0]['ingredients'])
+        self.assertEqual('true', items[0]['standard'])
+
+    def test_return_ingredients_and_menus_exported_as_records(self):
+        response, content = self.get_export('csv')
+
+        rows = list(csv.DictReader(StringIO(content.decode('utf-8'))))
+
+        self.assertEqual(
+            [('ingredient', 'Egg'), ('ingredient', 'Cheese'),
+             ('ingredient', 'Flour')],
+            [(row['type'], row['name']) for row in rows[:3]])
+        self.assertEqual(
+            [('menu', str(self.summer.pk), 'Summer'),
+             ('menu', str(self.winter.pk), 'Winter'),
+             ('menu', str(self.empty.pk), 'Summer')],
+            [(row['type'], row['id'], row['season']) for row in rows[3:6]])
+        self.assertEqual(
+            self.summer.created_date.isoformat(), rows[3]['created_date'])
+
+    def test_return_gzipped_jsonl(self):
+        response, content = self.get_export('jsonl', gzip=1)
+
+        rows = [
+            json.loads(line)
+            for line in gzip.decompress(content).decode('utf-8').splitlines()
+        ]
+
+        self.assertEqual('application/gzip', response['Content-Type'])
+        self.assertIn('catalog.jsonl.gz', response['Content-Disposition'])
+        items = [row for row in rows if row['type'] == 'item']
+
+        self.assertEqual('application/gzip', response['Content-Type'])
+        self.assertIn('catalog.jsonl.gz', response['Content-Disposition'])
+        self.assertEqual(self.omelette.pk, items[0]['id'])
+        self.assertEqual(['Cheese', 'Egg'], items[0]['ingredients'])
+        self.assertEqual([], items[2]['ingredients'])
+
+    def test_return_three_queries_per_chunk(self):
+        with CaptureQueriesContext(connection) as queries:
+            rows = list(catalog_io.iter_export_rows(chunk_size=1))
+
+        self.assertEqual(9, len(rows))
+        # One per ingredient and menu and three per item (the item, its
+        # ingredients and its menus), plus an empty read ending each type.
+        self.assertEqual(3 + 3 + 6 + 3, len(queries))
+
+    def test_return_export_file_that_imports_back(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'catalog.csv.gz')
+            call_command('export_menu_data', path, stderr=StringIO())
+            for model in (Item, Menu, Ingredient):
+                model.objects.all().delete()
+            call_command(
+                'import_menu_data', path, stdout=StringIO(), stderr=StringIO())
+
+        summer, winter, empty = Menu.objects.order_by('pk')
+        omelette = summer.items.get()
+
+        self.assertEqual(
+            ['Omelette', 'Toast'],
+            sorted(item.name for item in Item.objects.all()))
+        self.assertEqual(2, omelette.ingredients.count())
+        self.assertEqual(self.omelette.created_date, omelette.created_date)
+        self.assertEqual([omelette], list(winter.items.all()))
+        self.assertEqual(
+            [('Summer', self.summer.created_date),
+             ('Winter', self.winter.created_date),
+             ('Summer', self.empty.created_date)],
+            [(menu.season, menu.created_date)
+             for menu in (summer, winter, empty)])
+        self.assertEqual(self.empty.expiration_date, empty.expiration_date)
+        self.assertFalse(empty.items.exists())
+        self.assertEqual(
+            ['Cheese', 'Egg', 'Flour'],
+            sorted(Ingredient.objects.values_list('name', flat=True)))
+
+
+class SeedCatalogTestCase(FixtureTestCase):
+    '''Tests for the synthetic catalogs of menu/seeding.py'''
+    def test_return_catalog_of_requested_size(self):
+        catalog = seeding.seed_catalog(
+            menus=3, items=20, ingredients=5, ingredients_per_item=2,
+            items_per_menu=4)
+
+        self.assertEqual(
+            (3, 20, 5), (Menu.objects.count(), Item.objects.count(),
+                         Ingredient.objects.count()))
+        self.assertEqual(40, Item.ingredients.through.objects.count())
+        self.assertEqual(12, Menu.items.through.objects.count())
+        self.assertEqual(catalog['items'], sorted(
+            Item.objects.values_list('pk', flat=True)))
+
+    def test_return_same_links_for_same_seed(self):
+        seeding.seed_catalog(menus=2, items=10, ingredients=5, seed=1)
+        first = list(Item.ingredients.through.objects.values_list(
+            'item_id', 'ingredient_id').order_by('pk'))
+        Item.objects.all().delete()
+        Ingredient.objects.all().delete()
+
+        catalog = seeding.seed_catalog(menus=2, items=10, ingredients=5, seed=1)
+        second = [
+            (item_id - catalog['items'][0] + 1,
+             ingredient_id - catalog['ingredients'][0] + 1)
+            for item_id, ingredient_id in
+            Item.ingredients.through.objects.values_list(
+                'item_id', 'ingredient_id').order_by('pk')
+        ]
+
+        self.assertEqual(first, second)
+
+    def test_return_expired_share_of_menus(self):
+        seeding.seed_catalog(menus=10, items=5, ingredients=2,
+                             expired_ratio=0.3)
+
+        self.assertEqual(7, Menu.objects.active().count())
+
+    def test_return_link_counts_within_ranges(self):
+        seeding.seed_catalog(menus=5, items=50, ingredients=10,
+                             ingredients_per_item=(1, 4),
+                             items_per_menu=(2, 6))
+
+        ingredient_counts = Item.objects.annotate(
+            count=Count('ingredients')).values_list('count', flat=True)
+        item_counts = Menu.objects.annotate(
+            count=Count('items')).values_list('count', flat=True)
+
+        self.assertTrue(all(1 <= count <= 4 for count in ingredient_counts))
+        self.assertTrue(all(2 <= count <= 6 for count in item_counts))
+
+    def test_return_items_spread_over_chefs(self):
+        catalog = seeding.seed_catalog(menus=1, items=10, ingredients=1,
+                                       chefs=3)
+
+        chefs = set(Item.objects.values_list('chef_id', flat=True))
+
+        self.assertEqual(set(catalog['chefs']), chefs)
+        self.assertEqual(
+            3, User.objects.filter(pk__in=catalog['chefs']).count())
+
+    def test_return_seed_catalog_command_report(self):
+        out = StringIO()
+
+        call_command('seed_catalog', menus=2, items=10, ingredients=3,
+                     chefs=2, items_per_menu=(1, 3), stdout=out)
+
+        self.assertIn('Seeded 2 menus, 10 items, 3 ingredients and 2 chefs',
+                      out.getvalue())
+
+    def test_return_ids_of_archived_menus_not_reused(self):
+        catalog = seeding.seed_catalog(menus=2, items=4, ingredients=2,
+                                       expired_ratio=1)
+        archive.archive_expired_menus(older_than=datetime.timedelta(0))
+
+        again = seeding.seed_catalog(menus=2, items=4, ingredients=2,
+                                     expired_ratio=1)
+        archive.archive_expired_menus(older_than=datetime.timedelta(0))
+
+        self.assertGreater(min(again['menus']), max(catalog['menus']))
+        self.assertEqual(4, ArchivedMenu.objects.count())
+
+    def test_return_seeded_rows_recorded_in_change_feed(self):
+        catalog = seeding.seed_catalog(menus=1, items=3, ingredients=2)
+
+        recorded = Change.objects.filter(action=Change.SAVE)
+
+        for model, key in (('menu', 'menus'), ('item', 'items'),
+                           ('ingredient', 'ingredients')):
+            self.assertEqual(catalog[key], sorted(
+                recorded.filter(model=model)
+                .values_list('object_id', flat=True)))
+
+    def test_return_chefs_of_earlier_catalog_reused(self):
+        first = seeding.seed_catalog(menus=1, items=2, ingredients=1, chefs=3)
+        second = seeding.seed_catalog(menus=1, items=2, ingredients=1, chefs=3)
+
+        self.assertEqual(first['chefs'], second['chefs'])
+
+    def test_return_seeded_items_searchable(self):
+        catalog = seeding.seed_catalog(menus=1, items=3, ingredients=1)
+
+        results, _ = search.search('seeded')
+
+        self.assertEqual(
+            catalog['items'], sorted(result.pk for result in results))
+
+
+class ArchiveMenusTestCase(FixtureTestCase):
+    '''Tests for the archival of expired menus of menu/archive.py'''
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('moe', 'moe@example.com', '12345')
+        cls.item1 = Item.objects.create(
+            name='Omelette', description='Eggs', chef=cls.user)
+        cls.item2 = Item.objects.create(
+            name='Salad', description='Greens', chef=cls.user)
+        now = timezone.now()
+
+        cls.old_menus = []
+        for number in range(3):
+            menu = Menu.objects.create(
+                season='Old Menu {0}'.format(number),
+                expiration_date=now - datetime.timedelta(days=40 + number))
+            menu.items.add(cls.item1, cls.item2)
+            cls.old_menus.append(menu)
+        cls.recent_menu = Menu.objects.create(
+            season='Recent Menu',
+            expiration_date=now - datetime.timedelta(days=2))
+        cls.recent_menu.items.add(cls.item1)
+        cls.active_menu = Menu.objects.create(
+            season='Active Menu',
+            expiration_date=now + datetime.timedelta(days=2))
+
+    def test_return_old_menus_moved_to_archive(self):
+        result = archive.archive_expired_menus()
+
+        self.assertEqual((3, 6), result)
+        self.assertEqual(
+            {self.recent_menu.pk, self.active_menu.pk},
+            set(Menu.objects.values_list('pk', flat=True)))
+        self.assertEqual(
+            sorted(menu.pk for menu in self.old_menus),
+            sorted(ArchivedMenu.objects.values_list('pk', flat=True)))
+        self.assertEqual(
+            1, Menu.items.through.objects.count())
+
+    def test_return_item_names_kept_in_archive(self):
+        archive.archive_expired_menus()
+
+        menu = ArchivedMenu.objects.get(pk=self.old_menus[0].pk)
+
+        self.assertEqual(self.old_menus[0].season, menu.season)
+        self.assertEqual(
+            self.old_menus[0].expiration_date, menu.expiration_date)
+        self.assertEqual(
+            [(self.item1.pk, 'Omelette'), (self.item2.pk, 'Salad')],
+            list(menu.entries.values_list('item_id', 'item_name')))
+
+    def test_return_items_left_in_place(self):
+        archive.archive_expired_menus()
+
+        self.assertEqual(2, Item.objects.count())
+
+    def test_return_age_from_argument(self):
+        result = archive.archive_expired_menus(
+            older_than=datetime.timedelta(days=1))
+
+        self.assertEqual((4, 7), result)
+        self.assertEqual([self.active_menu], list(Menu.objects.all()))
+
+    @override_settings(MENU_ARCHIVE_AFTER_DAYS=41.5)
+    def test_return_age_from_settings(self):
+        result = archive.archive_expired_menus()
+
+        self.assertEqual((1, 2), result)
+
+    def test_return_one_transaction_per_batch(self):
+        with mock.patch.object(archive, 'bump_version') as bump:
+            result = archive.archive_expired_menus(batch_size=2)
+
+        self.assertEqual((3, 6), result)
+        self.assertEqual(2, bump.call_count)
+
+    def test_return_nothing_archived_twice(self):
+        archive.archive_expired_menus()
+
+        result = archive.archive_expired_menus()
+
+        self.assertEqual((0, 0), result)
+        self.assertEqual(3, ArchivedMenu.objects.count())
+        self.assertEqual(6, ArchivedMenuItem.objects.count())
+
+    def test_return_archive_menus_command_report(self):
+        out = StringIO()
+
+        call_command('archive_menus', batch_size=2, pause=0, stdout=out)
+
+        self.assertIn('Archived 3 menus and 6 menu items', out.getvalue())
+
+    def test_return_command_error_for_invalid_batch_size(self):
+        with self.assertRaises(CommandError):
+            call_command('archive_menus', batch_size=1000, stdout=StringIO())
+
+    def test_return_archive_page_reads_only_archive_tables(self):
+        archive.archive_expired_menus()
+        hot_tables = [
+            Menu._meta.db_table, Item._meta.db_table,
+            Menu.items.through._meta.db_table]
+        # The microcache looks up the next menu expiry once per version.
+        get_version()
+
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(reverse('menu_archive'))
+
+        self.assertEqual(200, resp.status_code)
+        self.assertTemplateUsed(resp, 'menu/menu_archive.html')
+        for menu in self.old_menus:
+            self.assertContains(resp, menu.season)
+        self.assertContains(resp, 'Omelette, Salad')
+        for query in queries.captured_queries:
+            for table in hot_tables:
+                self.assertNotIn('"{0}"'.format(table), query['sql'])
+
+    def test_return_archive_page_paginated(self):
+        archive.archive_expired_menus()
+
+        resp = self.client.get(reverse('menu_archive'), {'size': 2})
+
+        self.assertEqual(2, len(resp.context['menus']))
+        self.assertTrue(resp.context['menus'].has_next)
+
+    def test_return_archived_menu_detail(self):
+        archive.archive_expired_menus()
+
+        resp = self.client.get(reverse(
+            'archived_menu_detail', kwargs={'pk': self.old_menus[0].pk}))
+
+        self.assertTemplateUsed(resp, 'menu/archived_menu_detail.html')
+        self.assertContains(resp, self.old_menus[0].season)
+        self.assertContains(resp, 'Salad')
+
+    def test_return_status_404_if_archived_menu_not_found(self):
+        resp = self.client.get(reverse(
+            'archived_menu_detail', kwargs={'pk': self.recent_menu.pk}))
+
+        self.assertEqual(404, resp.status_code)
+
+    def test_return_redirect_from_menu_detail_once_archived(self):
+        archive.archive_expired_menus()
+
+        resp = self.client.get(reverse(
+            'menu_detail', kwargs={'pk': self.old_menus[0].pk}))
+
+        self.assertRedirects(
+            resp, reverse('archived_menu_detail',
+                          kwargs={'pk': self.old_menus[0].pk}),
+            status_code=301)
+
+
+class ChangeFeedTestCase(FixtureTestCase):
+    '''Tests for the change feed of menu/changes.py'''
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('moe', 'moe@example.com', '12345')
+        cls.ingredient = Ingredient.objects.create(name='Egg')
+        cls.item1 = Item.objects.create(
+            name='Omelette', description='Eggs', chef=cls.user)
+        cls.item2 = Item.objects.create(
+            name='Salad', description='Greens', chef=cls.user)
+        cls.menu = Menu.objects.create(season='Spring')
+
+    def setUp(self):
+        super(ChangeFeedTestCase, self).setUp()
+        self.since = changes.latest_sequence()
+
+    def get_changes(self):
+        return list(Change.objects.filter(id__gt=self.since).values_list(
+            'model', 'object_id', 'action'))
+
+    def test_return_sequence_of_fixtures(self):
+        self.assertEqual(4, Change.objects.count())
+        self.assertEqual(Change.objects.last().pk, self.since)
+
+    def test_return_save_recorded(self):
+        self.item1.name = 'Frittata'
+        self.item1.save()
+
+        self.assertEqual([('item', self.item1.pk, 'save')], self.get_changes())
+
+    def test_return_delete_recorded(self):
+        pk = self.ingredient.pk
+        self.ingredient.delete()
+
+        self.assertIn(('ingredient', pk, 'delete'), self.get_changes())
+
+    def test_return_menu_recorded_when_its_items_change(self):
+        self.menu.items.add(self.item1, self.item2)
+
+        self.assertEqual([('menu', self.menu.pk, 'save')], self.get_changes())
+
+    def test_return_menus_recorded_when_cleared_from_reverse_side(self):
+        other = Menu.objects.create(season='Summer')
+        self.menu.items.add(self.item1)
+        other.items.add(self.item1)
+        self.since = changes.latest_sequence()
+
+        self.item1.items.clear()
+
+        self.assertEqual(
+            [('menu', self.menu.pk, 'save'), ('menu', other.pk, 'save')],
+            self.get_changes())
+
+    def test_return_item_recorded_when_added_from_reverse_side(self):
+        self.ingredient.item_set.add(self.item1, self.item2)
+
+        self.assertEqual(
+            [('item', self.item1.pk, 'save'), ('item', self.item2.pk, 'save')],
+            self.get_changes())
+
+    def test_return_changes_folded_per_object(self):
+        self.item1.save()
+        self.item1.save()
+        pk = self.item2.pk
+        self.item2.delete()
+
+        batch = changes.get_changes(self.since)
+
+        self.assertEqual({
+            'since': self.since,
+            'next': changes.latest_sequence(),
+            'has_more': False,
+            'changes': {
+                'menu': {'save': [], 'delete': []},
+                'item': {'save': [self.item1.pk], 'delete': [pk]},
+                'ingredient': {'save': [], 'delete': []},
+            },
+        }, batch.as_dict())
+
+    def test_return_changes_in_batches(self):
+        for number in range(5):
+            Ingredient.objects.create(name='Spice {0}'.format(number))
+
+        batches = list(changes.iter_changes(self.since, batch_size=2))
+
+        self.assertEqual([2, 2, 1], [len(batch.changes) for batch in batches])
+        self.assertEqual(
+            [True, True, False], [batch.has_more for batch in batches])
+        self.assertEqual(changes.latest_sequence(), batches[-1].next)
+
+    def test_return_nothing_when_caught_up(self):
+        self.assertEqual([], list(changes.iter_changes(self.since)))
+
+    def test_return_same_changes_after_compaction(self):
+        self.item1.save()
+        self.menu.items.add(self.item1)
+        self.item1.save()
+        self.ingredient.delete()
+        before = changes.get_changes(0).as_dict()
+
+        deleted = changes.compact_changes()
+
+        self.assertEqual(4, deleted)
+        self.assertEqual(
+            before['changes'], changes.get_changes(0).as_dict()['changes'])
+        self.assertEqual(0, changes.compact_changes())
+
+    def test_return_compact_changes_command_report(self):
+        self.menu.save()
+        out = StringIO()
+
+        call_command('compact_changes', batch_size=1, stdout=out)
+
+        self.assertIn('Deleted 1 superseded changes', out.getvalue())
+
+    def test_return_archived_menus_recorded_as_deleted(self):
+        self.menu.expiration_date = timezone.now() - datetime.timedelta(
+            days=60)
+        self.menu.save()
+        self.since = changes.latest_sequence()
+
+        archive.archive_expired_menus()
+
+        self.assertEqual(
+            [('menu', self.menu.pk, 'delete')], self.get_changes())
+
+    def test_return_imported_objects_recorded(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'catalog.csv')
+            with open(path, 'w', encoding='utf-8') as data:
+                data.write(
+                    'season,expiration_date,name,description,chef,standard,'
+                    'ingredients\n'
+                    'Summer,,Pancake,Flat,moe,,Flour\n'
+                    'Spring,,Toast,Crisp,moe,,Egg\n')
+            call_command(
+                'import_menu_data', path, stdout=StringIO(), stderr=StringIO())
+
+        menu_id = Menu.objects.get(season='Summer').pk
+        self.assertEqual(
+            sorted([
+                ('ingredient', Ingredient.objects.get(name='Flour').pk),
+                ('item', Item.objects.get(name='Pancake').pk),
+                ('item', Item.objects.get(name='Toast').pk),
+                ('menu', menu_id),
+                ('menu', self.menu.pk),
+            ]),
+            sorted((model, object_id) for model, object_id, action
+                   in self.get_changes()))
+
+    def test_return_latest_sequence_without_since(self):
+        resp = self.client.get(reverse('api_change_list'))
+
+        self.assertEqual({
+            'since': self.since,
+            'next': self.since,
+            'has_more': False,
+            'changes': {
+                'menu': {'save': [], 'delete': []},
+                'item': {'save': [], 'delete': []},
+                'ingredient': {'save': [], 'delete': []},
+            },
+        }, json.loads(resp.content.decode('utf-8')))
+
+    def test_return_changes_since_cursor(self):
+        self.menu.save()
+
+        resp = self.client.get(
+            reverse('api_change_list'), {'since': self.since})
+        data = json.loads(resp.content.decode('utf-8'))
+
+        self.assertEqual([self.menu.pk], data['changes']['menu']['save'])
+        self.assertEqual(changes.latest_sequence(), data['next'])
+
+        resp = self.client.get(
+            reverse('api_change_list'), {'since': data['next']})
+        data = json.loads(resp.content.decode('utf-8'))
+
+        self.assertEqual([], data['changes']['menu']['save'])
+
+    def test_return_status_400_for_invalid_since(self):
+        resp = self.client.get(reverse('api_change_list'), {'since': 'x'})
+
+        self.assertEqual(400, resp.status_code)
+
+
+class SharedConnectionWarmer(warming.Warmer):
+    '''Warmer whose threads use the connection of the test, as the
+    fixtures are only visible in its transaction'''
+    def __init__(self, *args, **kwargs):
+        super(SharedConnectionWarmer, self).__init__(*args, **kwargs)
+        self.connection = connections[DEFAULT_DB_ALIAS]
+
+    def work(self, paths, results):
+        connections[DEFAULT_DB_ALIAS] = self.connection
+        super(SharedConnectionWarmer, self).work(paths, results)
+
+
+@mock.patch.object(warming, 'Warmer', SharedConnectionWarmer)
+class WarmCachesTestCase(FixtureTestCase):
+    '''Tests for the cache warming of menu/warming.py'''
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('moe', 'moe@example.com', '12345')
+        cls.item = Item.objects.create(
+            name='Omelette', description='Eggs', chef=cls.user)
+        cls.menu = Menu.objects.create(season='Spring')
+        cls.expired_menu = Menu.objects.create(
+            season='Winter',
+            expiration_date=timezone.now() - datetime.timedelta(days=1))
+
     def setUp(self):
-        self.user = User.objects.create_user('moe', 'moe@example.com', '12345')
+        super(WarmCachesTestCase, self).setUp()
+        connection.allow_thread_sharing = True
+        self.addCleanup(setattr, connection, 'allow_thread_sharing', False)
+
+    def test_return_public_pages_as_paths(self):
+        self.assertEqual([
+            reverse('home'),
+            reverse('item_list'),
+            reverse('menu_detail', kwargs={'pk': self.menu.pk}),
+            reverse('item_detail', kwargs={'pk': self.item.pk}),
+        ], list(warming.get_paths()))
+
+    def test_return_page_cached_after_warming(self):
+        path = reverse('menu_detail', kwargs={'pk': self.menu.pk})
+
+        failed = warming.Warmer(threads=1, host='testserver').warm([path])
+        resp = self.client.get(path)
+
+        self.assertEqual([], failed)
+        self.assertEqual(microcache.HIT, resp['X-Microcache'])
+
+    def test_return_failed_paths(self):
+        paths = [reverse('home'), '/menu/1000/', '/missing/']
+
+        failed = warming.Warmer(threads=2).warm(paths)
+
+        self.assertEqual(['/menu/1000/', '/missing/'], failed)
+
+    def test_return_progress_of_every_page(self):
+        calls = []
+
+        warming.Warmer(threads=3).warm(
+            list(warming.get_paths()),
+            lambda done, failed: calls.append((done, failed)))
+
+        self.assertEqual([(1, 0), (2, 0), (3, 0), (4, 0)], calls)
+
+    def test_return_warm_caches_command_report(self):
+        out = StringIO()
+
+        call_command('warm_caches', threads=2, progress_every=2, stdout=out,
+                     stderr=StringIO())
+
+        self.assertIn('Warmed 2/4 pages, 0 failed.', out.getvalue())
+        self.assertIn('Warmed 4 pages in', out.getvalue())
+
+
+class StaticExportTestCase(FixtureTestCase):
+    '''Tests for the static export of menu/static_export.py'''
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('moe', 'moe@example.com', '12345')
+        cls.egg = Ingredient.objects.create(name='Egg')
+        cls.item1 = Item.objects.create(
+            name='Omelette', description='Eggs', chef=cls.user)
+        cls.item2 = Item.objects.create(
+            name='Salad', description='Greens', chef=cls.user)
+        cls.item1.ingredients.add(cls.egg)
+        cls.menu1 = Menu.objects.create(season='Spring')
+        cls.menu1.items.add(cls.item1)
+        cls.menu2 = Menu.objects.create(season='Summer')
+        cls.menu2.items.add(cls.item2)
+
+    def setUp(self):
+        super(StaticExportTestCase, self).setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.export = static_export.StaticExport(self.directory)
+
+    def read_page(self, path):
+        with open(static_export.get_file(self.directory, path),
+                  encoding='utf-8') as page:
+            return page.read()
+
+    @override_settings(PAGE_SIZE=1)
+    def test_return_item_list_exported_without_cursor_links(self):
+        self.export.run()
+
+        self.assertIn('?cursor=', self.client.get(
+            reverse('item_list')).content.decode('utf-8'))
+        self.assertNotIn('?cursor=', self.read_page(reverse('item_list')))
+
+    def test_return_every_page_written_by_first_export(self):
+        written, removed, copied = self.export.run()
+
+        self.assertEqual((6, 0), (written, removed))
+        self.assertGreater(copied, 0)
+        self.assertIn('Spring', self.read_page(reverse('home')))
+        self.assertIn('Omelette', self.read_page(reverse('item_list')))
+        self.assertIn('Omelette', self.read_page(
+            static_export.menu_path(self.menu1.pk)))
+        self.assertIn('Egg', self.read_page(
+            static_export.item_path(self.item1.pk)))
+        self.assertTrue(os.path.exists(os.path.join(
+            self.directory, 'static', 'css', 'global.css')))
 
-        self.ingredient1 = Ingredient.objects.create(
+    def test_return_only_home_and_item_list_without_changes(self):
+        self.export.run()
+
+        written, removed, _ = self.export.run()
+
+        self.assertEqual((2, 0), (written, removed))
+
+    def test_return_pages_showing_changed_item_written(self):
+        self.export.run()
+        self.item1.name = 'Frittata'
+        self.item1.save()
+        self.run_commit_hooks()
+
+        written, _, _ = self.export.run()
+
+        self.assertEqual(4, written)
+        self.assertIn('Frittata', self.read_page(
+            static_export.menu_path(self.menu1.pk)))
+        self.assertIn('Frittata', self.read_page(
+            static_export.item_path(self.item1.pk)))
+
+    def test_return_item_pages_showing_changed_ingredient_written(self):
+        self.export.run()
+        self.egg.name = 'Duck Egg'
+        self.egg.save()
+        self.run_commit_hooks()
+
+        written, _, _ = self.export.run()
+
+        self.assertEqual(3, written)
+        self.assertIn('Duck Egg', self.read_page(
+            static_export.item_path(self.item1.pk)))
+
+    def test_return_page_of_deleted_item_removed(self):
+        self.export.run()
+        path = static_export.item_path(self.item2.pk)
+        self.item2.delete()
+        self.run_commit_hooks()
+
+        _, removed, _ = self.export.run()
+
+        self.assertEqual(1, removed)
+        self.assertFalse(os.path.exists(
+            static_export.get_file(self.directory, path)))
+        self.assertNotIn('Salad', self.read_page(
+            static_export.menu_path(self.menu2.pk)))
+
+    def test_return_page_of_new_menu_written(self):
+        self.export.run()
+        menu = Menu.objects.create(season='Autumn')
+
+        self.export.run()
+
+        self.assertIn('Autumn', self.read_page(
+            static_export.menu_path(menu.pk)))
+
+    def test_return_stale_pages_removed_by_full_export(self):
+        self.export.run()
+        path = static_export.menu_path(self.menu2.pk)
+        Menu.objects.filter(pk=self.menu2.pk).delete()
+        self.run_commit_hooks()
+        Change.objects.all().delete()
+
+        _, removed, _ = self.export.run(full=True)
+
+        self.assertEqual(1, removed)
+        self.assertFalse(os.path.exists(
+            static_export.get_file(self.directory, path)))
+
+    def test_return_static_files_copied_once(self):
+        self.export.run()
+
+        _, _, copied = self.export.run()
+
+        self.assertEqual(0, copied)
+
+    def test_return_export_static_command_report(self):
+        out = StringIO()
+
+        call_command('export_static', self.directory, stdout=out)
+
+        self.assertIn('Wrote 6 pages, removed 0', out.getvalue())
+
+
+class BenchConnectionsTestCase(TestCase):
+    '''Tests for the bench_connections command'''
+    def test_return_error_for_counts_below_1(self):
+        for options in ({'threads': 0}, {'requests': 0}):
+            with self.assertRaises(CommandError):
+                call_command('bench_connections', stdout=StringIO(), **options)
+
+
+class BenchTestCase(TestCase):
+    '''Tests for the helpers of the bench command'''
+    def test_return_every_benchmarked_url_reversible(self):
+        catalog = {'menus': [1], 'items': [1], 'ingredients': [1]}
+
+        urls = [bench.reverse_with(name, catalog)
+                for name in bench.get_url_names()]
+
+        self.assertNotIn(None, urls)
+        self.assertIn(reverse('home'), urls)
+        self.assertIn(reverse('accounts:login'), urls)
+
+    def test_return_regressions_over_threshold(self):
+        before = {'home': {'p95_ms': 10.0, 'queries': 2.0}}
+        after = {'home': {'p95_ms': 12.5, 'queries': 3.0}}
+
+        regressions = bench.Command().compare(after, before, 0.2)
+
+        self.assertEqual(2, len(regressions))
+
+    def test_return_no_regressions_within_threshold(self):
+        before = {'home': {'p95_ms': 10.0, 'queries': 2.0}}
+        after = {'home': {'p95_ms': 11.5, 'queries': 2.0}}
+
+        self.assertEqual([], bench.Command().compare(after, before, 0.2))
+
+    def test_return_cache_emptied_before_every_cold_request(self):
+        catalog = seeding.seed_catalog(menus=1, items=2, ingredients=2)
+
+        with mock.patch.object(bench.cache, 'clear') as clear:
+            results = bench.Command().measure(catalog, 2, cold=True)
+
+        self.assertEqual(2 * len(results), clear.call_count)
+
+    def test_return_anonymous_requests_not_signed_in(self):
+        catalog = seeding.seed_catalog(menus=1, items=2, ingredients=2)
+
+        with mock.patch.object(bench.Client, 'login') as login:
+            results = bench.Command().measure(catalog, 1, signed_in=False)
+
+        self.assertFalse(login.called)
+        self.assertEqual(302, results['menu_new']['status'])
+
+    def test_return_shared_state_of_site_left_alone(self):
+        bench_settings = bench.get_bench_settings('/tmp/bench')
+
+        self.assertIsNone(bench_settings['MAINTENANCE_INTERVAL'])
+        self.assertEqual('/tmp/bench/metrics', bench_settings['METRICS_DIR'])
+        self.assertEqual(bench.BENCH_CACHES, bench_settings['CACHES'])
+
+    def test_return_results_of_older_baselines_by_case(self):
+        command = bench.Command()
+        flat = {'results': {'home': {}}}
+        by_mode = {'results': {'cold': {'home': {}}, 'warm': {}}}
+
+        self.assertEqual(
+            {'warm-signed-in': {'home': {}}},
+            command.get_baseline_results(flat))
+        self.assertEqual(
+            {'cold-signed-in': {'home': {}}, 'warm-signed-in': {}},
+            command.get_baseline_results(by_mode))
+
+    def test_return_cache_kept_for_warm_requests(self):
+        catalog = seeding.seed_catalog(menus=1, items=2, ingredients=2)
+
+        with mock.patch.object(bench.cache, 'clear') as clear:
+            bench.Command().measure(catalog, 1)
+
+        self.assertFalse(clear.called)
+
+
+class EditItemPageGETRequestTestCase(FixtureTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('moe', 'moe@example.com', '12345')
+
+        cls.ingredient1 = Ingredient.objects.create(
             name='Salami'
         )
 
-        self.ingredient2 = Ingredient.objects.create(
+        cls.ingredient2 = Ingredient.objects.create(
             name='Tomato'
         )
 
-        self.ingredient3 = Ingredient.objects.create(
+        cls.ingredient3 = Ingredient.objects.create(
             name='Egg'
         )
 
-        self.ingredient4 = Ingredient.objects.create(
+        cls.ingredient4 = Ingredient.objects.create(
             name='Cheddar Cheese'
         )
 
-        self.item1 = Item.objects.create(
+        cls.item1 = Item.objects.create(
             name='Omelette',
             description='this is a delicious stuff',
-            chef=self.user,
+            chef=cls.user,
             standard=True
         )
 
-        self.item1.ingredients.add(self.ingredient1)
-        self.item1.ingredients.add(self.ingredient2)
-        self.item1.ingredients.add(self.ingredient3)
-        self.item1.ingredients.add(self.ingredient4)
+        cls.item1.ingredients.add(cls.ingredient1)
+        cls.item1.ingredients.add(cls.ingredient2)
+        cls.item1.ingredients.add(cls.ingredient3)
+        cls.item1.ingredients.add(cls.ingredient4)
 
     def test_return_status_okay_if_logged_in(self):
         expected = 200
@@ -888,38 +3095,39 @@ class EditItemPageGETRequestTestCase(TestCase):
         self.assertTemplateUsed(response, expected)
 
 
-class EditItemPagePOSTRequestTestCase(TestCase):
-    def setUp(self):
-        self.user1 = User.objects.create_user('laceywill', 'laceywill@example.com', '12345')
-        self.user2 = User.objects.create_user('moe', 'moe@example.com', '12345')
+class EditItemPagePOSTRequestTestCase(FixtureTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user1 = User.objects.create_user('laceywill', 'laceywill@example.com', '12345')
+        cls.user2 = User.objects.create_user('moe', 'moe@example.com', '12345')
 
-        self.ingredient1 = Ingredient.objects.create(
+        cls.ingredient1 = Ingredient.objects.create(
             name='Salami'
         )
 
-        self.ingredient2 = Ingredient.objects.create(
+        cls.ingredient2 = Ingredient.objects.create(
             name='Tomato'
         )
 
-        self.ingredient3 = Ingredient.objects.create(
+        cls.ingredient3 = Ingredient.objects.create(
             name='Egg'
         )
 
-        self.ingredient4 = Ingredient.objects.create(
+        cls.ingredient4 = Ingredient.objects.create(
             name='Cheddar Cheese'
         )
 
-        self.item1 = Item.objects.create(
+        cls.item1 = Item.objects.create(
             name='Omelette',
             description='this is a delicious stuff',
-            chef=self.user2,
+            chef=cls.user2,
             standard=True
         )
 
-        self.item1.ingredients.add(self.ingredient1)
-        self.item1.ingredients.add(self.ingredient2)
-        self.item1.ingredients.add(self.ingredient3)
-        self.item1.ingredients.add(self.ingredient4)
+        cls.item1.ingredients.add(cls.ingredient1)
+        cls.item1.ingredients.add(cls.ingredient2)
+        cls.item1.ingredients.add(cls.ingredient3)
+        cls.item1.ingredients.add(cls.ingredient4)
 
     def test_return_302_if_try_to_edit_while_not_logged_in(self):
         expected = 302
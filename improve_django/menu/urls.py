@@ -1,12 +1,29 @@
 from django.conf.urls import url
-from . import views
+from . import api, views
 
 urlpatterns = [
+    url(r'^api/v1/menus/$', api.menu_list, name='api_menu_list'),
+    url(r'^api/v1/menus/batch/$', api.menu_batch, name='api_menu_batch'),
+    url(r'^api/v1/menus/(?P<pk>\d+)/$', api.menu_detail, name='api_menu_detail'),
+    url(r'^api/v1/items/$', api.item_list, name='api_item_list'),
+    url(r'^api/v1/items/batch/$', api.item_batch, name='api_item_batch'),
+    url(r'^api/v1/items/(?P<pk>\d+)/$', api.item_detail, name='api_item_detail'),
+    url(r'^api/v1/ingredients/$', api.ingredient_list, name='api_ingredient_list'),
+    url(r'^api/v1/changes/$', api.change_list, name='api_change_list'),
+    url(r'^menu/item/search/$', views.item_search, name='item_search'),
+    url(r'^menu/item/search\.json$', views.item_search_json, name='item_search_json'),
+    url(r'^menu/item/filter/$', views.item_filter, name='item_filter'),
+    url(r'^menu/item/filter\.json$', views.item_filter_json, name='item_filter_json'),
     url(r'^menu/item/(?P<pk>\d+)/edit/$', views.item_edit, name='item_edit'),
     url(r'^menu/item/(?P<pk>\d+)/$', views.item_detail, name='item_detail'),
     url(r'^menu/(?P<pk>\d+)/edit/$', views.edit_menu, name='menu_edit'),
     url(r'^menu/(?P<pk>\d+)/$', views.menu_detail, name='menu_detail'),
     url(r'^menu/item/$', views.item_list, name='item_list'),
+    url(r'^menu/archive/$', views.menu_archive, name='menu_archive'),
+    url(r'^menu/archive/(?P<pk>\d+)/$', views.archived_menu_detail, name='archived_menu_detail'),
+    url(r'^menu/autocomplete/items\.json$', views.item_autocomplete, name='item_autocomplete'),
+    url(r'^menu/autocomplete/ingredients\.json$', views.ingredient_autocomplete, name='ingredient_autocomplete'),
+    url(r'^menu/export\.(?P<format>csv|jsonl)$', views.catalog_export, name='catalog_export'),
     url(r'^menu/new/$', views.create_new_menu, name='menu_new'),
     url(r'^$', views.home, name='home')
 ]
\ No newline at end of file
@@ -1,37 +1,214 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.http import condition
+from . import catalog_io, conditional, pagination, search
+from .cache import fragment_context, get_cached_object_or_404, get_version
+from .ingredient_index import ingredient_index
+from .loaders import Loader
 from .models import *
 from .forms import *
 
+# WSGI environ key set by menu/static_export.py. A static server ignores
+# ?cursor=, so the exported item list leaves out its Previous/Next links.
+STATIC_EXPORT = 'menu.views.static_export'
 
-def home(request):
-    all_menus = Menu.objects.prefetch_related('items').order_by('-expiration_date')
-    menus = []
-
-    for menu in all_menus:
-
-        if (
-            (menu.expiration_date is not None) and
-            (menu.expiration_date < timezone.now())
-        ):
-            continue
 
-        menus.append(menu)
+def _active_menus():
+    # The active set is small, so it is ordered here rather than in SQL:
+    # an ORDER BY makes SQLite scan the whole expiration_date index instead
+    # of doing two range searches for the OR in Menu.objects.active().
+    active_menus = Menu.objects.active().prefetch_related('items')
+    menus = sorted(
+        (menu for menu in active_menus if menu.expiration_date is not None),
+        key=lambda menu: menu.expiration_date,
+        reverse=True
+    )
+    menus += [menu for menu in active_menus if menu.expiration_date is None]
+    return menus
 
-    return render(request, 'menu/home.html', {'menus': menus})
+@condition(etag_func=conditional.home_etag)
+def home(request):
+    # Only evaluated when the cached fragment in home.html is missing.
+    menus = SimpleLazyObject(_active_menus)
+    context = fragment_context(get_version())
+    context['menus'] = menus
+    return render(request, 'menu/home.html', context)
 
+@condition(etag_func=conditional.menu_etag,
+           last_modified_func=conditional.menu_last_modified)
 def menu_detail(request, pk):
-    menu = get_object_or_404(Menu, pk=pk)
-    return render(request, 'menu/menu_detail.html', {'menu': menu})
+    version = get_version()
+    try:
+        menu = get_cached_object_or_404(
+            Menu.objects.prefetch_related('items'), pk, version=version)
+    except Http404:
+        # Links to a menu keep working once it has been archived.
+        if ArchivedMenu.objects.filter(pk=pk).exists():
+            return redirect('archived_menu_detail', pk=pk, permanent=True)
+        raise
+    context = fragment_context(version)
+    context['menu'] = menu
+    return render(request, 'menu/menu_detail.html', context)
 
+@condition(etag_func=conditional.item_etag,
+           last_modified_func=conditional.item_last_modified)
 def item_detail(request, pk):
-    item = get_object_or_404(Item, pk=pk)
-    return render(request, 'menu/item_detail.html', {'item': item})
+    version = get_version()
+    item = get_cached_object_or_404(
+        Item.objects.select_related('chef').prefetch_related('ingredients'),
+        pk,
+        version=version
+    )
+    context = fragment_context(version)
+    context['item'] = item
+    return render(request, 'menu/item_detail.html', context)
 
+@condition(etag_func=conditional.item_list_etag)
 def item_list(request):
-    items = Item.objects.order_by('name')
-    return render(request, 'menu/item_list.html', {'items': items})
+    try:
+        items = pagination.paginate(
+            Item.objects.all(),
+            ('name', 'pk'),
+            cursor=request.GET.get('cursor'),
+            size=pagination.get_page_size(request)
+        )
+    except pagination.InvalidCursor:
+        raise Http404('Invalid cursor')
+    return render(request, 'menu/item_list.html', {
+        'items': items,
+        'paginated': not request.META.get(STATIC_EXPORT),
+    })
+
+def menu_archive(request):
+    # Reads the archive tables only.
+    try:
+        menus = pagination.paginate(
+            ArchivedMenu.objects.prefetch_related('entries'),
+            ('pk',),
+            cursor=request.GET.get('cursor'),
+            size=pagination.get_page_size(request)
+        )
+    except pagination.InvalidCursor:
+        raise Http404('Invalid cursor')
+    return render(request, 'menu/menu_archive.html', {'menus': menus})
+
+def archived_menu_detail(request, pk):
+    menu = get_object_or_404(
+        ArchivedMenu.objects.prefetch_related('entries'), pk=pk)
+    return render(request, 'menu/archived_menu_detail.html', {'menu': menu})
+
+def _search_page(request):
+    query = request.GET.get('q', '')
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page = 1
+    results, has_next = search.search(
+        query, page=page, size=pagination.get_page_size(request))
+    return query, page, results, has_next
+
+def item_search(request):
+    query, page, results, has_next = _search_page(request)
+    return render(request, 'menu/item_search.html', {
+        'query': query,
+        'page': page,
+        'results': results,
+        'has_next': has_next,
+    })
+
+def item_search_json(request):
+    query, page, results, has_next = _search_page(request)
+    return JsonResponse({
+        'query': query,
+        'results': [result._asdict() for result in results],
+        'next_page': page + 1 if has_next else None,
+    })
+
+def _get_ids(request, name):
+    values = ','.join(request.GET.getlist(name)).split(',')
+    return [int(value) for value in values if value.strip().isdigit()]
+
+def _filter_page(request):
+    include = _get_ids(request, 'include')
+    exclude = _get_ids(request, 'exclude')
+    item_ids = ingredient_index.filter(include, exclude)
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page = 1
+    size = pagination.get_page_size(request)
+    page_ids = item_ids[(page - 1) * size:page * size]
+    items = Loader(Item.objects.all()).load_many(page_ids)
+    return {
+        'include': include,
+        'exclude': exclude,
+        'count': len(item_ids),
+        'page': page,
+        'has_next': page * size < len(item_ids),
+        'items': [item for item in items if item is not None],
+    }
+
+def item_filter(request):
+    context = _filter_page(request)
+    context['form'] = ItemFilterForm(
+        initial={'include': context['include'], 'exclude': context['exclude']})
+    return render(request, 'menu/item_filter.html', context)
+
+def item_filter_json(request):
+    context = _filter_page(request)
+    return JsonResponse({
+        'include': context['include'],
+        'exclude': context['exclude'],
+        'count': context['count'],
+        'results': [
+            {'pk': item.pk, 'name': item.name} for item in context['items']
+        ],
+        'next_page': context['page'] + 1 if context['has_next'] else None,
+    })
+
+def _autocomplete(request, queryset):
+    # Keyset pages over the (name, id) order, so a common prefix stops
+    # reading as soon as a page is full.
+    try:
+        results = pagination.paginate(
+            queryset.filter(name__istartswith=request.GET.get('q', '').strip()),
+            ('name', 'pk'),
+            cursor=request.GET.get('cursor'),
+            size=pagination.get_page_size(request, default=20)
+        )
+    except pagination.InvalidCursor:
+        raise Http404('Invalid cursor')
+    return JsonResponse({
+        'results': [{'pk': obj.pk, 'name': obj.name} for obj in results],
+        'next_cursor': results.next_cursor,
+    })
+
+@login_required
+def item_autocomplete(request):
+    return _autocomplete(request, Item.objects.only('pk', 'name'))
+
+# Public, as the item filter page that uses it is.
+def ingredient_autocomplete(request):
+    return _autocomplete(request, Ingredient.objects.only('pk', 'name'))
+
+@login_required
+def catalog_export(request, format):
+    chunks = catalog_io.encode_rows(catalog_io.iter_export_rows(), format)
+    filename = 'catalog.{0}'.format(format)
+    if request.GET.get('gzip'):
+        chunks = catalog_io.gzip_chunks(chunks)
+        response = StreamingHttpResponse(
+            chunks, content_type='application/gzip')
+        filename += '.gz'
+    else:
+        response = StreamingHttpResponse(
+            chunks, content_type=catalog_io.CONTENT_TYPES[format])
+    response['Content-Disposition'] = 'attachment; filename="{0}"'.format(
+        filename)
+    return response
 
 @login_required
 def create_new_menu(request):
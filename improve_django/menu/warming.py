@@ -0,0 +1,98 @@
+"""
+Cache warming, for right after a deploy.
+
+warm() requests the public menu pages the way a first visitor would: an
+anonymous GET through the whole middleware stack, so the rendered
+fragments (menu/cache.py), the microcache (menu/microcache.py) and the
+pages of the SQLite file are filled before real visitors arrive.
+
+The requests go through django.test.Client, one per worker thread, so no
+server has to be reachable. They are ordinary reads: the caches are only
+filled under the current catalog version and the locks of the microcache
+are shared with the live requests, so warming while traffic is served
+renders no page twice. The number of threads caps the extra load.
+
+Warming only helps the processes sharing the cache backend. With a
+per-process backend such as local memory it fills the cache of the
+warming process alone, and only the database pages end up warm.
+"""
+import queue
+import threading
+
+from django.core.urlresolvers import reverse
+from django.db import connections
+from django.test import Client
+
+from .models import Item, Menu
+
+
+def get_paths(using='default'):
+    """Paths of home, the first item list page and every active menu and
+    item page.
+    """
+    yield reverse('home')
+    yield reverse('item_list')
+    menus = Menu.objects.using(using).active().order_by('pk')
+    for pk in menus.values_list('pk', flat=True).iterator():
+        yield reverse('menu_detail', kwargs={'pk': pk})
+    items = Item.objects.using(using).order_by('pk')
+    for pk in items.values_list('pk', flat=True).iterator():
+        yield reverse('item_detail', kwargs={'pk': pk})
+
+
+class Warmer(object):
+    """Requests paths on a pool of threads, each with its own Client."""
+    def __init__(self, threads=4, host='localhost', secure=False):
+        self.threads = threads
+        self.host = host
+        self.secure = secure
+
+    def fetch(self, client, path):
+        """The status code of path, or None when the view raised."""
+        try:
+            return client.get(path, secure=self.secure).status_code
+        except Exception:
+            return None
+
+    def work(self, paths, results):
+        client = Client(HTTP_HOST=self.host)
+        try:
+            while True:
+                try:
+                    path = paths.get_nowait()
+                except queue.Empty:
+                    return
+                results.put((path, self.fetch(client, path)))
+        finally:
+            # The client keeps the connections of its thread open, as the
+            # test client does, so they are closed once it is done.
+            connections.close_all()
+
+    def warm(self, paths, progress=None):
+        """Request every path and return the paths that did not answer 200.
+
+        progress, if given, is called as progress(done, failed) after each
+        path, on the calling thread.
+        """
+        pending = queue.Queue()
+        for path in paths:
+            pending.put(path)
+        total = pending.qsize()
+        results = queue.Queue()
+        threads = [
+            threading.Thread(target=self.work, args=(pending, results))
+            for _ in range(min(self.threads, total))
+        ]
+        for thread in threads:
+            thread.start()
+
+        failed = []
+        for done in range(1, total + 1):
+            path, status = results.get()
+            if status != 200:
+                failed.append(path)
+            if progress is not None:
+                progress(done, len(failed))
+        for thread in threads:
+            thread.join()
+        return sorted(failed)
@@ -0,0 +1,43 @@
+from django import forms
+from django.core.urlresolvers import reverse_lazy
+from django.utils.encoding import force_text
+
+
+class AutocompleteSelectMultiple(forms.SelectMultiple):
+    """A <select multiple> that only renders the selected options.
+
+    The rest are looked up while typing through the JSON endpoint at url,
+    see assets/js/autocomplete.js, so a form no longer carries the whole
+    table of its ModelMultipleChoiceField.
+    """
+    class Media:
+        js = ('js/autocomplete.js',)
+
+    def __init__(self, url, attrs=None):
+        super(AutocompleteSelectMultiple, self).__init__(attrs)
+        self.url = url
+
+    def build_attrs(self, extra_attrs=None, **kwargs):
+        attrs = super(AutocompleteSelectMultiple, self).build_attrs(
+            extra_attrs, **kwargs)
+        attrs['data-autocomplete-url'] = force_text(self.url)
+        return attrs
+
+    def render_options(self, choices, selected_choices):
+        selected_choices = set(
+            force_text(value) for value in selected_choices
+            if force_text(value).isdigit())
+        if not selected_choices:
+            return ''
+        # One IN query for the selected objects instead of iterating over
+        # every choice of the field.
+        queryset = self.choices.queryset.filter(pk__in=selected_choices)
+        return '\n'.join(
+            self.render_option(selected_choices, *self.choices.choice(obj))
+            for obj in queryset.order_by('name', 'pk')
+        )
+
+
+def autocomplete(url_name):
+    return AutocompleteSelectMultiple(
+        reverse_lazy(url_name), attrs={'class': 'width-100'})
@@ -0,0 +1,58 @@
+"""
+File cache backend whose add() and incr() are atomic across processes.
+
+Django's FileBasedCache implements both as a read followed by a write, so
+two workers adding the same key both succeed and two increments at once
+count as one. menu/cache.py counts on incr() for the catalog version and
+menu/microcache.py on add() for the lock of a page, so this backend runs
+them under an exclusive lock on a file of the cache directory. Reads and
+plain sets do not take it, they were atomic already: a file is replaced
+at once.
+"""
+import contextlib
+import fcntl
+import io
+import os
+import pickle
+import time
+import zlib
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+
+LOCK_FILE = 'cache.lock'
+
+
+class LockingFileBasedCache(FileBasedCache):
+    @contextlib.contextmanager
+    def lock(self):
+        self._createdir()
+        with open(os.path.join(self._dir, LOCK_FILE), 'ab') as lock_file:
+            # Released when the file is closed.
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self.lock():
+            return super(LockingFileBasedCache, self).add(
+                key, value, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        """Add delta to the value of key, keeping its expiry."""
+        with self.lock():
+            try:
+                with io.open(self._key_to_file(key, version), 'rb') as data:
+                    expiry = pickle.load(data)
+                    value = pickle.loads(zlib.decompress(data.read()))
+            except FileNotFoundError:
+                expiry = value = None
+            timeout = None
+            if expiry is not None:
+                timeout = expiry - time.time()
+                if timeout <= 0:
+                    value = None
+            if value is None:
+                raise ValueError("Key '{0}' not found".format(key))
+            value += delta
+            self.set(key, value, timeout, version)
+            return value
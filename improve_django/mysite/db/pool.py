@@ -0,0 +1,125 @@
+"""
+A small thread-safe pool of DB-API connections.
+
+Django opens a connection on the first query of a request and closes it
+at the end of the request (CONN_MAX_AGE = 0). The pooled backends hand
+their connections back to a ConnectionPool instead of closing them, so
+the next request, in this thread or another, skips connecting and the
+per-connection setup.
+"""
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool(object):
+    def __init__(self, connect, min_size=1, max_size=10, timeout=10,
+                 idle_timeout=300, health_check_interval=30):
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+
+        self.condition = threading.Condition()
+        # (connection, time it was returned), most recently returned last.
+        self.idle = deque()
+        self.size = 0
+        self.stats = {
+            'created': 0,
+            'reused': 0,
+            'discarded': 0,
+            'health_checks': 0,
+            'waits': 0,
+            'timeouts': 0,
+        }
+
+    def acquire(self):
+        """Return (connection, reused), waiting while the pool is full."""
+        deadline = time.time() + self.timeout
+        with self.condition:
+            while True:
+                self._close_idle()
+                while self.idle:
+                    connection, returned = self.idle.pop()
+                    if self._is_healthy(connection, returned):
+                        self.stats['reused'] += 1
+                        return connection, True
+                    self._discard(connection)
+                if self.size < self.max_size:
+                    self.size += 1
+                    break
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    self.stats['timeouts'] += 1
+                    raise PoolTimeout(
+                        'No connection available within {0}s ({1} in use).'
+                        .format(self.timeout, self.size))
+                self.stats['waits'] += 1
+                self.condition.wait(remaining)
+
+        # Connect outside of the lock, its slot is already reserved.
+        try:
+            connection = self.connect()
+        except Exception:
+            with self.condition:
+                self.size -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.stats['created'] += 1
+        return connection, False
+
+    def release(self, connection):
+        with self.condition:
+            self.idle.append((connection, time.time()))
+            self.condition.notify()
+
+    def discard(self, connection):
+        """Close a connection that must not be reused."""
+        with self.condition:
+            self._discard(connection)
+            self.condition.notify()
+
+    def get_stats(self):
+        with self.condition:
+            stats = dict(self.stats)
+            stats.update({
+                'size': self.size,
+                'idle': len(self.idle),
+                'in_use': self.size - len(self.idle),
+                'max_size': self.max_size,
+            })
+            return stats
+
+    def _discard(self, connection):
+        self.size -= 1
+        self.stats['discarded'] += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _close_idle(self):
+        # The oldest idle connections are on the left; keep min_size.
+        cutoff = time.time() - self.idle_timeout
+        while (
+            self.idle and self.size > self.min_size and
+            self.idle[0][1] < cutoff
+        ):
+            self._discard(self.idle.popleft()[0])
+
+    def _is_healthy(self, connection, returned):
+        if time.time() - returned < self.health_check_interval:
+            return True
+        self.stats['health_checks'] += 1
+        try:
+            connection.execute('SELECT 1').fetchone()
+        except Exception:
+            return False
+        return True
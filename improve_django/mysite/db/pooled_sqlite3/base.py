@@ -0,0 +1,119 @@
+"""
+SQLite backend whose connections are kept in a ConnectionPool.
+
+Pool settings come from the POOL entry of the database settings, e.g.
+
+    'POOL': {'MIN_SIZE': 1, 'MAX_SIZE': 10, 'TIMEOUT': 10,
+             'IDLE_TIMEOUT': 300, 'HEALTH_CHECK_INTERVAL': 30}
+
+In-memory databases (the test database) are not pooled, Django already
+keeps their single connection open. Cursors report the time of every
+query to mysite/metrics.py and count it for its alias in
+mysite/db_routers.py.
+"""
+import threading
+import time
+
+from django.db.backends import utils
+from django.db.backends.sqlite3 import base
+
+from mysite import db_routers, metrics
+
+from .. import tuning  # noqa: connects the connection_created hook
+from ..pool import ConnectionPool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, settings_dict, connect):
+    key = (alias, settings_dict['NAME'])
+    with _pools_lock:
+        if key not in _pools:
+            options = settings_dict.get('POOL', {})
+            _pools[key] = ConnectionPool(
+                connect,
+                min_size=options.get('MIN_SIZE', 1),
+                max_size=options.get('MAX_SIZE', 10),
+                timeout=options.get('TIMEOUT', 10),
+                idle_timeout=options.get('IDLE_TIMEOUT', 300),
+                health_check_interval=options.get('HEALTH_CHECK_INTERVAL', 30),
+            )
+        return _pools[key]
+
+
+def get_pool_stats():
+    """{alias: stats} for the pools of this process."""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {alias: pool.get_stats() for (alias, _), pool in pools.items()}
+
+
+class TimingMixin(object):
+    def execute(self, sql, params=None):
+        started = time.perf_counter()
+        try:
+            return super(TimingMixin, self).execute(sql, params)
+        finally:
+            metrics.record_query(time.perf_counter() - started)
+            db_routers.count(self.db.alias, sql)
+
+    def executemany(self, sql, param_list):
+        started = time.perf_counter()
+        try:
+            return super(TimingMixin, self).executemany(sql, param_list)
+        finally:
+            metrics.record_query(time.perf_counter() - started)
+            db_routers.count(self.db.alias, sql)
+
+
+class TimingCursorWrapper(TimingMixin, utils.CursorWrapper):
+    pass
+
+
+class TimingCursorDebugWrapper(TimingMixin, utils.CursorDebugWrapper):
+    pass
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super(DatabaseWrapper, self).__init__(*args, **kwargs)
+        # Whether the current connection came back out of the pool; the
+        # tuning hook only needs to run on new ones.
+        self.reused_connection = False
+
+    @property
+    def pool(self):
+        if self.is_in_memory_db(self.settings_dict['NAME']):
+            return None
+        params = self.get_connection_params()
+        return get_pool(
+            self.alias, self.settings_dict,
+            lambda: base.DatabaseWrapper.get_new_connection(self, params))
+
+    def make_cursor(self, cursor):
+        return TimingCursorWrapper(cursor, self)
+
+    def make_debug_cursor(self, cursor):
+        return TimingCursorDebugWrapper(cursor, self)
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            self.reused_connection = False
+            return super(DatabaseWrapper, self).get_new_connection(conn_params)
+        connection, self.reused_connection = pool.acquire()
+        return connection
+
+    def _close(self):
+        pool = self.pool
+        if pool is None:
+            return super(DatabaseWrapper, self)._close()
+        if self.in_atomic_block or self.errors_occurred:
+            # Django keeps using a connection closed inside atomic(), and
+            # one that raised may be broken: neither can go back.
+            pool.discard(self.connection)
+            return
+        if self.connection.in_transaction:
+            self.connection.rollback()
+        pool.release(self.connection)
@@ -0,0 +1,24 @@
+"""
+Per-connection SQLite tuning, applied when Django opens a connection.
+
+The pragmas come from settings.SQLITE_PRAGMAS. WAL lets readers run while
+a writer commits instead of queuing behind it, synchronous=NORMAL is safe
+with WAL, and cache_size / mmap_size keep more of the database in memory.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    if getattr(connection, 'reused_connection', False):
+        return
+    # WAL does not apply to, and mmap is pointless for, in-memory databases.
+    if connection.is_in_memory_db(connection.settings_dict['NAME']):
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in getattr(settings, 'SQLITE_PRAGMAS', ()):
+            cursor.execute('PRAGMA {0} = {1}'.format(pragma, value))
@@ -0,0 +1,134 @@
+"""
+Primary / replica database routing.
+
+Reads of the apps in REPLICA_APP_LABELS go to one of REPLICA_DATABASES,
+everything else (and every write) goes to the primary, 'default'. With
+no replicas configured every query goes to 'default', as before.
+
+A replica may lag behind by up to REPLICA_STICKY_SECONDS, so
+ReplicaPinningMiddleware pins a request to the primary when it is not a
+safe method, or when its user wrote to one of those apps in the last
+REPLICA_STICKY_SECONDS, remembered in their session. Writes to other apps,
+such as session saves, pin nothing.
+
+The caches of the menu pages are shared by every request and keyed on a
+catalog version that a write moves on (menu/cache.py). may_fill_cache()
+keeps them from being filled by requests whose reads may not match what
+everyone else reads under that version: pinned requests, and every
+request while a write of the last REPLICA_STICKY_SECONDS may not have
+reached the replicas, remembered in the default cache. Those requests
+read the caches but render what is missing themselves.
+
+The cursors of mysite/db/pooled_sqlite3 count the queries run on each
+alias, see count().
+"""
+import random
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+PRIMARY = 'default'
+PINNED_UNTIL_KEY = '_db_pinned_until'
+STALE_UNTIL_KEY = 'db:replicas-stale-until'
+READ_STATEMENTS = ('SELECT', 'WITH', 'PRAGMA', 'EXPLAIN')
+
+_state = threading.local()
+_counts = Counter()
+_counts_lock = threading.Lock()
+
+
+def get_replicas():
+    return getattr(settings, 'REPLICA_DATABASES', [])
+
+
+def is_pinned():
+    return getattr(_state, 'pinned', False)
+
+
+def pin_to_primary(pinned=True):
+    _state.pinned = pinned
+
+
+def is_replicated(model):
+    return model._meta.app_label in settings.REPLICA_APP_LABELS
+
+
+def mark_replicas_stale():
+    """Keep cache fills off the replicas until they caught up."""
+    sticky = settings.REPLICA_STICKY_SECONDS
+    cache.set(STALE_UNTIL_KEY, time.time() + sticky, sticky)
+
+
+def are_replicas_stale():
+    return cache.get(STALE_UNTIL_KEY, 0) > time.time()
+
+
+def may_fill_cache():
+    """Whether this request may store what it read in the menu caches."""
+    if not get_replicas():
+        return True
+    return not is_pinned() and not are_replicas_stale()
+
+
+def count(alias, sql):
+    """Count a query run on alias, as a read or a write."""
+    words = sql.split(None, 1)
+    kind = 'read' if words and words[0].upper() in READ_STATEMENTS else 'write'
+    with _counts_lock:
+        _counts[alias, kind] += 1
+
+
+def get_counts():
+    """Queries run so far by this process, {(alias, kind): count}."""
+    with _counts_lock:
+        return dict(_counts)
+
+
+class PrimaryReplicaRouter(object):
+    def db_for_read(self, model, **hints):
+        replicas = get_replicas()
+        if replicas and not is_pinned() and is_replicated(model):
+            return random.choice(replicas)
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        if is_replicated(model):
+            _state.wrote = True
+            if get_replicas():
+                mark_replicas_stale()
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the same rows as the primary.
+        aliases = {PRIMARY} | set(get_replicas())
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas get their schema through replication.
+        return db not in get_replicas()
+
+
+class ReplicaPinningMiddleware(object):
+    """Gives a user read-your-writes on the primary after their own edit.
+
+    Must come right after SessionMiddleware, before anything reads.
+    """
+    def process_request(self, request):
+        _state.wrote = False
+        pinned_until = request.session.get(PINNED_UNTIL_KEY, 0)
+        pin_to_primary(
+            request.method not in ('GET', 'HEAD', 'OPTIONS') or
+            pinned_until > time.time())
+
+    def process_response(self, request, response):
+        if getattr(_state, 'wrote', False) and hasattr(request, 'session'):
+            request.session[PINNED_UNTIL_KEY] = (
+                time.time() + settings.REPLICA_STICKY_SECONDS)
+        _state.wrote = False
+        pin_to_primary(False)
+        return response
@@ -0,0 +1,121 @@
+"""
+Periodic maintenance run by the web workers themselves.
+
+On Heroku every dyno has its own copy of the SQLite file, so a separate
+worker dyno would only ever clean its own copy, never the one the web
+dyno serves, and every process type is one more dyno running around the
+clock. The management commands of MAINTENANCE_JOBS therefore run inside
+the web processes: after a response, MaintenanceMiddleware starts the
+jobs that are due on a background thread.
+
+A job is due when it did not run for MAINTENANCE_INTERVAL seconds on this
+machine. The modification time of its stamp file in MAINTENANCE_DIR
+tells when it last did, and a lock on that file keeps two workers from
+running it at once. Each process looks at the stamps at most once per
+MAINTENANCE_CHECK_INTERVAL seconds, so requests in between pay nothing.
+With MAINTENANCE_INTERVAL set to None nothing runs, as in the tests.
+"""
+import fcntl
+import io
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_next_check = [0]
+_running = [False]
+
+
+def get_stamp(job):
+    return os.path.join(settings.MAINTENANCE_DIR, '{0}.stamp'.format(job))
+
+
+def is_due(job, now):
+    try:
+        last_run = os.stat(get_stamp(job)).st_mtime
+    except FileNotFoundError:
+        return True
+    return last_run + settings.MAINTENANCE_INTERVAL <= now
+
+
+def run_job(job):
+    """Run job unless another process is at it or it ran too recently.
+
+    Returns whether it ran.
+    """
+    descriptor = os.open(get_stamp(job), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        try:
+            fcntl.flock(descriptor, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        # Checked again under the lock, another process may just have run
+        # it. An empty stamp was just created: its job never ran.
+        stamp = os.fstat(descriptor)
+        if (stamp.st_size and
+                stamp.st_mtime + settings.MAINTENANCE_INTERVAL > time.time()):
+            return False
+        try:
+            call_command(job, stdout=io.StringIO())
+        except Exception:
+            logger.exception('Maintenance job %s failed.', job)
+        if not stamp.st_size:
+            os.write(descriptor, b'.')
+        os.utime(descriptor)
+        return True
+    finally:
+        # Closing the file releases its lock.
+        os.close(descriptor)
+
+
+def run_due_jobs():
+    """Run every job that is due and return the names of those that ran."""
+    os.makedirs(settings.MAINTENANCE_DIR, exist_ok=True)
+    now = time.time()
+    ran = []
+    try:
+        for job in settings.MAINTENANCE_JOBS:
+            if is_due(job, now) and run_job(job):
+                ran.append(job)
+    finally:
+        # The connections of this thread are not closed by any request.
+        connections.close_all()
+    return ran
+
+
+def run_in_background():
+    try:
+        run_due_jobs()
+    finally:
+        with _lock:
+            _running[0] = False
+
+
+def start_due_jobs(now=None):
+    """Start run_due_jobs() on a thread if it is time to look, and no
+    thread of this process is at it already.
+    """
+    if settings.MAINTENANCE_INTERVAL is None:
+        return False
+    now = time.time() if now is None else now
+    with _lock:
+        if _running[0] or now < _next_check[0]:
+            return False
+        _next_check[0] = now + settings.MAINTENANCE_CHECK_INTERVAL
+        _running[0] = True
+    thread = threading.Thread(target=run_in_background, daemon=True)
+    thread.start()
+    return True
+
+
+class MaintenanceMiddleware(object):
+    def process_response(self, request, response):
+        start_due_jobs()
+        return response
@@ -0,0 +1,362 @@
+"""
+Per-view request metrics in Prometheus text format.
+
+MetricsMiddleware times every request and files it under the URL name
+of its view: wall time, time spent in the database and number of
+queries (counted by the cursors of mysite/db/pooled_sqlite3) and time
+spent rendering templates (timed by TimedDjangoTemplates). The accounts
+app adds the time spent hashing passwords and the sign ins turned away.
+
+Every process aggregates into in-memory histograms and, at most once per
+METRICS_FLUSH_INTERVAL seconds, writes them to its own file in
+METRICS_DIR. /metrics sums the files of the other gunicorn workers and
+the live metrics of the worker answering, so a scrape sees the whole
+server whichever worker answers it. The files of workers that exited are
+removed by the scrape, and the gauges of a file not written for
+METRICS_STALE_AFTER seconds are left out: they tell how things were, not
+how they are.
+
+/metrics answers 404 unless DEBUG is on or the request carries
+METRICS_TOKEN as its bearer token (bearer_token in the scrape config of
+Prometheus), so the names and traffic of the views are not public.
+"""
+import glob
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.template.backends.django import DjangoTemplates
+from django.utils.crypto import constant_time_compare
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float('inf'))
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, float('inf'))
+
+HISTOGRAMS = {
+    'django_view_duration_seconds': (
+        'Wall time of the requests of a view.', LATENCY_BUCKETS),
+    'django_view_db_duration_seconds': (
+        'Time a request of a view spent in database queries.',
+        LATENCY_BUCKETS),
+    'django_view_db_queries': (
+        'Database queries run by a request of a view.', QUERY_BUCKETS),
+    'django_view_template_duration_seconds': (
+        'Time a request of a view spent rendering templates.',
+        LATENCY_BUCKETS),
+    'django_password_hash_duration_seconds': (
+        'Time spent hashing one password, waiting for a slot included.',
+        LATENCY_BUCKETS),
+}
+COUNTERS = {
+    'django_view_responses_total': 'Responses of a view by status code.',
+    'django_db_routed_total': 'Reads and writes run on a database alias.',
+    'django_auth_rejected_total': (
+        'Sign in and sign up requests turned away, by reason.'),
+}
+GAUGES = {
+    'django_db_pool_connections': 'Connections of the pooled backends.',
+}
+
+_request = threading.local()
+_lock = threading.Lock()
+# {metric: {labels: value}}, labels being a sorted tuple of pairs. A
+# histogram value is [bucket counts..., sum, count].
+_histograms = {}
+_counters = {}
+_last_flush = 0
+_process_id = (None, None)
+
+
+# Collection, called by the middleware, cursors and template backend.
+
+def start_request():
+    _request.db_time = 0.0
+    _request.queries = 0
+    _request.template_time = 0.0
+
+
+def record_query(duration):
+    if hasattr(_request, 'queries'):
+        _request.queries += 1
+        _request.db_time += duration
+
+
+def record_template(duration):
+    if hasattr(_request, 'template_time'):
+        _request.template_time += duration
+
+
+def finish_request(view, status, duration):
+    labels = (('view', view),)
+    with _lock:
+        observe('django_view_duration_seconds', labels, duration)
+        observe('django_view_db_duration_seconds', labels, _request.db_time)
+        observe('django_view_db_queries', labels, _request.queries)
+        observe('django_view_template_duration_seconds', labels,
+                _request.template_time)
+        increment('django_view_responses_total',
+                  labels + (('status', str(status)),))
+    del _request.queries, _request.db_time, _request.template_time
+
+
+def record_password_hash(algorithm, duration):
+    with _lock:
+        observe('django_password_hash_duration_seconds',
+                (('algorithm', algorithm),), duration)
+
+
+def record_auth_rejection(view, reason):
+    with _lock:
+        increment('django_auth_rejected_total',
+                  (('reason', reason), ('view', view)))
+
+
+def increment(name, labels):
+    key = tuple(sorted(labels))
+    counters = _counters.setdefault(name, {})
+    counters[key] = counters.get(key, 0) + 1
+
+
+def observe(name, labels, value):
+    buckets = HISTOGRAMS[name][1]
+    values = _histograms.setdefault(name, {}).setdefault(
+        labels, [0] * (len(buckets) + 2))
+    for i, bound in enumerate(buckets):
+        if value <= bound:
+            values[i] += 1
+    values[-2] += value
+    values[-1] += 1
+
+
+# The file store shared by the workers.
+
+def get_directory():
+    return settings.METRICS_DIR
+
+
+def get_process_id():
+    """Names the file of this process.
+
+    Worked out again after a fork, as processes forked from one that
+    imported this module (gunicorn --preload, parallel tests) would
+    otherwise share it. The pid alone may be reused by a later worker.
+    """
+    global _process_id
+    pid = os.getpid()
+    if _process_id[0] != pid:
+        _process_id = (pid, '{0}-{1}'.format(pid, int(time.time() * 1000)))
+    return _process_id[1]
+
+
+def snapshot():
+    """This process' metrics as a JSON serializable dict."""
+    # Imported here: the router and pool modules load Django settings.
+    from mysite.db.pooled_sqlite3.base import get_pool_stats
+    from mysite.db_routers import get_counts
+
+    with _lock:
+        data = {
+            'histograms': {
+                name: [[list(labels), values] for labels, values in series.items()]
+                for name, series in _histograms.items()
+            },
+            'counters': {
+                name: [[list(labels), value] for labels, value in series.items()]
+                for name, series in _counters.items()
+            },
+        }
+    data['counters']['django_db_routed_total'] = [
+        [[['alias', alias], ['kind', kind]], value]
+        for (alias, kind), value in get_counts().items()
+    ]
+    data['gauges'] = {'django_db_pool_connections': [
+        [[['alias', alias], ['state', state]], stats[state]]
+        for alias, stats in get_pool_stats().items()
+        for state in ('in_use', 'idle')
+    ]}
+    return data
+
+
+def get_path():
+    return os.path.join(
+        get_directory(), 'metrics-{0}.json'.format(get_process_id()))
+
+
+def get_pid(path):
+    """The pid in the name of a metrics file, None if it has none."""
+    pid = os.path.basename(path)[len('metrics-'):].split('-', 1)[0]
+    return int(pid) if pid.isdigit() else None
+
+
+def is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Running, as another user.
+        pass
+    return True
+
+
+def flush(force=False):
+    """Write this process' file, unless it was written very recently."""
+    global _last_flush
+    now = time.time()
+    if not force and now - _last_flush < settings.METRICS_FLUSH_INTERVAL:
+        return
+    _last_flush = now
+    directory = get_directory()
+    os.makedirs(directory, exist_ok=True)
+    path = get_path()
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as output:
+        json.dump(snapshot(), output)
+    os.replace(temporary, path)
+
+
+def read_snapshots():
+    """This process' snapshot, then those in the files of the others
+    still running, removing the files of those that exited.
+    """
+    yield snapshot()
+    own = get_path()
+    stale_before = time.time() - settings.METRICS_STALE_AFTER
+    for path in glob.glob(os.path.join(get_directory(), 'metrics-*.json')):
+        if path == own:
+            continue
+        pid = get_pid(path)
+        if pid is not None and not is_alive(pid):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        try:
+            written = os.path.getmtime(path)
+            with open(path) as data:
+                other = json.load(data)
+        except (OSError, ValueError):
+            continue
+        if written < stale_before:
+            # Its pid may even belong to another process by now.
+            other.pop('gauges', None)
+        yield other
+
+
+def collect():
+    """Sum the metrics of every process into
+    {kind: {name: {labels: value}}}.
+    """
+    totals = {'histograms': {}, 'counters': {}, 'gauges': {}}
+    for data in read_snapshots():
+        for kind, series_by_name in data.items():
+            for name, series in series_by_name.items():
+                merged = totals[kind].setdefault(name, {})
+                for labels, value in series:
+                    labels = tuple(sorted(tuple(pair) for pair in labels))
+                    if kind == 'histograms':
+                        current = merged.setdefault(labels, [0] * len(value))
+                        merged[labels] = [a + b for a, b in zip(current, value)]
+                    else:
+                        merged[labels] = merged.get(labels, 0) + value
+    return totals
+
+
+def format_labels(labels):
+    return ','.join(
+        '{0}="{1}"'.format(name, str(value).replace('\\', r'\\')
+                           .replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in labels)
+
+
+def format_value(value):
+    return '+Inf' if value == float('inf') else repr(float(value))
+
+
+def render(totals):
+    lines = []
+    for name, (help_text, buckets) in sorted(HISTOGRAMS.items()):
+        lines.append('# HELP {0} {1}'.format(name, help_text))
+        lines.append('# TYPE {0} histogram'.format(name))
+        for labels, values in sorted(totals['histograms'].get(name, {}).items()):
+            for bound, count in zip(buckets, values):
+                lines.append('{0}_bucket{{{1}}} {2}'.format(
+                    name, format_labels(labels + (('le', format_value(bound)),)),
+                    count))
+            lines.append('{0}_sum{{{1}}} {2}'.format(
+                name, format_labels(labels), format_value(values[-2])))
+            lines.append('{0}_count{{{1}}} {2}'.format(
+                name, format_labels(labels), values[-1]))
+    for kind, help_texts in (('counter', COUNTERS), ('gauge', GAUGES)):
+        for name, help_text in sorted(help_texts.items()):
+            lines.append('# HELP {0} {1}'.format(name, help_text))
+            lines.append('# TYPE {0} {1}'.format(name, kind))
+            series = totals[kind + 's'].get(name, {})
+            for labels, value in sorted(series.items()):
+                lines.append('{0}{{{1}}} {2}'.format(
+                    name, format_labels(labels), value))
+    return '\n'.join(lines) + '\n'
+
+
+def is_allowed(request):
+    if settings.DEBUG:
+        return True
+    token = settings.METRICS_TOKEN
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    return bool(token) and constant_time_compare(
+        authorization, 'Bearer {0}'.format(token))
+
+
+def metrics(request):
+    if not is_allowed(request):
+        raise Http404
+    return HttpResponse(
+        render(collect()), content_type='text/plain; version=0.0.4')
+
+
+class MetricsMiddleware(object):
+    """Must come first, so that it times the other middleware too."""
+    def process_request(self, request):
+        request._metrics_started = time.perf_counter()
+        start_request()
+
+    def process_response(self, request, response):
+        started = getattr(request, '_metrics_started', None)
+        if started is None:
+            return response
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else '<unresolved>'
+        finish_request(
+            view, response.status_code, time.perf_counter() - started)
+        flush()
+        return response
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing the templates it renders."""
+    def from_string(self, template_code):
+        return TimedTemplate(
+            super(TimedDjangoTemplates, self).from_string(template_code))
+
+    def get_template(self, template_name, *args, **kwargs):
+        return TimedTemplate(super(TimedDjangoTemplates, self).get_template(
+            template_name, *args, **kwargs))
+
+
+class TimedTemplate(object):
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            record_template(time.perf_counter() - started)
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/1.8/ref/settings/
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 import os
+import tempfile
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -47,7 +48,11 @@ INSTALLED_APPS = (
 )
 
 MIDDLEWARE_CLASSES = (
+    'mysite.metrics.MetricsMiddleware',
+    'mysite.maintenance.MaintenanceMiddleware',
+    'menu.microcache.MicrocacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'mysite.db_routers.ReplicaPinningMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -63,7 +68,7 @@ ROOT_URLCONF = 'mysite.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'mysite.metrics.TimedDjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -84,13 +89,166 @@ INTERNAL_IPS = ['127.0.0.1', '::1', '0.0.0.0']
 # Database
 # https://docs.djangoproject.com/en/1.8/ref/settings/#databases
 
+# The pooled backend returns connections to a per-process pool at the end
+# of a request instead of closing them, see mysite/db/pooled_sqlite3.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'mysite.db.pooled_sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'POOL': {
+            'MIN_SIZE': 1,
+            'MAX_SIZE': 10,
+        },
+    }
+}
+
+# Applied to every new SQLite connection, see mysite/db/tuning.py.
+SQLITE_PRAGMAS = [
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('cache_size', -16000),  # KiB, i.e. 16 MB
+    ('mmap_size', 128 * 1024 * 1024),
+]
+
+# Read replicas, see mysite/db_routers.py. To try them locally, copy
+# db.sqlite3 and point DJANGO_DB_REPLICA at the copy; it then stands in for
+# a replica that only catches up when it is copied again.
+REPLICA_DATABASES = []
+if os.environ.get('DJANGO_DB_REPLICA'):
+    DATABASES['replica'] = {
+        'ENGINE': 'mysite.db.pooled_sqlite3',
+        'NAME': os.environ['DJANGO_DB_REPLICA'],
+        'TEST': {'MIRROR': 'default'},
     }
+    REPLICA_DATABASES = ['replica']
+
+DATABASE_ROUTERS = ['mysite.db_routers.PrimaryReplicaRouter']
+
+# Apps whose reads may go to a replica. accounts keeps its users in auth.
+REPLICA_APP_LABELS = ('menu', 'accounts', 'auth')
+
+# Seconds reads go to the primary after a write: the most a replica may lag.
+REPLICA_STICKY_SECONDS = 5
+
+# Called before a request stores what it read in the menu caches, see
+# menu/cache.py: no fills from reads that may lag behind the version.
+MENU_CACHE_FILL_CHECK = 'mysite.db_routers.may_fill_cache'
+
+
+# Sessions and users
+# Sessions are read from the cache and written through to the database;
+# accounts/backends.py caches the signed-in users, see USER_CACHE_TIMEOUT.
+# Expired sessions are deleted by the purge_expired_sessions command.
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+AUTHENTICATION_BACKENDS = ['accounts.backends.CachedModelBackend']
+
+USER_CACHE_TIMEOUT = 15 * 60
+
+# At most PASSWORD_HASHING_SLOTS passwords are hashed at once across the
+# workers of a machine, see accounts/hashers.py. The sign in and sign up
+# pages answer a 503 after waiting PASSWORD_HASHING_WAIT seconds for a slot.
+PASSWORD_HASHERS = [
+    'accounts.hashers.BoundedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+PASSWORD_HASHING_SLOTS = 2
+PASSWORD_HASHING_WAIT = 0.5
+PASSWORD_HASHING_LOCK_DIR = os.path.join(
+    tempfile.gettempdir(), 'improve_django_hashing')
+
+# Sign in and sign up POSTs allowed per client IP and per username:
+# (requests, per seconds), see accounts/throttle.py.
+LOGIN_THROTTLE_RATES = {
+    'ip': (30, 60),
+    'username': (10, 60),
 }
 
+# Number of proxies in front of the site that append to X-Forwarded-For,
+# whose entries give the client IP. One on Heroku (DYNO is set on every
+# dyno), for its router; none when clients connect directly, where the
+# header would be theirs to make up.
+TRUSTED_PROXIES = int(os.environ.get(
+    'DJANGO_TRUSTED_PROXIES', 1 if 'DYNO' in os.environ else 0))
+
+
+# Tests
+# mysite/test_runner.py hashes passwords quickly and reports the wall time.
+
+TEST_RUNNER = 'mysite.test_runner.TestRunner'
+
+
+# Cache
+# https://docs.djangoproject.com/en/1.9/topics/cache/
+# Every worker process must see the same catalog version (menu/cache.py),
+# or an edit made through one worker, or by a management command, leaves
+# the others serving old pages. The default is therefore a file cache,
+# which the processes of one machine share, with add() and incr() made
+# atomic by mysite/cache.py; point these at memcached or another shared
+# backend with atomic add() and incr() to go beyond one machine.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'DJANGO_CACHE_BACKEND',
+            'mysite.cache.LockingFileBasedCache'),
+        'LOCATION': os.environ.get(
+            'DJANGO_CACHE_LOCATION',
+            os.path.join(tempfile.gettempdir(), 'improve_django_cache')),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
+# Seconds a rendered menu page stays cached; edits invalidate it sooner.
+MENU_CACHE_TIMEOUT = 60 * 60
+
+# Menus expired for longer than this many days are moved to the archive
+# tables by the archive_menus command, see menu/archive.py. It is one of
+# the MAINTENANCE_JOBS.
+MENU_ARCHIVE_AFTER_DAYS = 30
+
+# Whole responses of anonymous menu pages, see menu/microcache.py: served
+# fresh for MICROCACHE_TIMEOUT seconds, then stale while one request
+# renders the page again. Seconds, like the lock ones.
+MICROCACHE_TIMEOUT = 5
+MICROCACHE_STALE_TIMEOUT = 60
+MICROCACHE_LOCK_TIMEOUT = 10
+MICROCACHE_LOCK_WAIT = 2
+
+
+# Default and largest number of rows on a paginated page (?size=).
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+# Per-view metrics served at /metrics, see mysite/metrics.py. Every worker
+# writes its own file here at most every METRICS_FLUSH_INTERVAL seconds;
+# the files of exited workers are removed when /metrics is scraped, and
+# the gauges of files older than METRICS_STALE_AFTER seconds ignored.
+METRICS_DIR = os.environ.get(
+    'DJANGO_METRICS_DIR',
+    os.path.join(tempfile.gettempdir(), 'improve_django_metrics'))
+METRICS_FLUSH_INTERVAL = 1
+METRICS_STALE_AFTER = 60
+# Bearer token a scrape of /metrics must send; without one /metrics is
+# only served with DEBUG on.
+METRICS_TOKEN = os.environ.get('DJANGO_METRICS_TOKEN')
+
+
+# Management commands the web workers run every MAINTENANCE_INTERVAL
+# seconds, see mysite/maintenance.py. They run in the web process because
+# on Heroku each dyno has its own SQLite file: a worker dyno would clean
+# its own copy only. A MAINTENANCE_INTERVAL of None turns them off.
+MAINTENANCE_JOBS = [
+    'purge_expired_sessions', 'archive_menus', 'compact_changes']
+MAINTENANCE_INTERVAL = 60 * 60
+MAINTENANCE_CHECK_INTERVAL = 60
+MAINTENANCE_DIR = os.path.join(
+    tempfile.gettempdir(), 'improve_django_maintenance')
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/1.8/topics/i18n/
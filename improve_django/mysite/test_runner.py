@@ -0,0 +1,50 @@
+"""
+The test runner of the project, set as TEST_RUNNER.
+
+It is the DiscoverRunner with four changes. Passwords are hashed with MD5
+instead of PBKDF2, whose cost is there on purpose and would otherwise
+dominate every test that creates a user or signs in. The cache is kept in
+memory, as the file cache of the settings would be shared by the processes
+of a --parallel run, which clear it in every test. The maintenance jobs of
+mysite/maintenance.py are off, so that no request of a test starts them on
+a thread of its own. And the wall time of the whole run, database setup
+and teardown included, is reported at the end, to compare runs with
+different --parallel values: every process gets its own copy of the test
+database.
+"""
+import sys
+import time
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+TEST_PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super(TestRunner, self).setup_test_environment(**kwargs)
+        self.settings = override_settings(
+            PASSWORD_HASHERS=TEST_PASSWORD_HASHERS, CACHES=TEST_CACHES,
+            MAINTENANCE_INTERVAL=None)
+        self.settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.settings.disable()
+        super(TestRunner, self).teardown_test_environment(**kwargs)
+
+    def run_tests(self, test_labels, extra_tests=None, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super(TestRunner, self).run_tests(
+                test_labels, extra_tests, **kwargs)
+        finally:
+            if self.verbosity > 0:
+                sys.stderr.write(
+                    'Wall time {0:.2f}s, {1} process(es).\n'.format(
+                        time.perf_counter() - started, self.parallel))
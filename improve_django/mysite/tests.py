@@ -0,0 +1,490 @@
+import datetime
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import CacheHandler, cache
+from django.core.urlresolvers import reverse
+from django.db import connections
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from menu import cache as menu_cache
+from menu.models import Change, Item, Menu
+from . import db_routers, maintenance, metrics
+from . import settings as project_settings
+from .db.pool import ConnectionPool, PoolTimeout
+
+
+@override_settings(REPLICA_DATABASES=['replica'])
+class PrimaryReplicaRouterTestCase(TestCase):
+    '''Tests for the routing of reads and writes to primary and replica'''
+    def setUp(self):
+        cache.clear()
+        self.router = db_routers.PrimaryReplicaRouter()
+        self.addCleanup(db_routers.pin_to_primary, False)
+
+    def pin_request(self, **session):
+        request = RequestFactory().get('/')
+        request.session = session
+        db_routers.ReplicaPinningMiddleware().process_request(request)
+        return db_routers.is_pinned()
+
+    def test_return_replica_for_menu_reads(self):
+        self.assertEqual('replica', self.router.db_for_read(Menu))
+
+    def test_return_primary_for_session_reads(self):
+        self.assertEqual('default', self.router.db_for_read(Session))
+
+    def test_return_primary_for_writes(self):
+        self.assertEqual('default', self.router.db_for_write(Menu))
+
+    def test_return_primary_for_reads_while_pinned(self):
+        db_routers.pin_to_primary()
+
+        self.assertEqual('default', self.router.db_for_read(Menu))
+
+    def test_return_no_migrations_on_replica(self):
+        self.assertFalse(self.router.allow_migrate('replica', 'menu'))
+        self.assertTrue(self.router.allow_migrate('default', 'menu'))
+
+    def test_return_queries_counted_per_alias(self):
+        before = db_routers.get_counts()
+
+        list(Menu.objects.using('default').all())
+        self.router.db_for_read(Menu)
+
+        after = db_routers.get_counts()
+        self.assertEqual(
+            before.get(('default', 'read'), 0) + 1, after[('default', 'read')])
+        self.assertEqual(
+            before.get(('replica', 'read')), after.get(('replica', 'read')))
+
+    def test_return_other_requests_not_pinned_after_catalog_write(self):
+        self.router.db_for_write(Menu)
+
+        self.assertFalse(self.pin_request())
+
+    def test_return_no_cache_fill_after_catalog_write(self):
+        self.pin_request()
+        self.assertTrue(db_routers.may_fill_cache())
+
+        self.router.db_for_write(Menu)
+
+        self.assertFalse(db_routers.may_fill_cache())
+        self.assertFalse(menu_cache.may_fill())
+
+    def test_return_no_cache_fill_while_pinned(self):
+        self.assertTrue(self.pin_request(
+            **{db_routers.PINNED_UNTIL_KEY: time.time() + 60}))
+
+        self.assertFalse(db_routers.may_fill_cache())
+
+    def test_return_cache_fill_after_session_write(self):
+        self.router.db_for_write(Session)
+
+        self.assertFalse(self.pin_request())
+        self.assertTrue(db_routers.may_fill_cache())
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_return_cache_fill_while_pinned_without_replicas(self):
+        db_routers.pin_to_primary()
+
+        self.assertTrue(db_routers.may_fill_cache())
+
+
+class ReplicaPinningMiddlewareTestCase(TestCase):
+    '''Tests for read-your-writes pinning after a user's own edit'''
+    def setUp(self):
+        user = User.objects.create_user('moe', 'moe@example.com', '12345')
+        self.client.login(username='moe', password='12345')
+        self.item = Item.objects.create(
+            name='Omelette', description='Is a delicious stuff', chef=user)
+        self.menu = Menu.objects.create(season='Summer')
+
+    def get_pinned_until(self):
+        return self.client.session.get(db_routers.PINNED_UNTIL_KEY, 0)
+
+    def test_return_session_pinned_after_edit(self):
+        self.client.post(reverse('menu_edit', kwargs={'pk': self.menu.pk}), {
+            'season': 'Winter',
+            'items': [self.item.pk],
+            'expiration_date': '06/12/2030',
+        })
+
+        self.assertGreater(self.get_pinned_until(), time.time())
+
+    def test_return_session_not_pinned_after_read(self):
+        session = self.client.session
+        session.pop(db_routers.PINNED_UNTIL_KEY, None)
+        session.save()
+
+        self.client.get(reverse('home'))
+
+        self.assertEqual(0, self.get_pinned_until())
+
+
+@override_settings(REPLICA_DATABASES=['replica'])
+class TwoSQLiteFilesTestCase(TestCase):
+    '''Tests for reads from a second SQLite file standing in for a replica'''
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        connections.databases['replica'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(directory, 'replica.sqlite3'),
+        }
+        self.addCleanup(self.remove_replica, directory)
+        with connections['replica'].schema_editor() as editor:
+            editor.create_model(Menu)
+            # Saving a menu appends to the change feed.
+            editor.create_model(Change)
+        # The replica has not caught up with the primary.
+        Menu.objects.using('replica').create(season='Stale')
+        Menu.objects.create(season='Fresh')
+
+    def remove_replica(self, directory):
+        connections['replica'].close()
+        del connections.databases['replica']
+        del connections['replica']
+        os.remove(os.path.join(directory, 'replica.sqlite3'))
+        os.rmdir(directory)
+        db_routers.pin_to_primary(False)
+
+    def test_return_rows_of_replica_for_reads(self):
+        self.assertEqual(['Stale'], [menu.season for menu in Menu.objects.all()])
+
+    def test_return_rows_of_primary_while_pinned(self):
+        db_routers.pin_to_primary()
+
+        self.assertEqual(['Fresh'], [menu.season for menu in Menu.objects.all()])
+
+
+class ConnectionPoolTestCase(TestCase):
+    '''Tests for the connection pool of the pooled backends'''
+    def create_pool(self, **options):
+        return ConnectionPool(lambda: sqlite3.connect(':memory:'), **options)
+
+    def test_return_released_connection_reused(self):
+        pool = self.create_pool()
+        connection, reused = pool.acquire()
+        pool.release(connection)
+
+        again, reused_again = pool.acquire()
+
+        self.assertIs(connection, again)
+        self.assertEqual((False, True), (reused, reused_again))
+
+    def test_return_timeout_when_pool_is_full(self):
+        pool = self.create_pool(max_size=1, timeout=0.01)
+        pool.acquire()
+
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+
+        self.assertEqual(1, pool.get_stats()['timeouts'])
+
+    def test_return_broken_connection_replaced_after_health_check(self):
+        pool = self.create_pool(health_check_interval=0)
+        connection, _ = pool.acquire()
+        connection.close()
+        pool.release(connection)
+
+        again, reused = pool.acquire()
+
+        self.assertIsNot(connection, again)
+        self.assertFalse(reused)
+        self.assertEqual(1, pool.get_stats()['discarded'])
+
+    def test_return_idle_connections_closed_down_to_min_size(self):
+        pool = self.create_pool(min_size=1, idle_timeout=0)
+        first, _ = pool.acquire()
+        second, _ = pool.acquire()
+        pool.release(first)
+        pool.release(second)
+
+        pool.acquire()
+
+        self.assertEqual(1, pool.get_stats()['size'])
+
+
+class PooledSQLiteBackendTestCase(TestCase):
+    '''Tests for the pooled SQLite backend and its tuning hook'''
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        connections.databases['pooled'] = {
+            'ENGINE': 'mysite.db.pooled_sqlite3',
+            'NAME': os.path.join(directory, 'pooled.sqlite3'),
+        }
+        self.addCleanup(self.remove_alias)
+        self.connection = connections['pooled']
+
+    def remove_alias(self):
+        self.connection.close()
+        del connections['pooled']
+        del connections.databases['pooled']
+
+    def query(self, sql):
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql)
+            return cursor.fetchone()[0]
+
+    def test_return_connection_reused_after_close(self):
+        self.query('SELECT 1')
+        raw = self.connection.connection
+        self.connection.close()
+
+        self.query('SELECT 1')
+
+        self.assertIs(raw, self.connection.connection)
+        self.assertTrue(self.connection.reused_connection)
+
+    def test_return_pragmas_applied_to_new_connection(self):
+        self.assertEqual('wal', self.query('PRAGMA journal_mode'))
+        self.assertEqual(1, self.query('PRAGMA synchronous'))
+
+
+class MetricsTestCase(TestCase):
+    '''Tests for the per-view metrics and the /metrics endpoint'''
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings = override_settings(
+            METRICS_DIR=self.directory, METRICS_TOKEN='secret')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        # A page cached by an earlier test would be served without queries.
+        cache.clear()
+        with metrics._lock:
+            metrics._histograms.clear()
+            metrics._counters.clear()
+
+    def get_metrics(self):
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(200, response.status_code)
+        return response.content.decode('utf-8').splitlines()
+
+    def get_value(self, lines, prefix):
+        for line in lines:
+            if line.startswith(prefix + ' '):
+                return float(line.rsplit(' ', 1)[1])
+        self.fail('No {0} in /metrics'.format(prefix))
+
+    def test_return_request_counted_under_url_name(self):
+        self.client.get(reverse('item_list'))
+
+        lines = self.get_metrics()
+
+        self.assertEqual(1, self.get_value(
+            lines, 'django_view_duration_seconds_count{view="item_list"}'))
+        self.assertEqual(1, self.get_value(
+            lines,
+            'django_view_responses_total{status="200",view="item_list"}'))
+
+    def test_return_queries_and_template_time_recorded(self):
+        self.client.get(reverse('item_list'))
+
+        lines = self.get_metrics()
+
+        self.assertGreater(self.get_value(
+            lines, 'django_view_db_queries_sum{view="item_list"}'), 0)
+        self.assertGreater(self.get_value(
+            lines,
+            'django_view_template_duration_seconds_sum{view="item_list"}'), 0)
+
+    def test_return_metrics_of_other_workers_summed(self):
+        self.client.get(reverse('item_list'))
+        metrics.flush(force=True)
+        path = os.path.join(self.directory, 'metrics-other.json')
+        with open(path, 'w') as other:
+            json.dump({'counters': {'django_view_responses_total': [
+                [[['view', 'item_list'], ['status', '200']], 2]]}}, other)
+
+        lines = self.get_metrics()
+
+        self.assertEqual(3, self.get_value(
+            lines,
+            'django_view_responses_total{status="200",view="item_list"}'))
+
+    def write_other(self, name, data):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as other:
+            json.dump(data, other)
+        return path
+
+    def test_return_file_of_exited_worker_removed(self):
+        worker = subprocess.Popen([sys.executable, '-c', 'pass'])
+        worker.wait()
+        path = self.write_other(
+            'metrics-{0}-1.json'.format(worker.pid),
+            {'counters': {'django_view_responses_total': [
+                [[['view', 'item_list'], ['status', '200']], 2]]}})
+
+        lines = self.get_metrics()
+
+        self.assertFalse(os.path.exists(path))
+        self.assertNotIn(
+            'django_view_responses_total{status="200",view="item_list"} 2',
+            lines)
+
+    def test_return_gauges_of_stale_file_left_out(self):
+        path = self.write_other(
+            'metrics-{0}-1.json'.format(os.getpid()), {
+                'counters': {'django_view_responses_total': [
+                    [[['view', 'item_list'], ['status', '200']], 2]]},
+                'gauges': {'django_db_pool_connections': [
+                    [[['alias', 'gone'], ['state', 'idle']], 4]]},
+            })
+        written = time.time() - project_settings.METRICS_STALE_AFTER - 1
+        os.utime(path, (written, written))
+
+        lines = self.get_metrics()
+
+        self.assertEqual(2, self.get_value(
+            lines,
+            'django_view_responses_total{status="200",view="item_list"}'))
+        self.assertFalse(any('alias="gone"' in line for line in lines))
+
+    def test_return_own_metrics_without_writing_them(self):
+        self.client.get(reverse('item_list'))
+        # The request may have been flushed, or not within the interval.
+        if os.path.exists(metrics.get_path()):
+            os.remove(metrics.get_path())
+
+        lines = self.get_metrics()
+
+        self.assertEqual(1, self.get_value(
+            lines, 'django_view_duration_seconds_count{view="item_list"}'))
+        self.assertFalse(os.path.exists(metrics.get_path()))
+
+    def test_return_404_without_token(self):
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(404, response.status_code)
+
+    def test_return_404_for_wrong_token(self):
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer guess')
+
+        self.assertEqual(404, response.status_code)
+
+    def test_return_404_when_no_token_is_set(self):
+        with self.settings(METRICS_TOKEN=None):
+            response = self.client.get(
+                reverse('metrics'), HTTP_AUTHORIZATION='Bearer None')
+
+        self.assertEqual(404, response.status_code)
+
+
+class SharedCacheTestCase(TestCase):
+    '''Tests for the cache backend of the settings'''
+    def test_return_version_bump_seen_by_another_process(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        config = dict(project_settings.CACHES['default'], LOCATION=directory)
+        with override_settings(CACHES={'default': config}):
+            # Two handlers stand in for the caches of two workers.
+            first, second = CacheHandler(), CacheHandler()
+            with mock.patch.object(menu_cache, 'cache', first['default']):
+                version = menu_cache.bump_version()
+
+            self.assertEqual(version, second['default'].get(
+                menu_cache.VERSION_KEY))
+
+    def get_caches(self, count):
+        """count backends of the settings sharing one directory, as the
+        workers of a machine do.
+        """
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        config = dict(project_settings.CACHES['default'], LOCATION=directory)
+        with override_settings(CACHES={'default': config}):
+            return [CacheHandler()['default'] for _ in range(count)]
+
+    def run_threads(self, caches, target):
+        threads = [
+            threading.Thread(target=target, args=(cache,)) for cache in caches]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_return_no_increment_lost(self):
+        caches = self.get_caches(8)
+        caches[0].set('counter', 0, None)
+
+        def increment(cache):
+            for _ in range(25):
+                cache.incr('counter')
+
+        self.run_threads(caches, increment)
+
+        self.assertEqual(200, caches[0].get('counter'))
+
+    def test_return_expiry_kept_by_incr(self):
+        cache, = self.get_caches(1)
+        cache.set('forever', 1, None)
+        cache.set('soon', 1, 0.2)
+
+        cache.incr('forever')
+        cache.incr('soon')
+        time.sleep(0.3)
+
+        self.assertEqual((2, None), (cache.get('forever'), cache.get('soon')))
+
+    def test_return_key_added_by_one_backend_only(self):
+        caches = self.get_caches(8)
+        added = []
+
+        def add(cache):
+            added.append(cache.add('lock', 1, 10))
+
+        self.run_threads(caches, add)
+
+        self.assertEqual([True], [result for result in added if result])
+
+
+class MaintenanceTestCase(TestCase):
+    '''Tests for the maintenance jobs run by the web workers'''
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        maintenance_settings = override_settings(
+            MAINTENANCE_DIR=directory,
+            MAINTENANCE_INTERVAL=3600,
+            MAINTENANCE_JOBS=['purge_expired_sessions'])
+        maintenance_settings.enable()
+        self.addCleanup(maintenance_settings.disable)
+        Session.objects.create(
+            session_key='expired', session_data='',
+            expire_date=timezone.now() - datetime.timedelta(days=1))
+
+    def test_return_due_job_run(self):
+        self.assertEqual(['purge_expired_sessions'], maintenance.run_due_jobs())
+        self.assertFalse(Session.objects.filter(session_key='expired').exists())
+
+    def test_return_job_not_run_again_within_interval(self):
+        maintenance.run_due_jobs()
+
+        self.assertEqual([], maintenance.run_due_jobs())
+
+    def test_return_job_run_again_after_interval(self):
+        maintenance.run_due_jobs()
+        stamp = maintenance.get_stamp('purge_expired_sessions')
+        os.utime(stamp, (time.time() - 3600, time.time() - 3600))
+
+        self.assertEqual(['purge_expired_sessions'], maintenance.run_due_jobs())
+
+    def test_return_nothing_started_when_turned_off(self):
+        with self.settings(MAINTENANCE_INTERVAL=None):
+            self.assertFalse(maintenance.start_due_jobs())
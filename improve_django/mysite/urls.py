@@ -18,10 +18,11 @@ from django.contrib import admin
 from django.contrib.staticfiles.urls import staticfiles_urlpatterns
 
 
-from . import settings
+from . import metrics, settings
 
 urlpatterns = [
     url(r'^admin/', include(admin.site.urls)),
+    url(r'^metrics$', metrics.metrics, name='metrics'),
     url(r'^accounts/', include('accounts.urls', namespace='accounts')),
     url(r'', include('menu.urls')),
 ]